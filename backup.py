@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Quantum Scheduler - workspace backups from the command line
+
+Downloads every project as one zip (GET /api/archive) or imports such a zip
+(POST /api/archive) on a running server. Both stream: the archive goes
+straight to disk on export and is sent from disk on import, with progress on
+stderr. Suitable for scheduled backups, e.g. nightly with the last 14 kept:
+
+    python backup.py export backups/ --keep 14
+    python backup.py import backups/quantum-scheduler-20250106-020000.zip --policy rename
+
+Without --url the server is found through server/server_port.txt (or
+QS_DATA_DIR/server_port.txt), falling back to http://localhost:8088. Only the
+standard library is used, so the tray app calls these functions directly.
+"""
+
+import argparse
+import glob
+import http.client
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BACKUP_PREFIX = "quantum-scheduler-"
+CONFLICT_POLICIES = ("skip", "overwrite", "rename")
+
+READ_BLOCK = 64 * 1024
+
+# Seconds to wait for the server between pieces of data
+TIMEOUT = 600
+
+
+def default_url():
+    """URL of the local server, from the port file it writes once it is ready"""
+    data_dir = os.environ.get("QS_DATA_DIR") or os.path.join(ROOT_DIR, "server")
+    try:
+        with open(os.path.join(data_dir, "server_port.txt"), "r") as f:
+            return f"http://localhost:{int(f.read().strip())}"
+    except (OSError, ValueError):
+        return "http://localhost:8088"
+
+
+def _connect(url):
+    parsed = urlparse(url)
+    connection = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    return connection(parsed.hostname or "localhost", parsed.port, timeout=TIMEOUT), parsed.path.rstrip("/")
+
+
+def backup_path(target):
+    """Where an export goes: target itself, or a timestamped file when target is a directory"""
+    if target.endswith(("/", os.sep)) or os.path.isdir(target):
+        os.makedirs(target, exist_ok=True)
+        return os.path.join(target, datetime.now().strftime(BACKUP_PREFIX + "%Y%m%d-%H%M%S.zip"))
+    return target
+
+
+def prune_backups(directory, keep):
+    """Delete all but the newest `keep` backups in a directory; returns the removed paths"""
+    backups = sorted(glob.glob(os.path.join(glob.escape(directory), BACKUP_PREFIX + "*.zip")))
+    removed = backups[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def export_backup(url, path, progress=None):
+    """Download the archive to path (through a .part file, so path is never half written).
+
+    progress(bytes received, number of projects) is called as data arrives.
+    Returns (bytes, projects).
+    """
+    conn, base = _connect(url)
+    try:
+        conn.request("GET", base + "/api/archive")
+        response = conn.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"Export failed: HTTP {response.status} {response.read(500).decode('utf-8', 'replace')}")
+        projects = int(response.getheader("X-Archive-Projects") or 0)
+        received = 0
+        partial = path + ".part"
+        try:
+            with open(partial, "wb") as f:
+                while True:
+                    data = response.read(READ_BLOCK)
+                    if not data:
+                        break
+                    f.write(data)
+                    received += len(data)
+                    if progress:
+                        progress(received, projects)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return received, projects
+    finally:
+        conn.close()
+
+
+class _ProgressReader:
+    """File wrapper reporting how much of it http.client has sent"""
+
+    def __init__(self, f, total, progress):
+        self._f = f
+        self.total = total
+        self.sent = 0
+        self.progress = progress
+
+    def read(self, size=-1):
+        data = self._f.read(READ_BLOCK if size is None or size < 0 else size)
+        self.sent += len(data)
+        if self.progress and data:
+            self.progress(self.sent, self.total)
+        return data
+
+
+def import_backup(url, path, policy="skip", progress=None):
+    """Upload an archive; progress(bytes sent, total bytes) while it goes. Returns the server's summary."""
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"policy must be one of {', '.join(CONFLICT_POLICIES)}")
+    conn, base = _connect(url)
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            conn.request("POST", f"{base}/api/archive?policy={policy}", body=_ProgressReader(f, size, progress),
+                         headers={"Content-Type": "application/zip", "Content-Length": str(size)})
+        response = conn.getresponse()
+        body = response.read()
+        try:
+            result = json.loads(body.decode("utf-8"))
+        except ValueError:
+            result = {"success": False, "error": body[:500].decode("utf-8", "replace")}
+        if response.status != 200 or not result.get("success"):
+            raise RuntimeError(f"Import failed: HTTP {response.status} {result.get('error')}")
+        return result
+    finally:
+        conn.close()
+
+
+def _megabytes(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up or restore every project of a Quantum Scheduler server")
+    parser.add_argument("--url", default=None, help="server URL (default: the local server, see server_port.txt)")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="download all projects as a zip")
+    export.add_argument("target", nargs="?", default=".", help="zip file, or directory for a timestamped one")
+    export.add_argument("--keep", type=int, default=0, help="keep only the newest N backups in the directory")
+
+    restore = commands.add_parser("import", help="import a zip made by export")
+    restore.add_argument("archive")
+    restore.add_argument("--policy", choices=CONFLICT_POLICIES, default="skip",
+                         help="projects whose name is taken: skip them, overwrite them, or import under a new name")
+    args = parser.parse_args()
+    url = args.url or default_url()
+
+    def show(text):
+        if not args.quiet:
+            sys.stderr.write(f"\r{text}\033[K")
+            sys.stderr.flush()
+
+    started = time.monotonic()
+    try:
+        if args.command == "export":
+            path = backup_path(args.target)
+            size, projects = export_backup(url, path, lambda n, total: show(f"{_megabytes(n)} ({total} projects)"))
+            show("")
+            print(f"Saved {projects} projects ({_megabytes(size)}) to {path} in {time.monotonic() - started:.1f}s")
+            if args.keep:
+                for removed in prune_backups(os.path.dirname(os.path.abspath(path)), args.keep):
+                    print(f"Removed old backup {removed}")
+        else:
+            result = import_backup(url, args.archive, args.policy,
+                                   lambda n, total: show(f"{_megabytes(n)} / {_megabytes(total)} sent"))
+            show("")
+            counts = ", ".join(f"{n} {outcome}" for outcome, n in result["counts"].items() if n) or "nothing"
+            print(f"Imported {args.archive} ({args.policy}): {counts} in {time.monotonic() - started:.1f}s")
+    except (OSError, RuntimeError, http.client.HTTPException) as e:
+        show("")
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Quantum Scheduler - HTTP API benchmark
+
+Starts server/server.py on a free local port with a throwaway data directory,
+fills it with synthetic projects and replays autosaves, loads, list calls and
+renames from concurrent clients. Each endpoint is first measured on its own
+(so its peak server RSS is its own), then all of them together in the
+configured mix. Results print as a table and can be written as JSON to
+compare runs across changes:
+
+    python bench_server.py --clients 16 --duration 10 --json before.json
+    python bench_server.py --clients 16 --duration 10 --compare before.json
+
+Server settings are passed through with --env, e.g. --env QS_SERVER_MODE=asyncio.
+Every client connects from 127.0.0.1, so the per-address write throttle is
+off (QS_WRITE_RATE=0) unless --env sets it. Only the standard library is used.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_SCRIPT = os.path.join(ROOT_DIR, "server", "server.py")
+
+OPERATIONS = ("save", "load", "list", "rename")
+DEFAULT_MIX = "save=60,load=25,list=10,rename=5"
+
+STARTUP_TIMEOUT = 30
+RSS_SAMPLE_SECONDS = 0.02
+
+
+# --- Synthetic projects ---
+
+def make_project(rng, depth, children, segments, holidays, start=date(2025, 1, 6)):
+    """A saved-project document shaped like persistence.js writes it"""
+    next_id = [1]
+
+    def node(level):
+        node_id = next_id[0]
+        next_id[0] += 1
+        item = {
+            "id": node_id,
+            "name": f"Task {node_id}",
+            "expanded": True,
+            "color": "#%06x" % rng.randrange(0x1000000),
+            "segments": [],
+            "children": [],
+        }
+        if level < depth:
+            item["children"] = [node(level + 1) for _ in range(children)]
+        else:
+            offset = rng.randrange(0, 300)
+            for s in range(segments):
+                duration = rng.randrange(1, 15)
+                item["segments"].append({
+                    "id": f"s{node_id}_{s}",
+                    "startOffset": offset,
+                    "duration": duration,
+                    "includeWeekends": True,
+                })
+                offset += duration + rng.randrange(0, 10)
+        return item
+
+    holiday_days = sorted(rng.sample(range(0, 730), min(holidays, 730)))
+    return {
+        "version": "1.0",
+        "saveDate": datetime.now().isoformat(),
+        "startDate": datetime(start.year, start.month, start.day).isoformat() + "Z",
+        "holidays": [(start + timedelta(days=d)).isoformat() for d in holiday_days],
+        "data": [node(1) for _ in range(children)],
+    }
+
+
+def nudge(rng, doc):
+    """Move one leaf segment, the kind of edit an autosave carries"""
+    nodes = list(doc["data"])
+    while nodes:
+        item = nodes.pop(rng.randrange(len(nodes)))
+        if item["segments"]:
+            seg = rng.choice(item["segments"])
+            seg["startOffset"] = max(0, seg["startOffset"] + rng.choice((-1, 1)))
+            break
+        nodes.extend(item["children"])
+    doc["saveDate"] = datetime.now().isoformat()
+
+
+# --- Server process ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_rss(pid, field="VmRSS"):
+    """Resident set size of a process in bytes (Linux /proc), or None"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class ServerProcess:
+    """server/server.py in a subprocess, with its data in a temp directory"""
+
+    def __init__(self, env_overrides, keep_data=False):
+        self.data_dir = tempfile.mkdtemp(prefix="qs-bench-")
+        self.keep_data = keep_data
+        self.log_path = os.path.join(self.data_dir, "server.log")
+        # All clients share one address; with the write throttle on, saves and renames would measure 429s
+        env = dict(os.environ, QS_WRITE_RATE="0")
+        env.update(env_overrides)
+        env["PORT"] = str(free_port())
+        env["QS_DATA_DIR"] = self.data_dir
+        env["PYTHONUNBUFFERED"] = "1"
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT], env=env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        self.port = self._wait_ready()
+
+    def _wait_ready(self):
+        port_file = os.path.join(self.data_dir, "server_port.txt")
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}, see {self.log_path}")
+            if os.path.exists(port_file):
+                try:
+                    with open(port_file) as f:
+                        port = int(f.read().strip())
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+                    conn.request("GET", "/api/projects?limit=0")
+                    if conn.getresponse().status == 200:
+                        conn.close()
+                        return port
+                except (OSError, ValueError, http.client.HTTPException):
+                    pass
+            time.sleep(0.1)
+        raise RuntimeError(f"Server did not start within {STARTUP_TIMEOUT}s, see {self.log_path}")
+
+    def rss(self):
+        return read_rss(self.process.pid)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self._log.close()
+        if not self.keep_data:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+class RssSampler(threading.Thread):
+    """Highest RSS of the server seen while a phase runs"""
+
+    def __init__(self, server):
+        super().__init__(daemon=True)
+        self.server = server
+        self.peak = None
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            rss = self.server.rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._done.wait(RSS_SAMPLE_SECONDS)
+
+    def finish(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+# --- Clients ---
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.errors += other.errors
+        self.bytes_sent += other.bytes_sent
+        self.bytes_received += other.bytes_received
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+class ClientProject:
+    """The project one simulated client works on; it carries over from phase to phase"""
+
+    def __init__(self, number, doc):
+        self.doc = doc
+        self.names = (f"bench-{number}", f"bench-{number}-renamed")
+        self.current = 0
+        self.revision = None
+
+    @property
+    def name(self):
+        return self.names[self.current]
+
+
+class Client(threading.Thread):
+    """One simulated browser: autosaves its project, reloads it, lists and renames"""
+
+    def __init__(self, port, project, mix, deadline, seed, start_barrier):
+        super().__init__(daemon=True)
+        self.port = port
+        self.project = project
+        self.rng = random.Random(seed)
+        self.operations, self.weights = zip(*mix.items())
+        self.deadline = deadline
+        self.start_barrier = start_barrier
+        self.stats = {op: EndpointStats() for op in self.operations}
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, response bytes); http.client reopens the connection when the server closed it"""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        for attempt in (1, 2):
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # An idle keep-alive connection the server timed out; retry once on a fresh one
+                self.conn.close()
+                if attempt == 2:
+                    raise
+
+    def op_save(self):
+        project = self.project
+        nudge(self.rng, project.doc)
+        body = json.dumps(project.doc).encode("utf-8")
+        status, data = self.request("POST", "/api/project/" + quote(project.name), body,
+                                    {"Content-Type": "application/json"})
+        if status == 200:
+            project.revision = json.loads(data).get("revision")
+        return status == 200, len(body), len(data)
+
+    def op_load(self):
+        headers = {"Accept-Encoding": "gzip"}
+        if self.project.revision and self.rng.random() < 0.5:
+            headers["If-None-Match"] = f'"{self.project.revision}"'
+        status, data = self.request("GET", "/api/project/" + quote(self.project.name), headers=headers)
+        return status in (200, 304), 0, len(data)
+
+    def op_list(self):
+        status, data = self.request("GET", "/api/projects", headers={"Accept-Encoding": "gzip"})
+        return status == 200, 0, len(data)
+
+    def op_rename(self):
+        project = self.project
+        target = 1 - project.current
+        body = json.dumps({"newName": project.names[target]}).encode("utf-8")
+        status, data = self.request("PUT", "/api/project/" + quote(project.name), body,
+                                    {"Content-Type": "application/json"})
+        ok = status == 200 and json.loads(data).get("success")
+        if ok:
+            project.current = target
+        return ok, len(body), len(data)
+
+    def run(self):
+        self.start_barrier.wait()
+        handlers = {op: getattr(self, "op_" + op) for op in self.operations}
+        while time.monotonic() < self.deadline:
+            op = self.rng.choices(self.operations, self.weights)[0]
+            stats = self.stats[op]
+            started = time.perf_counter()
+            try:
+                ok, sent, received = handlers[op]()
+            except (OSError, http.client.HTTPException, ValueError):
+                ok, sent, received = False, 0, 0
+            stats.latencies.append(time.perf_counter() - started)
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+            if not ok:
+                stats.errors += 1
+        if self.conn is not None:
+            self.conn.close()
+
+
+def seed_projects(port, docs, prefix="bench"):
+    """Store every client's project once so loads and renames have something to work on"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for number, doc in enumerate(docs):
+        conn.request("POST", f"/api/project/{prefix}-{number}", body=json.dumps(doc).encode("utf-8"),
+                     headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Seeding project {prefix}-{number} failed with HTTP {response.status}")
+    conn.close()
+
+
+def run_phase(server, projects, mix, duration, seed):
+    """Run one client thread per project for `duration` seconds; returns the phase report"""
+    barrier = threading.Barrier(len(projects) + 1)
+    deadline = time.monotonic() + duration + 0.05
+    workers = [
+        Client(server.port, project, mix, deadline, seed * 1000 + i, barrier)
+        for i, project in enumerate(projects)
+    ]
+    for worker in workers:
+        worker.start()
+    sampler = RssSampler(server)
+    sampler.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    peak_rss = sampler.finish()
+
+    endpoints = {}
+    for op in mix:
+        total = EndpointStats()
+        for worker in workers:
+            total.merge(worker.stats[op])
+        latencies = sorted(total.latencies)
+        endpoints[op] = {
+            "requests": len(latencies),
+            "errors": total.errors,
+            "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0,
+            "p50Ms": _ms(percentile(latencies, 0.50)),
+            "p95Ms": _ms(percentile(latencies, 0.95)),
+            "p99Ms": _ms(percentile(latencies, 0.99)),
+            "bytesSent": total.bytes_sent,
+            "bytesReceived": total.bytes_received,
+        }
+    return {
+        "seconds": round(elapsed, 3),
+        "requests": sum(e["requests"] for e in endpoints.values()),
+        "throughput": round(sum(e["requests"] for e in endpoints.values()) / elapsed, 2) if elapsed else 0,
+        "peakRssBytes": peak_rss,
+        "endpoints": endpoints,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+# --- Reporting ---
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        op = op.strip()
+        if op not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{op}' (choose from {', '.join(OPERATIONS)})")
+        try:
+            mix[op] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight for '{op}': {weight}")
+    mix = {op: w for op, w in mix.items() if w > 0}
+    if not mix:
+        raise argparse.ArgumentTypeError("the mix needs at least one operation with a positive weight")
+    return mix
+
+
+def _mb(value):
+    return "-" if value is None else f"{value / (1024 * 1024):.1f}"
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def print_report(report, baseline=None):
+    header = f"{'phase':<10}{'endpoint':<10}{'req':>8}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'MB out':>9}{'MB in':>9}{'RSS MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for phase, result in report["phases"].items():
+        for op, e in result["endpoints"].items():
+            line = (f"{phase:<10}{op:<10}{e['requests']:>8}{e['errors']:>6}{e['throughput']:>10.1f}"
+                    f"{_fmt(e['p50Ms']):>10}{_fmt(e['p95Ms']):>10}{_fmt(e['p99Ms']):>10}"
+                    f"{_mb(e['bytesSent']):>9}{_mb(e['bytesReceived']):>9}{_mb(result['peakRssBytes']):>9}")
+            print(line)
+            old = (baseline or {}).get("phases", {}).get(phase, {}).get("endpoints", {}).get(op)
+            if old:
+                print(f"{'':<20}vs baseline: req/s {_change(old['throughput'], e['throughput'])}, "
+                      f"p95 {_change(old['p95Ms'], e['p95Ms'])}, p99 {_change(old['p99Ms'], e['p99Ms'])}")
+    print(f"\nServer peak RSS (VmHWM): {_mb(report['server']['peakRssBytes'])} MB")
+
+
+def _change(old, new):
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Quantum Scheduler HTTP API")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent simulated clients (default 8)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per phase (default 10)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"weighted operations for the mixed phase (default {DEFAULT_MIX})")
+    parser.add_argument("--no-isolated", action="store_true", help="skip the one-endpoint-at-a-time phases")
+    parser.add_argument("--depth", type=int, default=3, help="levels of children per project (default 3)")
+    parser.add_argument("--children", type=int, default=5, help="children per node (default 5)")
+    parser.add_argument("--segments", type=int, default=4, help="segments per leaf task (default 4)")
+    parser.add_argument("--holidays", type=int, default=20, help="holidays per project (default 20)")
+    parser.add_argument("--extra-projects", type=int, default=0,
+                        help="additional stored projects that only make the listing bigger")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="environment for the server, e.g. QS_SERVER_MODE=asyncio (repeatable)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="show changes against an earlier --json report")
+    parser.add_argument("--keep-data", action="store_true", help="leave the temp data directory in place")
+    args = parser.parse_args()
+
+    server_env = {}
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--env expects KEY=VALUE, got '{item}'")
+        server_env[key] = value
+
+    rng = random.Random(args.seed)
+    docs = [make_project(rng, args.depth, args.children, args.segments, args.holidays)
+            for _ in range(args.clients)]
+    doc_bytes = len(json.dumps(docs[0]).encode("utf-8"))
+
+    config = {
+        "clients": args.clients,
+        "duration": args.duration,
+        "mix": args.mix,
+        "depth": args.depth,
+        "children": args.children,
+        "segments": args.segments,
+        "holidays": args.holidays,
+        "extraProjects": args.extra_projects,
+        "projectBytes": doc_bytes,
+        "env": server_env,
+        "seed": args.seed,
+    }
+    log = sys.stderr if args.json == "-" else sys.stdout
+    print(f"Projects of ~{doc_bytes / 1024:.1f} KB, {args.clients} clients, {args.duration:g}s per phase", file=log)
+
+    server = ServerProcess(server_env, keep_data=args.keep_data)
+    try:
+        print(f"Server started on port {server.port} (data in {server.data_dir})", file=log)
+        seed_projects(server.port, docs)
+        if args.extra_projects:
+            filler = [make_project(rng, 2, 3, 2, 0) for _ in range(args.extra_projects)]
+            seed_projects(server.port, filler, prefix="filler")
+
+        projects = [ClientProject(i, doc) for i, doc in enumerate(docs)]
+        phases = {}
+        if not args.no_isolated:
+            for op in args.mix:
+                print(f"Running {op} ...", file=log)
+                phases[op] = run_phase(server, projects, {op: 1.0}, args.duration, args.seed)
+        print("Running mixed ...", file=log)
+        phases["mixed"] = run_phase(server, projects, args.mix, args.duration, args.seed)
+
+        report = {
+            "tool": "bench_server",
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config,
+            "server": {"peakRssBytes": read_rss(server.process.pid, "VmHWM")},
+            "phases": phases,
+        }
+    finally:
+        server.stop()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.json != "-":
+        print()
+        print_report(report, baseline)
+    if args.json:
+        text = json.dumps(report, indent=2)
+        if args.json == "-":
+            print(text)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+asyncio HTTP engine (QS_SERVER_MODE=asyncio).
+
+The event loop owns every connection: it waits for request heads, keeps idle
+HTTP/1.1 connections open and serves /api/events streams itself. Each request
+is then run through the regular SchedulerHandler on a bounded worker pool, so
+file and JSON work never blocks the loop and the routes stay identical to the
+threaded server; a request that finds the pool and its queue full is answered
+503 from the loop. Request bodies and responses are bridged between the worker
+and the loop, so large uploads and downloads still stream.
+"""
+
+import asyncio
+import http.client
+import io
+from urllib.parse import urlparse, parse_qs
+
+try:
+    from .events import HEARTBEAT_SECONDS, MAX_CLIENT_BACKLOG
+    from .limits import BoundedExecutor, overload_response
+except ImportError:  # Running as a script (python server/server.py)
+    from events import HEARTBEAT_SECONDS, MAX_CLIENT_BACKLOG
+    from limits import BoundedExecutor, overload_response
+
+
+# Largest request head (request line + headers) we accept
+MAX_HEAD_BYTES = 64 * 1024
+
+# How long to wait for the next piece of a request body, or for a client to accept response bytes
+BODY_READ_TIMEOUT = 60
+
+# Request bodies up to this size are received on the loop before a worker picks the request up
+PREFETCH_BODY_BYTES = 8 * 1024 * 1024
+
+
+class _BridgeReader:
+    """rfile for a worker thread: the buffered request head, then bytes pulled from the loop's StreamReader"""
+
+    def __init__(self, loop, reader, buffer):
+        self._loop = loop
+        self._reader = reader
+        # Shared with the connection loop: whatever is left after this request belongs to the next one
+        self._buffer = buffer
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        future = asyncio.run_coroutine_threadsafe(self._reader.read(65536), self._loop)
+        data = future.result(BODY_READ_TIMEOUT)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer += data
+        return True
+
+    def readline(self, limit=-1):
+        while True:
+            end = self._buffer.find(b"\n")
+            if end >= 0 and (limit < 0 or end < limit):
+                return self._take(end + 1)
+            if 0 <= limit <= len(self._buffer):
+                return self._take(limit)
+            if not self._fill():
+                return self._take(len(self._buffer))
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            if not self._fill():
+                break
+        return self._take(len(self._buffer) if size < 0 else min(size, len(self._buffer)))
+
+    def _take(self, count):
+        data = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        return data
+
+    def close(self):
+        pass
+
+
+class _BridgeConnection:
+    """Stands in for the socket a StreamRequestHandler expects, backed by asyncio streams"""
+
+    def __init__(self, loop, reader, writer, buffer):
+        self._loop = loop
+        self._writer = writer
+        self._rfile = _BridgeReader(loop, reader, buffer)
+
+    def makefile(self, mode, bufsize=-1):
+        return self._rfile
+
+    def settimeout(self, timeout):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+    def sendall(self, data):
+        asyncio.run_coroutine_threadsafe(self._write(bytes(data)), self._loop).result(BODY_READ_TIMEOUT)
+
+    async def _write(self, data):
+        self._writer.write(data)
+        await self._writer.drain()
+
+
+def _one_request_handler(handler_class):
+    """Handler variant that speaks HTTP/1.1 and serves exactly one request per instantiation"""
+
+    class OneRequestHandler(handler_class):
+        protocol_version = "HTTP/1.1"
+
+        def handle(self):
+            self.close_connection = True
+            self.handle_one_request()
+
+    OneRequestHandler.__name__ = f"Async{handler_class.__name__}"
+    return OneRequestHandler
+
+
+class AsyncHTTPServer:
+    """Drop-in for SchedulerHTTPServer in run(): bind in the constructor, then serve_forever().
+
+    `clean_name` turns an event stream's ?project= into a project name, the way
+    the handler's routes do (safe_filename in server.py).
+    """
+
+    def __init__(self, server_address, handler_class, broker, workers=8, keepalive_timeout=15, queue_depth=64,
+                 clean_name=None):
+        self.server_address = server_address
+        self.handler_class = _one_request_handler(handler_class)
+        self.broker = broker
+        self.clean_name = clean_name
+        self.keepalive_timeout = keepalive_timeout
+        self.loop = asyncio.new_event_loop()
+        self.pool = BoundedExecutor(workers, queue_depth)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._on_connection, host=server_address[0] or None, port=server_address[1])
+            )
+        except BaseException:
+            self.pool.shutdown()
+            self.loop.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.server_close()
+
+    def serve_forever(self):
+        try:
+            self.loop.run_until_complete(self._server.serve_forever())
+        except asyncio.CancelledError:
+            pass  # shutdown() closed the server
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self._server.close)
+
+    def server_close(self):
+        self._server.close()
+        self.pool.shutdown(cancel_futures=True)
+        # Drop idle keep-alive connections and event streams instead of waiting for clients to leave
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    def detach(self, request):
+        pass  # Event streams never reach the handler in this mode
+
+    # --- Connections ---
+
+    async def _on_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername") or ("", 0)
+        buffer = bytearray()
+        try:
+            while True:
+                head_size = await self._read_head(reader, writer, buffer)
+                if head_size is None:
+                    break
+                head = bytes(buffer[:head_size])
+                method, target = self._request_target(head)
+                if method == "GET" and urlparse(target).path == "/api/events":
+                    await self._stream_events(head, target, reader, writer)
+                    break
+                # Receive a declared body here too, so a slow upload waits on the loop rather than in a worker.
+                # Larger bodies (which may be refused with 413) and Expect: 100-continue are left to the handler.
+                body_size = self._content_length(head)
+                if body_size <= PREFETCH_BODY_BYTES and b"100-continue" not in head.lower():
+                    while len(buffer) < head_size + body_size:
+                        if not await self._read_more(reader, buffer, BODY_READ_TIMEOUT):
+                            break
+                future = self.pool.submit(self._handle_request, reader, writer, buffer, peer)
+                if future is None:
+                    writer.write(overload_response("HTTP/1.1"))
+                    await writer.drain()
+                    break
+                keep_alive = await asyncio.wrap_future(future, loop=self.loop)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Server shutting down
+        finally:
+            writer.close()
+
+    async def _read_head(self, reader, writer, buffer):
+        """Wait (on the loop, not a thread) until buffer holds a full request head; returns its size"""
+        while True:
+            end = buffer.find(b"\r\n\r\n")
+            if end >= 0:
+                return end + 4
+            if len(buffer) > MAX_HEAD_BYTES:
+                writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\n"
+                             b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                return None
+            if not await self._read_more(reader, buffer, self.keepalive_timeout):
+                return None
+
+    @staticmethod
+    async def _read_more(reader, buffer, timeout):
+        try:
+            data = await asyncio.wait_for(reader.read(65536), timeout)
+        except asyncio.TimeoutError:
+            return False
+        buffer += data
+        return bool(data)
+
+    @staticmethod
+    def _request_target(head):
+        parts = head.split(b"\r\n", 1)[0].split()
+        if len(parts) < 2:
+            return None, ""
+        return parts[0].decode("latin-1"), parts[1].decode("latin-1")
+
+    @staticmethod
+    def _content_length(head):
+        for line in head.split(b"\r\n")[1:]:
+            key, _, value = line.partition(b":")
+            if key.strip().lower() == b"content-length":
+                try:
+                    return max(0, int(value.strip()))
+                except ValueError:
+                    return 0
+        return 0
+
+    def _handle_request(self, reader, writer, buffer, peer):
+        """Worker thread: run one request through the regular handler; returns whether to keep the connection"""
+        connection = _BridgeConnection(self.loop, reader, writer, buffer)
+        try:
+            handler = self.handler_class(connection, peer, self)
+        except Exception:
+            return False
+        return not handler.close_connection
+
+    # --- Event streams ---
+
+    async def _stream_events(self, head, target, reader, writer):
+        headers = http.client.parse_headers(io.BytesIO(head.split(b"\r\n", 1)[1]))
+        query = parse_qs(urlparse(target).query)
+        project = query.get("project", [None])[0]
+        if project and self.clean_name is not None:
+            project = self.clean_name(project)
+        last_event_id = headers.get("Last-Event-ID") or query.get("lastEventId", [None])[0]
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"X-Accel-Buffering: no\r\n"
+            b"Connection: close\r\n\r\n"
+            b"retry: 3000\n\n"
+        )
+
+        queue = asyncio.Queue()
+        loop = self.loop
+        token = self.broker.subscribe(lambda message: loop.call_soon_threadsafe(queue.put_nowait, message),
+                                      project, last_event_id)
+        # The client never sends anything on an event stream; a read completing means it went away
+        gone = asyncio.ensure_future(reader.read(1))
+        try:
+            while not gone.done():
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    message = b": ping\n\n"
+                writer.write(message)
+                if writer.transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG:
+                    break
+                await writer.drain()
+        finally:
+            self.broker.unsubscribe(token)
+            gone.cancel()
@@ -0,0 +1,214 @@
+"""
+Zip archives of the whole workspace (GET and POST /api/archive).
+
+An export is written straight into the response. zipfile gets a write-only
+sink without seek(), so it follows each member with a data descriptor instead
+of going back to patch its local header, and the sink is drained after every
+project: only one project is in memory at a time, whatever the size of the
+workspace. Projects are stored as projects/<name>.json with their stored
+bytes; manifest.json comes last, once the revisions actually read are known,
+and lists each project's revision, version, modification time and size.
+
+An import reads the uploaded archive from its spool file (a zip is indexed by
+the central directory at its end, so it can't be read front to back). Every
+member is checked before anything is written, name conflicts are resolved
+with the skip, overwrite or rename policy, and the documents are then handed
+to the store's save_many() one at a time.
+"""
+
+import json
+import posixpath
+import time
+import zipfile
+from datetime import datetime
+
+ARCHIVE_FORMAT = "quantum-scheduler-archive"
+ARCHIVE_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+PROJECTS_DIR = "projects/"
+
+CONFLICT_POLICIES = ("skip", "overwrite", "rename")
+
+
+class ArchiveError(Exception):
+    """An uploaded archive that can't be imported."""
+
+
+class _StreamSink:
+    """Write-only file object for ZipFile: keeps the output until take(), knows its position, can't seek"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def export_archive(store, progress=None):
+    """Zip of every project (newest first) as a sequence of byte pieces; progress(done, total) after each project"""
+    entries = store.list()[0]
+    sink = _StreamSink()
+    manifest = []
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for done, entry in enumerate(entries, 1):
+            name = entry["name"]
+            stored = store.read(name)
+            if stored is not None:  # else deleted since the listing
+                raw, revision = stored
+                modified = store.modified(name) or time.time()
+                info = zipfile.ZipInfo(PROJECTS_DIR + name + ".json", date_time=time.localtime(modified)[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, raw)
+                manifest.append({
+                    "name": name,
+                    "file": info.filename,
+                    "revision": revision,
+                    "version": entry.get("version", 1),
+                    "modified": modified,
+                    "size": len(raw),
+                })
+            if progress:
+                progress(done, len(entries))
+            yield sink.take()
+        archive.writestr(MANIFEST_NAME, json.dumps({
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "projects": manifest,
+        }, ensure_ascii=False, indent=2).encode("utf-8"))
+    yield sink.take()
+
+
+def open_archive(fileobj):
+    """ZipFile over an uploaded archive; raises ArchiveError if it isn't one"""
+    try:
+        return zipfile.ZipFile(fileobj)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ArchiveError(f"Not a zip archive: {e}")
+
+
+def project_members(archive, clean_name):
+    """(member, project name) for every *.json member except the manifest, in archive order.
+
+    Members are matched by file name only, so a zip of a list/ directory imports
+    as well as one written by export_archive(); clean_name sanitizes the names.
+    """
+    members = []
+    for info in archive.infolist():
+        base = posixpath.basename(info.filename.replace("\\", "/"))
+        if info.is_dir() or not base.endswith(".json") or base == MANIFEST_NAME:
+            continue
+        name = clean_name(base[:-len(".json")])
+        if name:
+            members.append((info, name))
+    return members
+
+
+def read_member(archive, info, max_bytes):
+    """The project document in a member; raises ArchiveError for an oversized, corrupt or non-project member"""
+    if info.file_size > max_bytes:
+        raise ArchiveError(f"{info.filename}: over the {max_bytes} byte project limit")
+    try:
+        with archive.open(info) as f:
+            doc = json.loads(f.read(max_bytes + 1).decode("utf-8"))
+    except (zipfile.BadZipFile, NotImplementedError, RuntimeError, OSError) as e:
+        raise ArchiveError(f"{info.filename}: {e}")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ArchiveError(f"{info.filename}: invalid JSON ({e})")
+    if not isinstance(doc, dict):
+        raise ArchiveError(f"{info.filename}: not a project document")
+    return doc
+
+
+def free_name(name, taken):
+    """name, or "name (2)", "name (3)", ... whichever isn't taken"""
+    candidate = name
+    n = 2
+    while candidate in taken:
+        candidate = f"{name} ({n})"
+        n += 1
+    return candidate
+
+
+def plan_import(names, existing, policy):
+    """(source name, target name or None, outcome) per member under a conflict policy.
+
+    A name counts as taken when it is already stored or an earlier member of the
+    archive claims it, so duplicates inside one archive follow the policy too.
+    Outcomes are created, overwritten, renamed and skipped.
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ArchiveError(f"Unknown conflict policy {policy!r} (expected one of {', '.join(CONFLICT_POLICIES)})")
+    taken = set(existing)
+    plan = []
+    for name in names:
+        if name not in taken:
+            plan.append((name, name, "created"))
+        elif policy == "skip":
+            plan.append((name, None, "skipped"))
+        elif policy == "overwrite":
+            plan.append((name, name, "overwritten"))
+        else:
+            target = free_name(name, taken)
+            plan.append((name, target, "renamed"))
+            name = target
+        taken.add(name)
+    return plan
+
+
+def import_archive(store, fileobj, policy, clean_name, max_bytes, origin=None, progress=None):
+    """Import an uploaded archive into the store; returns the per-project results and counts.
+
+    Nothing is written unless every member is a valid project. The plan is made
+    again while holding the locks of its target names, so a project created in
+    between is treated as the conflict it now is. progress(done, total) is
+    called after each project is handed to the store.
+    """
+    with open_archive(fileobj) as archive:
+        members = project_members(archive, clean_name)
+        for info, _ in members:
+            read_member(archive, info, max_bytes)
+
+        names = [name for _, name in members]
+        plan = plan_import(names, (e["name"] for e in store.list()[0]), policy)
+        while True:
+            targets = [target for _, target, _ in plan if target]
+            with store.locked(*targets):
+                fresh = plan_import(names, (e["name"] for e in store.list()[0]), policy)
+                if fresh != plan:
+                    plan = fresh
+                    continue
+
+                def documents():
+                    for done, ((info, _), (_, target, _)) in enumerate(zip(members, plan), 1):
+                        if target:
+                            yield target, read_member(archive, info, max_bytes)
+                        if progress:
+                            progress(done, len(plan))
+
+                saved = {name: changed for name, _, _, changed in store.save_many(documents(), origin=origin)}
+            break
+
+    results = []
+    counts = dict.fromkeys(("created", "overwritten", "renamed", "skipped", "unchanged"), 0)
+    for source, target, outcome in plan:
+        if outcome == "overwritten" and not saved.get(target, True):
+            outcome = "unchanged"
+        counts[outcome] += 1
+        results.append({"name": source, "savedAs": target, "result": outcome})
+    return {"policy": policy, "projects": results, "counts": counts}
@@ -0,0 +1,252 @@
+"""
+Request body ingestion with a size limit.
+
+Bodies are read in pieces into a SpooledTemporaryFile (memory up to
+SPOOL_MEMORY_BYTES, a temp file beyond that), from either a Content-Length or
+a chunked request, and decompressed on the fly for gzip Content-Encoding. A
+declared size over the limit is refused before anything is read, and a
+chunked or compressed body is cut off as soon as it crosses the limit. JSON is
+then parsed from the spool incrementally, so the decoded text in memory at
+once is one piece of the document rather than all of it.
+"""
+
+import io
+import json
+import tempfile
+import zlib
+
+try:
+    from .metrics import METRICS
+except ImportError:  # Running as a script (python server/server.py)
+    from metrics import METRICS
+
+
+# Bodies up to this size stay in memory while they are received
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+READ_BLOCK = 64 * 1024
+
+
+class RequestBodyError(Exception):
+    """A request body that can't be accepted; `status` is the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def declared_length(headers, max_bytes):
+    """Content-Length of the request, None for a chunked body; raises 413 when it is over max_bytes"""
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        return None
+    try:
+        length = int(headers.get("Content-Length", 0))
+    except ValueError:
+        raise RequestBodyError(400, "Invalid Content-Length")
+    if length < 0:
+        raise RequestBodyError(400, "Invalid Content-Length")
+    if length > max_bytes:
+        raise RequestBodyError(413, f"Request body over the {max_bytes} byte limit")
+    return length
+
+
+def _raw_pieces(rfile, length):
+    """The body as sent: `length` bytes, or the data of a chunked body"""
+    if length is not None:
+        remaining = length
+        while remaining > 0:
+            data = rfile.read(min(READ_BLOCK, remaining))
+            if not data:
+                raise RequestBodyError(400, "Request body ended early")
+            remaining -= len(data)
+            yield data
+        return
+
+    while True:
+        line = rfile.readline(1024)
+        if not line.endswith(b"\n"):
+            raise RequestBodyError(400, "Malformed chunked body")
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise RequestBodyError(400, "Malformed chunk size")
+        if size == 0:
+            # Skip trailers up to the blank line
+            while rfile.readline(1024) not in (b"\r\n", b"\n", b""):
+                pass
+            return
+        while size > 0:
+            data = rfile.read(min(READ_BLOCK, size))
+            if not data:
+                raise RequestBodyError(400, "Request body ended early")
+            size -= len(data)
+            yield data
+        rfile.readline(3)  # CRLF after the chunk data
+
+
+def spool_body(rfile, headers, max_bytes):
+    """Receive the request body into a SpooledTemporaryFile (rewound), decoding gzip Content-Encoding"""
+    length = declared_length(headers, max_bytes)
+    encoding = headers.get("Content-Encoding", "identity").strip().lower()
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(wbits=31)
+    elif encoding == "identity":
+        decompressor = None
+    else:
+        raise RequestBodyError(415, f"Unsupported Content-Encoding: {encoding}")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    received = 0
+    try:
+        for piece in _raw_pieces(rfile, length):
+            if decompressor is not None:
+                # Limit the inflated size too, so a small compressed body can't expand without bound
+                piece = decompressor.decompress(piece, max_bytes - received + 1)
+                if decompressor.unconsumed_tail:
+                    raise RequestBodyError(413, f"Request body over the {max_bytes} byte limit")
+            received += len(piece)
+            if received > max_bytes:
+                raise RequestBodyError(413, f"Request body over the {max_bytes} byte limit")
+            spool.write(piece)
+        if decompressor is not None:
+            spool.write(decompressor.flush())
+            if not decompressor.eof:
+                raise RequestBodyError(400, "Truncated gzip body")
+    except zlib.error as e:
+        spool.close()
+        raise RequestBodyError(400, f"Invalid gzip body: {e}")
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+# Containers at these levels (the document and the values of its fields) are parsed piece by piece;
+# anything deeper (say one task of "data") is handed to the json module whole
+STREAM_DEPTH = 2
+
+_WHITESPACE = " \t\n\r"
+
+_NUMBER_CHARS = "0123456789+-.eE"
+
+_DECODER = json.JSONDecoder()
+
+
+class _JsonStream:
+    """Incremental parser over decoded body text that only buffers the value it is working on.
+
+    The stdlib json module can't resume a partial document, so the outer
+    containers are walked here and every value inside them is decoded whole
+    by raw_decode() once enough text has been read.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self):
+        piece = self.text.read(READ_BLOCK)
+        if not piece:
+            self.eof = True
+        return piece
+
+    def peek(self):
+        """Next non-whitespace character (skipping the whitespace), "" at the end of the body"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ""
+            self.buffer, self.pos = self._read(), 0
+
+    def take(self, expected, message):
+        """Consume the next character, which has to be one of `expected`; returns it"""
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(message)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """One complete JSON value, reading as far as it needs"""
+        self.peek()
+        pieces = [self.buffer[self.pos:]]
+        size = len(pieces[0])
+        attempted = -1
+        while True:
+            # An incomplete value is retried only once the text has doubled, so decoding stays linear
+            if size >= 2 * attempted or self.eof:
+                text = "".join(pieces)
+                pieces = [text]
+                attempted = size
+                try:
+                    value, end = _DECODER.raw_decode(text)
+                except ValueError:
+                    if self.eof:
+                        raise
+                else:
+                    # A number cut off by the end of what was read ("1.", "2e") may go on in the next piece
+                    cut_off = (isinstance(value, (int, float)) and not isinstance(value, bool)
+                               and not text[end:].strip(_NUMBER_CHARS))
+                    if not cut_off or self.eof:
+                        self.buffer, self.pos = text[end:], 0
+                        return value
+            piece = self._read()
+            if piece:
+                pieces.append(piece)
+                size += len(piece)
+
+    def value(self, depth=0):
+        char = self.peek()
+        if depth >= STREAM_DEPTH or char not in ("{", "["):
+            return self.decode()
+        self.pos += 1
+        if char == "[":
+            items = []
+            if self.peek() == "]":
+                self.pos += 1
+                return items
+            while True:
+                items.append(self.value(depth + 1))
+                if self.take(",]", "Expecting ',' delimiter") == "]":
+                    return items
+        members = {}
+        if self.peek() == "}":
+            self.pos += 1
+            return members
+        while True:
+            if self.peek() != '"':
+                raise ValueError("Expecting property name enclosed in double quotes")
+            key = self.decode()
+            self.take(":", "Expecting ':' delimiter")
+            members[key] = self.value(depth + 1)
+            if self.take(",}", "Expecting ',' delimiter") == "}":
+                return members
+
+
+def read_json(rfile, headers, max_bytes):
+    """Receive and parse a JSON request body.
+
+    The body is spooled first (so a slow upload never holds parsed state), then
+    parsed from the spool in READ_BLOCK pieces: the text held at once is about
+    one element of a top-level field, such as one root task of "data", rather
+    than the whole body.
+    """
+    with spool_body(rfile, headers, max_bytes) as spool:
+        text = io.TextIOWrapper(spool, encoding="utf-8")
+        try:
+            with METRICS.timed("parse"):
+                stream = _JsonStream(text)
+                value = stream.value()
+                if stream.peek():
+                    raise ValueError("Extra data after the JSON value")
+                return value
+        except (ValueError, UnicodeDecodeError) as e:
+            raise RequestBodyError(400, f"Invalid JSON body: {e}")
+        finally:
+            text.detach()
@@ -0,0 +1,49 @@
+"""
+In-memory LRU cache of project bodies, bounded by total bytes.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class ProjectCache:
+    """Maps project name -> (raw bytes, revision), evicting least recently used entries."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+            return entry
+
+    def put(self, name, raw, revision):
+        # Entries bigger than the whole budget would only evict everything else
+        if len(raw) > self.max_bytes:
+            self.invalidate(name)
+            return
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[name] = (raw, revision)
+            self._size += len(raw)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, name):
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._size -= len(old[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -0,0 +1,221 @@
+"""
+Server-Sent Events change feed.
+
+EventBroker fans project change notifications out to subscribers. Event-stream
+connections accepted by the threaded server are handed to a single SocketFanout
+thread that multiplexes all of them with a selector, so dozens of idle browser
+tabs cost a file descriptor each rather than a thread each.
+"""
+
+import json
+import logging
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+# Comment line sent to idle streams so proxies and phones don't drop them
+HEARTBEAT_SECONDS = 20
+
+# A client that falls this far behind (bytes queued) is disconnected; EventSource reconnects
+MAX_CLIENT_BACKLOG = 512 * 1024
+
+
+def format_event(event_id, event, data):
+    """Encode one SSE message"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class EventBroker:
+    """Numbered change events with a short replay history for reconnecting clients."""
+
+    def __init__(self, history=256):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._history = deque(maxlen=history)
+        self._subscribers = {}
+        self._next_token = 1
+        self._fanout = None
+
+    def publish(self, event, project, data):
+        """Send an event about `project` (None for workspace-wide events) to every matching subscriber"""
+        # A rename concerns subscribers of either name
+        projects = None if project is None else {project, data.get("newName", project)}
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            message = format_event(event_id, event, dict(data, project=project))
+            self._history.append((event_id, projects, message))
+            targets = [
+                deliver for deliver, wanted in self._subscribers.values()
+                if wanted is None or projects is None or wanted in projects
+            ]
+        for deliver in targets:
+            deliver(message)
+
+    def subscribe(self, deliver, project=None, last_event_id=None):
+        """Register deliver(message_bytes); missed events after last_event_id are replayed first.
+
+        Returns a token for unsubscribe(). deliver is called from the publishing thread
+        and must not block.
+        """
+        with self._lock:
+            backlog = []
+            if last_event_id is not None:
+                oldest = self._history[0][0] if self._history else self._next_id
+                if last_event_id + 1 < oldest:
+                    # Too far behind to replay: tell the client to reload what it shows
+                    backlog.append(format_event(self._next_id - 1, "reset", {"project": project}))
+                else:
+                    backlog.extend(
+                        message for event_id, projects, message in self._history
+                        if event_id > last_event_id and (project is None or projects is None or project in projects)
+                    )
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (deliver, project)
+        for message in backlog:
+            deliver(message)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def attach_socket(self, sock, project=None, last_event_id=None):
+        """Hand an event-stream connection (headers already sent) over to the fan-out thread"""
+        with self._lock:
+            if self._fanout is None:
+                self._fanout = SocketFanout(self)
+        self._fanout.add(sock, project, last_event_id)
+
+
+class _StreamClient:
+    def __init__(self, sock):
+        self.sock = sock
+        # Kept from registration: once the socket is closed, sock.fileno() is -1
+        self.fd = sock.fileno()
+        self.buffer = bytearray()
+        self.token = None
+        self.dropped = False
+
+
+class SocketFanout:
+    """One thread writing events to every attached socket without blocking on slow readers."""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.selector = selectors.DefaultSelector()
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = threading.Thread(target=self._run, name="event-fanout", daemon=True)
+        self._thread.start()
+
+    def add(self, sock, project, last_event_id):
+        sock.setblocking(False)
+        client = _StreamClient(sock)
+        with self._lock:
+            self._clients[client.fd] = client
+        client.token = self.broker.subscribe(lambda message: self._enqueue(client, message), project, last_event_id)
+        self._wake()
+
+    def _enqueue(self, client, message):
+        with self._lock:
+            client.buffer += message
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Already pending a wakeup
+
+    def _drop(self, client):
+        with self._lock:
+            if client.dropped:
+                return
+            client.dropped = True
+            # The fd may already belong to a newer connection once this socket is closed
+            if self._clients.get(client.fd) is client:
+                del self._clients[client.fd]
+        self.broker.unsubscribe(client.token)
+        key = self.selector.get_map().get(client.fd)
+        if key is not None and key.data is client:
+            self.selector.unregister(client.fd)
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+
+    def _run(self):
+        last_beat = time.monotonic()
+        while True:
+            # Register interest: always read (to notice disconnects), write only when data is queued
+            with self._lock:
+                clients = list(self._clients.values())
+            for client in clients:
+                mask = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.buffer else 0)
+                try:
+                    self.selector.modify(client.sock, mask, client)
+                except KeyError:
+                    self.selector.register(client.sock, mask, client)
+                except (ValueError, OSError):
+                    self._drop(client)
+
+            for key, mask in self.selector.select(timeout=HEARTBEAT_SECONDS):
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                client = key.data
+                if mask & selectors.EVENT_READ:
+                    try:
+                        if not client.sock.recv(4096):
+                            self._drop(client)
+                            continue
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                    except OSError:
+                        self._drop(client)
+                        continue
+                if mask & selectors.EVENT_WRITE:
+                    self._send(client)
+
+            if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                last_beat = time.monotonic()
+                with self._lock:
+                    for client in self._clients.values():
+                        client.buffer += b": ping\n\n"
+
+    def _send(self, client):
+        with self._lock:
+            data = bytes(client.buffer)
+        try:
+            sent = client.sock.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(client)
+            return
+        with self._lock:
+            del client.buffer[:sent]
+            backlog = len(client.buffer)
+        if backlog > MAX_CLIENT_BACKLOG:
+            log.warning("Dropping slow event stream client (%d bytes behind).", backlog)
+            self._drop(client)
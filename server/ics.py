@@ -0,0 +1,108 @@
+"""
+iCalendar (RFC 5545) feed of a project's schedule (the Python side of exportToICS() in ui.js).
+
+Every task segment becomes an all-day VEVENT, walking the tree in display
+order. Text is escaped the way exportToICS() escapes it, lines end in CRLF and
+are folded at 75 octets, and each event gets a UID built from the node and
+segment ids so calendar apps that subscribe to the feed update events in
+place instead of duplicating them.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+try:
+    from .project_index import project_start_date
+except ImportError:  # Running as a script (python server/server.py)
+    from project_index import project_start_date
+
+
+PRODID = "-//Quantum Scheduler//KR"
+
+# Suggested polling interval for subscribed calendars
+REFRESH_INTERVAL = "PT15M"
+
+
+def escape_text(text):
+    """RFC 5545 TEXT: backslash, semicolon and comma escaped, line breaks as a literal \\n"""
+    return (
+        str(text)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line):
+    """Split a content line into 75-octet pieces (continuations start with a space), never inside a character"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Back off to the start of a UTF-8 sequence
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        pieces.append(encoded[start:end].decode("utf-8"))
+        start = end
+        limit = 74  # the leading space counts
+    return "\r\n ".join(pieces)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _ical_date(day):
+    return day.strftime("%Y%m%d")
+
+
+def build_calendar(doc, name, modified=None):
+    """The project as a VCALENDAR (UTF-8 bytes); `modified` (epoch seconds) becomes each event's DTSTAMP"""
+    stamp = datetime.fromtimestamp(modified or 0, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    base = project_start_date(doc)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+    ]
+
+    # Offsets are meaningless without a start date, so such a project is an empty calendar
+    roots = [n for n in (doc.get("data") or []) if isinstance(n, dict)] if base else []
+    stack = list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        for index, seg in enumerate(node.get("segments") or []):
+            if not isinstance(seg, dict) or not _is_number(seg.get("startOffset")) or not _is_number(seg.get("duration")):
+                continue
+            try:
+                start = base + timedelta(days=int(seg["startOffset"]))
+                # DTEND is exclusive and has to come after DTSTART
+                end = start + timedelta(days=max(1, int(seg["duration"])))
+            except (OverflowError, ValueError):
+                continue  # Past the calendar (year 1..9999), infinite or NaN
+            uid = f"{node.get('id')}-{seg.get('id', index)}-{name}"
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{escape_text(uid)}@quantum-scheduler",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART;VALUE=DATE:{_ical_date(start)}",
+                f"DTEND;VALUE=DATE:{_ical_date(end)}",
+                f"SUMMARY:{escape_text(seg.get('label') or node.get('name') or 'Task')}",
+            ]
+            if seg.get("memo"):
+                lines.append(f"DESCRIPTION:{escape_text(seg['memo'])}")
+            lines.append("END:VEVENT")
+        stack.extend(reversed([c for c in (node.get("children") or []) if isinstance(c, dict)]))
+
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(fold_line(line) for line in lines) + "\r\n").encode("utf-8")
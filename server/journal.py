@@ -0,0 +1,235 @@
+"""
+Append-only project journals (QS_STORAGE_FORMAT=journal).
+
+A journaled project is stored as <name>.jsonl, one JSON record per line. Each
+record is either a full snapshot ("doc") or a JSON Patch against the previous
+version ("patch"). A save appends a single line, so its disk cost follows the
+size of the change. Each line carries the version number the store gave the
+save, and saves batched into one write-behind flush still get a line each. A
+fresh snapshot is appended once the patches since the last one outgrow it,
+which keeps replay cheap. Any retained version is rebuilt by replaying patches
+from the nearest earlier snapshot. Compaction rewrites the file without the
+versions that fall outside the retention window.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from .jsonpatch import apply_patch, diff
+    from .metrics import METRICS
+except ImportError:  # Running as a script (python server/server.py)
+    from jsonpatch import apply_patch, diff
+    from metrics import METRICS
+
+
+JOURNAL_EXTENSION = ".jsonl"
+
+# Journals whose current document stays parsed in memory, so an append doesn't re-read the file
+HEAD_CACHE_SIZE = 64
+
+
+def _compact_json(doc):
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _encode_record(record):
+    return _compact_json(record) + b"\n"
+
+
+def read_records(path):
+    """All records of a journal file; a torn last line (crash mid-append) is ignored"""
+    with open(path, "rb") as f:
+        lines = f.read().split(b"\n")
+    records = []
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            if number >= len(lines) - 2:
+                break
+            raise
+    return records
+
+
+def _repair_tail(path):
+    """Cut off a partial last line so the next append starts on a fresh line"""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def replay(records, version=None):
+    """Document at `version` (default: the latest), or None if that version isn't retained"""
+    start = None
+    for i, record in enumerate(records):
+        if version is not None and record["version"] > version:
+            break
+        if "doc" in record:
+            start = i
+    if start is None:
+        return None
+    doc = records[start]["doc"]
+    for record in records[start + 1:]:
+        if version is not None and record["version"] > version:
+            break
+        doc = record["doc"] if "doc" in record else apply_patch(doc, record["patch"])
+    return doc
+
+
+class _Head:
+    """Latest state of one journal file"""
+
+    __slots__ = ("version", "doc", "since_snapshot", "snapshot_bytes", "records")
+
+    def __init__(self, version=0, doc=None, snapshot_bytes=0, since_snapshot=0, records=0):
+        self.version = version
+        self.doc = doc
+        self.snapshot_bytes = snapshot_bytes
+        self.since_snapshot = since_snapshot
+        self.records = records
+
+    @classmethod
+    def from_records(cls, records, sizes):
+        last_snapshot = max(i for i, r in enumerate(records) if "doc" in r)
+        return cls(records[-1]["version"], replay(records), sizes[last_snapshot], sum(sizes[last_snapshot + 1:]),
+                   len(records))
+
+
+class ProjectJournal:
+    """Reads and appends <name>.jsonl journals; callers hold the project's lock."""
+
+    def __init__(self, history_keep=200):
+        self.history_keep = history_keep
+        self._heads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _head(self, path):
+        with self._lock:
+            head = self._heads.get(path)
+            if head is not None:
+                self._heads.move_to_end(path)
+                return head
+        if not os.path.exists(path):
+            return None
+        _repair_tail(path)
+        records = read_records(path)
+        if not records:
+            return None
+        head = _Head.from_records(records, [len(_encode_record(r)) for r in records])
+        self._remember(path, head)
+        return head
+
+    def _remember(self, path, head):
+        with self._lock:
+            self._heads[path] = head
+            self._heads.move_to_end(path)
+            while len(self._heads) > HEAD_CACHE_SIZE:
+                self._heads.popitem(last=False)
+
+    def forget(self, path):
+        """Drop cached state after the file was moved, removed or rewritten"""
+        with self._lock:
+            self._heads.pop(path, None)
+
+    # --- Reads ---
+
+    def read(self, path):
+        """Compact JSON bytes of the latest version"""
+        head = self._head(path)
+        if head is None:
+            raise FileNotFoundError(path)
+        return _compact_json(head.doc)
+
+    def version(self, path):
+        """Newest version recorded in the journal, 0 if there is none"""
+        head = self._head(path)
+        return head.version if head else 0
+
+    def read_version(self, path, version):
+        """(JSON bytes, revision) of an older version, or None if it isn't retained"""
+        records = read_records(path)
+        revision = next((r.get("revision") for r in records if r["version"] == version), None)
+        doc = replay(records, version) if revision is not None else None
+        if doc is None:
+            return None
+        return _compact_json(doc), revision
+
+    def history(self, path):
+        """Retained versions, newest first"""
+        entries = []
+        for record in read_records(path):
+            entries.append({
+                "version": record["version"],
+                "revision": record.get("revision"),
+                "time": record.get("time"),
+                "kind": "snapshot" if "doc" in record else "patch",
+                "changes": len(record["patch"]) if "patch" in record else None,
+            })
+        entries.reverse()
+        return entries
+
+    # --- Writes ---
+
+    def append(self, path, saves):
+        """Record each (raw compact JSON, revision, version) of `saves` in order, with one fsync for all of them.
+
+        Versions are the ones the store handed out, so every version a save was
+        answered with can be read back; returns the last one recorded.
+        """
+        head = self._head(path)
+        # Worked out on a copy; the cached head only moves once the lines are on disk
+        new = _Head(head.version, head.doc, head.snapshot_bytes, head.since_snapshot, head.records) if head else _Head()
+        lines = []
+        for raw, revision, version in saves:
+            doc = json.loads(raw.decode("utf-8"))
+            # Never behind what the file already holds (journals written before versions came from the store)
+            record = {"version": max(version, new.version + 1), "time": round(time.time(), 3), "revision": revision}
+            line = None
+            if new.doc is not None and new.since_snapshot < new.snapshot_bytes:
+                operations = diff(new.doc, doc)
+                # Only keep the patch if replaying it reproduces the exact bytes (key order included);
+                # apply_patch works in place, so it gets a copy
+                if _compact_json(apply_patch(copy.deepcopy(new.doc), operations)) == raw:
+                    line = _encode_record(dict(record, patch=operations))
+            if line is None:
+                line = _encode_record(dict(record, doc=doc))
+                new.snapshot_bytes, new.since_snapshot = len(line), 0
+            else:
+                new.since_snapshot += len(line)
+            lines.append(line)
+            new.version, new.doc, new.records = record["version"], doc, new.records + 1
+
+        try:
+            with open(path, "ab") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                with METRICS.timed("fsync"):
+                    os.fsync(f.fileno())
+        except BaseException:
+            # Part of it may have reached the file; the next read repairs the tail and starts from disk
+            self.forget(path)
+            raise
+        self._remember(path, new)
+        return new.version
+
+    def needs_compaction(self, path):
+        head = self._head(path)
+        return head is not None and head.records > 2 * self.history_keep
+
+    def compacted(self, path):
+        """Journal contents without versions beyond the retention window, or None if nothing to drop"""
+        records = read_records(path)
+        if len(records) <= self.history_keep:
+            return None
+        kept = records[-self.history_keep:]
+        first = {k: v for k, v in kept[0].items() if k != "patch"}
+        first["doc"] = replay(records, first["version"])
+        return b"".join(_encode_record(r) for r in [first] + kept[1:])
@@ -0,0 +1,167 @@
+"""
+JSON Patch (RFC 6902) support for incremental project saves.
+"""
+
+import copy
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch cannot be applied to the document as it stands (a path is missing, a test fails)."""
+
+
+class InvalidPatchError(JsonPatchError):
+    """Raised when the patch document itself is malformed, whatever it is applied to."""
+
+
+def _parse_pointer(pointer):
+    """Split an RFC 6901 JSON pointer into unescaped reference tokens"""
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise InvalidPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _array_index(container, token, allow_end=False):
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    limit = len(container) + (1 if allow_end else 0)
+    if index >= limit:
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(doc, tokens):
+    """Walk to the container holding the last token"""
+    target = doc
+    for token in tokens:
+        if isinstance(target, list):
+            target = target[_array_index(target, token)]
+        elif isinstance(target, dict):
+            if token not in target:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            target = target[token]
+        else:
+            raise JsonPatchError(f"Cannot traverse into scalar at /{'/'.join(tokens)}")
+    return target
+
+
+def _get(doc, tokens):
+    if not tokens:
+        return doc
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, list):
+        return parent[_array_index(parent, key)]
+    if isinstance(parent, dict) and key in parent:
+        return parent[key]
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def _add(doc, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_array_index(parent, key, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[key] = value
+    else:
+        raise JsonPatchError(f"Cannot add into scalar at /{'/'.join(tokens)}")
+    return doc
+
+
+def _remove(doc, tokens):
+    if not tokens:
+        raise InvalidPatchError("Cannot remove the document root")
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, key))
+    if isinstance(parent, dict) and key in parent:
+        return parent.pop(key)
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_patch(doc, operations):
+    """Apply a list of RFC 6902 operations to doc (mutated in place) and return the result"""
+    if not isinstance(operations, list):
+        raise InvalidPatchError("Patch must be a JSON array of operations")
+
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise InvalidPatchError(f"Malformed operation: {operation!r}")
+        op = operation["op"]
+        tokens = _parse_pointer(operation["path"])
+
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise InvalidPatchError(f"'{op}' operation requires a value")
+
+        if op == "add":
+            doc = _add(doc, tokens, operation["value"])
+        elif op == "remove":
+            _remove(doc, tokens)
+        elif op == "replace":
+            if not tokens:
+                doc = operation["value"]
+            else:
+                parent = _resolve(doc, tokens[:-1])
+                key = tokens[-1]
+                if isinstance(parent, list):
+                    parent[_array_index(parent, key)] = operation["value"]
+                elif isinstance(parent, dict) and key in parent:
+                    parent[key] = operation["value"]
+                else:
+                    raise JsonPatchError(f"Path not found: {operation['path']}")
+        elif op == "move":
+            source = _parse_pointer(operation.get("from"))
+            if tokens[:len(source)] == source and tokens != source:
+                raise InvalidPatchError("Cannot move a value into one of its children")
+            value = _remove(doc, source)
+            doc = _add(doc, tokens, value)
+        elif op == "copy":
+            value = copy.deepcopy(_get(doc, _parse_pointer(operation.get("from"))))
+            doc = _add(doc, tokens, value)
+        elif op == "test":
+            if _get(doc, tokens) != operation["value"]:
+                raise JsonPatchError(f"Test failed at {operation['path']}")
+        else:
+            raise InvalidPatchError(f"Unknown operation: {op!r}")
+
+    return doc
+
+
+def _escape(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def diff(before, after, path="", operations=None):
+    """RFC 6902 operations that turn before into after (same shape as diffDocuments in persistence.js)"""
+    if operations is None:
+        operations = []
+    if isinstance(before, list) and isinstance(after, list):
+        common = min(len(before), len(after))
+        for i in range(common):
+            diff(before[i], after[i], f"{path}/{i}", operations)
+        for i in range(common, len(after)):
+            operations.append({"op": "add", "path": f"{path}/{i}", "value": after[i]})
+        # Remove from the end so earlier indexes stay valid
+        for i in range(len(before) - 1, common - 1, -1):
+            operations.append({"op": "remove", "path": f"{path}/{i}"})
+    elif isinstance(before, dict) and isinstance(after, dict):
+        for key in before:
+            if key not in after:
+                operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in after.items():
+            if key not in before:
+                operations.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                diff(before[key], value, f"{path}/{_escape(key)}", operations)
+    # type() check so that 1 -> true or 1 -> 1.0 still counts as a change
+    elif type(before) is not type(after) or before != after:
+        operations.append({"op": "replace", "path": path, "value": after})
+    return operations
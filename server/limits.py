@@ -0,0 +1,156 @@
+"""
+Load limits: a bounded request pool and per-client write throttling.
+
+Both HTTP engines hand requests to a BoundedExecutor, a fixed number of
+worker threads with a queue of limited depth. When every worker is busy and
+the queue is full, submit() refuses the request instead of starting another
+thread or queueing without end, and the engine answers 503 with Retry-After
+straight away, without reading the request. Project writes are additionally
+metered per client address by a RateLimiter (token buckets), so one client
+looping on saves is answered with 429 before it reaches the disk.
+"""
+
+import json
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Seconds a client is told to wait after a 503
+OVERLOAD_RETRY_SECONDS = 2
+
+# Client buckets kept; the least recently seen are dropped beyond this (a dropped bucket starts full again)
+MAX_CLIENTS = 10000
+
+
+class BoundedExecutor:
+    """Worker threads that refuse work rather than queue more than `queue_depth` requests.
+
+    Workers are started as load first needs them and are daemon threads (like
+    ThreadingHTTPServer's per-connection threads), so a stalled client never
+    holds up process exit.
+    """
+
+    def __init__(self, workers, queue_depth, thread_name_prefix="http-worker"):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self.thread_name_prefix = thread_name_prefix
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = 0
+        self._closed = False
+        self.rejected = 0
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on a worker; returns its Future, or None when every worker is busy and the queue is full"""
+        with self._lock:
+            if self._closed or self._pending >= self.workers + self.queue_depth:
+                self.rejected += 1
+                return None
+            self._pending += 1
+            if len(self._threads) < min(self._pending, self.workers):
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f"{self.thread_name_prefix}-{len(self._threads)}")
+                self._threads.append(thread)
+                thread.start()
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending
+            rejected = self.rejected
+        return {
+            "workers": self.workers,
+            "queueDepth": self.queue_depth,
+            "busy": min(pending, self.workers),
+            "queued": max(0, pending - self.workers),
+            "rejected": rejected,
+        }
+
+    def shutdown(self, cancel_futures=False):
+        """Stop taking work; queued requests are cancelled if asked, running ones finish on their own"""
+        with self._lock:
+            self._closed = True
+            threads = len(self._threads)
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+                    with self._lock:
+                        self._pending -= 1
+        for _ in range(threads):
+            self._queue.put(None)
+
+
+class RateLimiter:
+    """Token bucket per key: up to `burst` requests at once, refilled at `rate` per second (rate 0: no limit)."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        # key -> (tokens, monotonic time of the last update), least recently used first
+        self._buckets = OrderedDict()
+        self.limited = 0
+
+    def acquire(self, key):
+        """Take a token for key; returns 0 if allowed, else the seconds until the next token"""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+                self.limited += 1
+            while len(self._buckets) > MAX_CLIENTS:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def overload_response(protocol="HTTP/1.0"):
+    """Complete 503 response for a request the pool had no room for"""
+    body = json.dumps({"success": False, "error": "Server busy, retry later",
+                       "retryAfter": OVERLOAD_RETRY_SECONDS}).encode("utf-8")
+    return (
+        f"{protocol} 503 Service Unavailable\r\n"
+        f"Retry-After: {OVERLOAD_RETRY_SECONDS}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def retry_after(wait):
+    """Retry-After value (whole seconds, at least 1) for a wait in seconds"""
+    return max(1, math.ceil(wait))
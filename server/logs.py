@@ -0,0 +1,209 @@
+"""
+Queued logging for the server process.
+
+Request threads never write log output themselves: records go onto a bounded
+queue through a QueueHandler (if the queue is full the record is counted and
+dropped rather than blocking the request). One writer thread drains the queue
+in batches, hands each record to the console and/or file handlers and flushes
+once per batch. The log file rotates by size (or by time with
+QS_LOG_ROTATE), and records can be written as text or as JSON lines carrying
+their structured fields (route, status, duration, bytes for the access log).
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime
+
+# Records waiting for the writer; beyond this, new records are dropped instead of blocking
+QUEUE_SIZE = 10000
+
+# Records handled per flush
+BATCH_MAX = 256
+
+TEXT_FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+
+# LogRecord attributes that aren't structured `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Requests are logged here (INFO) when the access log is on
+ACCESS_LOG = logging.getLogger("access")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _BatchFlush:
+    """StreamHandler.emit flushes after every record; while a batch is written that waits for the end"""
+
+    batching = False
+
+    def flush(self):
+        if not self.batching:
+            super().flush()
+
+
+class BatchStreamHandler(_BatchFlush, logging.StreamHandler):
+    pass
+
+
+class BatchRotatingFileHandler(_BatchFlush, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class BatchTimedRotatingFileHandler(_BatchFlush, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the logging thread: records that don't fit in the queue are counted and dropped"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(threading.Thread):
+    """The single thread that writes queued records to the real handlers"""
+
+    _STOP = object()
+
+    def __init__(self, log_queue, handlers, queue_handler):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.handlers = handlers
+        self.queue_handler = queue_handler
+        self._reported_drops = 0
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._STOP in batch:
+                stopping = True
+                batch = [r for r in batch if r is not self._STOP]
+            self._write(batch)
+
+    def _write(self, batch):
+        dropped = self.queue_handler.dropped
+        if dropped != self._reported_drops:
+            batch.append(logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Log queue full, dropped {dropped - self._reported_drops} records",
+            }))
+            self._reported_drops = dropped
+        for handler in self.handlers:
+            handler.batching = True
+        try:
+            for record in batch:
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+        finally:
+            for handler in self.handlers:
+                handler.batching = False
+                handler.flush()
+
+    def stop(self):
+        """Write what is still queued, then end the thread"""
+        self.queue.put(self._STOP)
+        self.join(timeout=5)
+        for handler in self.handlers:
+            handler.close()
+
+
+class _LoggerStream:
+    """File-like stand-in for sys.stderr without a console: each line becomes an ERROR record"""
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.logger.error(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+_writer = None
+
+
+def setup_queued_logging(level="INFO", access_log=False, log_file=None, max_bytes=10 * 1024 * 1024, backups=5,
+                         rotate_when="", json_format=False, console=True):
+    """Route all logging through the queue; returns the LogWriter (also stopped by shutdown_logging())"""
+    global _writer
+    if _writer is not None:
+        return _writer
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if console and sys.stdout is not None:
+        handlers.append(BatchStreamHandler(sys.stdout))
+    if log_file:
+        if rotate_when:
+            handlers.append(BatchTimedRotatingFileHandler(
+                log_file, when=rotate_when, backupCount=backups, encoding="utf-8", delay=True))
+        else:
+            handlers.append(BatchRotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    # The access log is one record per request, so it only passes the queue when asked for
+    ACCESS_LOG.setLevel(logging.INFO if access_log else logging.WARNING)
+
+    if not console or sys.stderr is None:
+        # Tracebacks that code outside logging writes to stderr end up in the log file
+        sys.stderr = _LoggerStream(logging.getLogger("stderr"))
+
+    _writer = LogWriter(log_queue, handlers, queue_handler)
+    _writer.start()
+    return _writer
+
+
+def shutdown_logging():
+    """Flush and close the log handlers"""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
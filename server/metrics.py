@@ -0,0 +1,274 @@
+"""
+Request and storage metrics (GET /api/metrics).
+
+Every request handled by SchedulerHandler is recorded per method and route:
+count by status, a latency histogram, request and response body size
+histograms and the number of requests in flight. Storage code times its
+parse, serialize and fsync steps through METRICS.timed(). Histograms use fixed
+buckets, so recording a sample is one bisect and a few additions under a lock.
+The registry renders as Prometheus text or as a JSON snapshot with estimated
+percentiles.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+class Histogram:
+    """Counts per bucket (upper bounds `buckets`, plus +Inf), with the sum, count, min and max"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Estimate by linear interpolation inside the bucket the rank falls in, kept within [min, max]"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        estimate = self.max
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = self.buckets[i - 1] if i > 0 else 0
+                high = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = low + (high - low) * (rank - seen) / n
+                break
+            seen += n
+        return min(max(estimate, self.min), self.max)
+
+    def cumulative(self):
+        """(upper bound, count <= bound) pairs as Prometheus expects them, ending with +Inf"""
+        total = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            total += n
+            yield bound, total
+
+
+class _Route:
+    __slots__ = ("statuses", "errors", "latency", "request_bytes", "response_bytes")
+
+    def __init__(self):
+        self.statuses = {}
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+
+
+class Metrics:
+    """Process-wide registry; use the METRICS instance below."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.in_flight = 0
+        self._routes = {}
+        self._storage = {}
+
+    # --- Recording ---
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method, route, status, seconds, request_bytes, response_bytes):
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _Route()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status >= 500:
+                stats.errors += 1
+            stats.latency.observe(seconds)
+            stats.request_bytes.observe(request_bytes)
+            stats.response_bytes.observe(response_bytes)
+
+    def observe_storage(self, operation, seconds):
+        with self._lock:
+            histogram = self._storage.get(operation)
+            if histogram is None:
+                histogram = self._storage[operation] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, operation):
+        """Time a storage step (parse, serialize, fsync, ...)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_storage(operation, time.perf_counter() - started)
+
+    # --- Output ---
+
+    def snapshot(self):
+        """JSON-friendly view: totals, then per route and per storage operation"""
+        with self._lock:
+            routes = []
+            for (method, route), stats in sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0])):
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "requests": stats.latency.count,
+                    "errors": stats.errors,
+                    "statuses": {str(code): n for code, n in sorted(stats.statuses.items())},
+                    "latencyMs": _percentiles(stats.latency, 1000),
+                    "requestBytes": {"total": int(stats.request_bytes.sum), **_percentiles(stats.request_bytes)},
+                    "responseBytes": {"total": int(stats.response_bytes.sum), **_percentiles(stats.response_bytes)},
+                })
+            storage = {
+                operation: dict(count=h.count, **_percentiles(h, 1000))
+                for operation, h in sorted(self._storage.items())
+            }
+            in_flight = self.in_flight
+        return {
+            "uptimeSeconds": round(time.time() - self.started, 1),
+            "inFlight": in_flight,
+            "requests": sum(r["requests"] for r in routes),
+            "errors": sum(r["errors"] for r in routes),
+            "routes": routes,
+            "storageMs": storage,
+        }
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, labels, h):
+            for bound, total in h.cumulative():
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+            lines.append(f"{name}_sum{{{labels}}} {_number(h.sum)}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+            header("qs_uptime_seconds", "gauge", "Seconds since the server started.")
+            lines.append(f"qs_uptime_seconds {_number(round(time.time() - self.started, 3))}")
+            header("qs_http_requests_in_flight", "gauge", "Requests currently being handled.")
+            lines.append(f"qs_http_requests_in_flight {self.in_flight}")
+
+            header("qs_http_requests_total", "counter", "Requests handled, by method, route and status.")
+            for (method, route), stats in routes:
+                for status, n in sorted(stats.statuses.items()):
+                    lines.append(f'qs_http_requests_total{{{_labels(method, route)},status="{status}"}} {n}')
+            header("qs_http_request_errors_total", "counter", "Requests answered with a 5xx status.")
+            for (method, route), stats in routes:
+                lines.append(f"qs_http_request_errors_total{{{_labels(method, route)}}} {stats.errors}")
+
+            header("qs_http_request_duration_seconds", "histogram", "Time to handle a request.")
+            for (method, route), stats in routes:
+                histogram("qs_http_request_duration_seconds", _labels(method, route), stats.latency)
+            header("qs_http_request_body_bytes", "histogram", "Request body bytes received.")
+            for (method, route), stats in routes:
+                histogram("qs_http_request_body_bytes", _labels(method, route), stats.request_bytes)
+            header("qs_http_response_bytes", "histogram", "Response bytes sent, headers included.")
+            for (method, route), stats in routes:
+                histogram("qs_http_response_bytes", _labels(method, route), stats.response_bytes)
+
+            header("qs_storage_operation_seconds", "histogram", "Time spent in storage steps.")
+            for operation, h in sorted(self._storage.items()):
+                histogram("qs_storage_operation_seconds", f'operation="{_escape(operation)}"', h)
+        return "\n".join(lines) + "\n"
+
+
+def _percentiles(histogram, scale=1):
+    values = {}
+    for key, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        value = histogram.percentile(fraction)
+        values[key] = None if value is None else round(value * scale, 3)
+    return values
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(method, route):
+    return f'method="{_escape(method)}",route="{_escape(route)}"'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class CountingReader:
+    """rfile wrapper that counts the bytes read through it"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+
+    def read(self, *args):
+        data = self._raw.read(*args)
+        self.count += len(data)
+        return data
+
+    def read1(self, *args):
+        data = self._raw.read1(*args)
+        self.count += len(data)
+        return data
+
+    def readline(self, *args):
+        data = self._raw.readline(*args)
+        self.count += len(data)
+        return data
+
+    def readinto(self, buffer):
+        n = self._raw.readinto(buffer)
+        self.count += n or 0
+        return n
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class CountingWriter:
+    """wfile wrapper that counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self._raw.write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+METRICS = Metrics()
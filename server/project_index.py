@@ -0,0 +1,272 @@
+"""
+In-memory index of project metadata, persisted to a small sidecar file.
+
+Listing projects reads this index instead of stat-ing every file. On startup the
+sidecar is reconciled against the directory: files whose name, size and mtime
+still match keep their stored metadata, everything else is re-read once. The
+sidecar also keeps the tombstones of deleted projects, so ?since= listings
+report deletions from before a restart.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+try:
+    from .storage import atomic_write, content_revision, project_name_from_file
+except ImportError:  # Running as a script (python server/server.py)
+    from storage import atomic_write, content_revision, project_name_from_file
+
+log = logging.getLogger(__name__)
+
+
+# Deleted names are remembered this long so ?since= clients can drop them
+TOMBSTONE_SECONDS = 7 * 24 * 3600
+
+
+def project_start_date(doc):
+    """Local calendar date that segment offsets count from (startDate is stored as an ISO timestamp)"""
+    value = doc.get("startDate") if isinstance(doc, dict) else None
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # The browser saves local midnight via toISOString(), i.e. in UTC; convert back before taking the date
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone()
+    return parsed.date()
+
+
+def summarize_project(doc):
+    """Task count and first/last scheduled day (inclusive, ISO dates) of a project document"""
+    task_count = 0
+    first = last = None
+    stack = list(doc.get("data") or []) if isinstance(doc, dict) else []
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        task_count += 1
+        for seg in node.get("segments") or []:
+            start, duration = seg.get("startOffset"), seg.get("duration")
+            if not isinstance(start, (int, float)) or not isinstance(duration, (int, float)):
+                continue
+            first = start if first is None else min(first, start)
+            last = start + duration if last is None else max(last, start + duration)
+        stack.extend(node.get("children") or [])
+
+    base = project_start_date(doc)
+    if base is None or first is None:
+        return task_count, None, None
+    try:
+        first_day = base + timedelta(days=int(first))
+        last_day = base + timedelta(days=max(int(first), int(last) - 1))
+    except (OverflowError, ValueError):
+        # Offsets past the calendar (year 1..9999), infinite or NaN: the project has no usable dates
+        return task_count, None, None
+    return task_count, first_day.isoformat(), last_day.isoformat()
+
+
+def public_entry(entry):
+    """Listing representation of an index entry"""
+    return {
+        "name": entry["name"],
+        "filename": entry["filename"],
+        "modified": datetime.fromtimestamp(entry["mtime"]).isoformat(),
+        "size": entry["size"],
+        "revision": entry["revision"],
+        "version": entry.get("version", 1),
+        "taskCount": entry["taskCount"],
+        "firstDate": entry["firstDate"],
+        "lastDate": entry["lastDate"],
+    }
+
+
+class ProjectIndex:
+    """name -> metadata for every project, kept current by ProjectStore."""
+
+    def __init__(self, sidecar_path=None):
+        self.sidecar_path = sidecar_path
+        self._entries = {}
+        self._tombstones = {}
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    # --- Maintenance (called by ProjectStore) ---
+
+    def update(self, name, filename, raw, doc, mtime, size, revision=None, version=1):
+        task_count, first_day, last_day = summarize_project(doc)
+        entry = {
+            "name": name,
+            "filename": filename,
+            "size": size,
+            "mtime": mtime,
+            "revision": revision or content_revision(raw),
+            "version": version,
+            "taskCount": task_count,
+            "firstDate": first_day,
+            "lastDate": last_day,
+        }
+        with self._lock:
+            self._entries[name] = entry
+            self._tombstones.pop(name, None)
+            self.dirty = True
+
+    def touch(self, name, filename, mtime, size):
+        """Record where and when a pending save actually landed on disk"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.update(filename=filename, mtime=mtime, size=size)
+                self.dirty = True
+
+    def remove(self, name, when):
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._tombstones[name] = when
+                self.dirty = True
+
+    def rename(self, old, new, filename, when):
+        with self._lock:
+            entry = self._entries.pop(old, None)
+            if entry is None:
+                return
+            entry.update(name=new, filename=filename, mtime=when)
+            self._entries[new] = entry
+            self._tombstones[old] = when
+            self._tombstones.pop(new, None)
+            self.dirty = True
+
+    def clear(self, when):
+        with self._lock:
+            for name in self._entries:
+                self._tombstones[name] = when
+            self._entries.clear()
+            self.dirty = True
+
+    def get(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            return dict(entry) if entry else None
+
+    def names(self):
+        with self._lock:
+            return list(self._entries)
+
+    # --- Queries ---
+
+    def query(self, since=None, offset=0, limit=None):
+        """Entries newest first, optionally only those modified after `since` (epoch seconds).
+
+        Returns (entries, total, deleted names since `since`).
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            deleted = [n for n, t in self._tombstones.items() if since is not None and t > since]
+        if since is not None:
+            entries = [e for e in entries if e["mtime"] > since]
+        entries.sort(key=lambda e: e["mtime"], reverse=True)
+        total = len(entries)
+        entries = entries[offset:offset + limit if limit is not None else None]
+        return [public_entry(e) for e in entries], total, deleted
+
+    # --- Rebuild / persistence ---
+
+    def rebuild(self, list_dir, read_file):
+        """Reconcile the index with the directory, re-reading only files that changed.
+
+        read_file(path) returns the decoded JSON bytes of a project file.
+        """
+        known, tombstones = self._load_sidecar()
+        with self._lock:
+            known.update(self._entries)
+
+        fresh = {}
+        if os.path.exists(list_dir):
+            for file in os.listdir(list_dir):
+                name = project_name_from_file(file)
+                if name is None:
+                    continue
+                path = os.path.join(list_dir, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                # A .json and .json.gz of the same project: the newer one wins
+                if name in fresh and fresh[name]["mtime"] >= stat.st_mtime:
+                    continue
+                entry = known.get(name)
+                if entry and entry["filename"] == file and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                    fresh[name] = entry
+                    continue
+                try:
+                    raw = read_file(path)
+                    doc = json.loads(raw.decode("utf-8"))
+                except (OSError, ValueError) as e:
+                    log.warning("Could not index '%s': %s", file, e)
+                    continue
+                task_count, first_day, last_day = summarize_project(doc)
+                revision = content_revision(raw)
+                version = entry.get("version", 1) if entry else 0
+                fresh[name] = {
+                    "name": name,
+                    "filename": file,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "revision": revision,
+                    # Changed behind our back (or new): still counts as the next version
+                    "version": version if entry and entry["revision"] == revision else version + 1,
+                    "taskCount": task_count,
+                    "firstDate": first_day,
+                    "lastDate": last_day,
+                }
+
+        now = datetime.now().timestamp()
+        with self._lock:
+            for name, when in tombstones.items():
+                if when > self._tombstones.get(name, 0):
+                    self._tombstones[name] = when
+            # Also projects whose files went away while the server wasn't running
+            for name in set(known) - set(fresh):
+                self._tombstones[name] = now
+            for name in fresh:
+                self._tombstones.pop(name, None)
+            self._entries = fresh
+            self.dirty = True
+        return fresh
+
+    def _load_sidecar(self):
+        """(name -> entry, name -> deletion time) as last saved"""
+        if not self.sidecar_path or not os.path.exists(self.sidecar_path):
+            return {}, {}
+        try:
+            with open(self.sidecar_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            entries = {e["name"]: e for e in stored.get("projects", [])}
+            cutoff = datetime.now().timestamp() - TOMBSTONE_SECONDS
+            tombstones = {n: float(t) for n, t in (stored.get("deleted") or {}).items() if float(t) > cutoff}
+            return entries, tombstones
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            log.warning("Ignoring unreadable project index: %s", e)
+            return {}, {}
+
+    def save_sidecar(self):
+        """Persist the index if it changed since the last save"""
+        with self._lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            cutoff = datetime.now().timestamp() - TOMBSTONE_SECONDS
+            self._tombstones = {n: t for n, t in self._tombstones.items() if t > cutoff}
+            payload = {"version": 1, "projects": list(self._entries.values()), "deleted": dict(self._tombstones)}
+        if not self.sidecar_path:
+            return
+        try:
+            raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            atomic_write(self.sidecar_path, raw)
+        except OSError as e:
+            log.warning("Could not write project index: %s", e)
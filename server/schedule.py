@@ -0,0 +1,174 @@
+"""
+Server-side schedule rollups (the Python side of data.js).
+
+A stored project is parsed once into per-node rollups: the range a parent
+spans over its descendants (syncParentSchedule), each node's merged task
+segments (mergeSegments) and working-day counts (getWorkingDays). Working days
+are counted arithmetically (whole weeks, then the remainder) minus a binary
+search over the sorted holidays, so no count walks the days of its span and a
+segment offset by millions of days costs the same as any other.
+"""
+
+import math
+from bisect import bisect_left
+from datetime import date, timedelta
+
+try:
+    from .project_index import project_start_date
+except ImportError:  # Running as a script (python server/server.py)
+    from project_index import project_start_date
+
+
+def _is_number(value):
+    """A finite JSON number (JSON allows NaN and Infinity as floats, and arbitrarily large ints)"""
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and math.isfinite(value))
+
+
+def _is_event(seg):
+    return bool(seg.get("isEvent")) or str(seg.get("id", "")).startswith("e_")
+
+
+class WorkCalendar:
+    """Working days (not a weekend, not in `holidays`) between day offsets from `base_date`."""
+
+    def __init__(self, base_date, holidays):
+        self.base_date = base_date
+        self.base = base_date.toordinal() if base_date else None
+        # Weekday holidays as sorted ordinals; anything that isn't an ISO date string is ignored
+        days = set()
+        for value in holidays if isinstance(holidays, list) else ():
+            if not isinstance(value, str):
+                continue
+            try:
+                day = date.fromisoformat(value)
+            except ValueError:
+                continue
+            if day.weekday() < 5:
+                days.add(day.toordinal())
+        self.holidays = sorted(days)
+
+    @staticmethod
+    def _weekdays_before(ordinal):
+        """Monday-to-Friday days in [1, ordinal) (ordinal 1, 0001-01-01, is a Monday); valid for any integer"""
+        weeks, rest = divmod(ordinal - 1, 7)
+        return weeks * 5 + min(rest, 5)
+
+    def working_days(self, start, end):
+        """Working days in [start, end), counted arithmetically so a span of any length costs the same"""
+        if end <= start:
+            return 0
+        if self.base is None:
+            return end - start  # No start date, no weekdays: every day counts
+        first, last = self.base + start, self.base + end
+        holidays = bisect_left(self.holidays, last) - bisect_left(self.holidays, first)
+        return self._weekdays_before(last) - self._weekdays_before(first) - holidays
+
+    def segment_days(self, start, duration, include_weekends):
+        """Badge count for a segment, as getWorkingDays() in data.js computes it"""
+        # includeWeekends=true means "show the weekend overlay and count only working days"
+        if not include_weekends:
+            return duration
+        return self.working_days(start, start + duration)
+
+    def date_of(self, offset):
+        if self.base_date is None:
+            return None
+        try:
+            return (self.base_date + timedelta(days=offset)).isoformat()
+        except OverflowError:
+            return None  # Past year 9999 (or before year 1)
+
+
+def merge_segments(segments):
+    """Task segments merged where they overlap or touch (same rule as mergeSegments)"""
+    tasks = sorted(
+        (s for s in segments if not _is_event(s) and _is_number(s.get("startOffset")) and _is_number(s.get("duration"))),
+        key=lambda s: s["startOffset"],
+    )
+    merged = []
+    for seg in tasks:
+        start, end = int(seg["startOffset"]), int(seg["startOffset"] + seg["duration"])
+        if merged and start <= merged[-1]["end"]:
+            merged[-1]["end"] = max(merged[-1]["end"], end)
+        else:
+            merged.append({"start": start, "end": end, "includeWeekends": seg.get("includeWeekends", True)})
+    return merged
+
+
+def summarize_schedule(doc):
+    """Per-node rollups for a project document, in display (pre-order) order"""
+    roots = [n for n in (doc.get("data") or []) if isinstance(n, dict)]
+
+    # Pre-order walk to number nodes; reversed, it visits every child before its parent
+    order = []
+    stack = [(node, None, 0) for node in reversed(roots)]
+    while stack:
+        node, parent_index, depth = stack.pop()
+        index = len(order)
+        order.append((node, parent_index, depth))
+        children = [c for c in (node.get("children") or []) if isinstance(c, dict)]
+        stack.extend((child, index, depth + 1) for child in reversed(children))
+
+    merged = [merge_segments(node.get("segments") or []) for node, _, _ in order]
+    # Span of a node's own task segments plus everything below it (what its parent rolls up)
+    subtree = [None] * len(order)
+    # Span of the descendants only (what syncParentSchedule gives a parent)
+    descendants = [None] * len(order)
+    for index in range(len(order) - 1, -1, -1):
+        own = merged[index]
+        span = (own[0]["start"], max(m["end"] for m in own)) if own else None
+        below = descendants[index]
+        if below is not None:
+            span = below if span is None else (min(span[0], below[0]), max(span[1], below[1]))
+        subtree[index] = span
+        parent_index = order[index][1]
+        if parent_index is not None and span is not None:
+            current = descendants[parent_index]
+            descendants[parent_index] = span if current is None else (min(current[0], span[0]), max(current[1], span[1]))
+
+    spans = [s for s in subtree if s is not None]
+    low = min((s[0] for s in spans), default=0)
+    high = max((s[1] for s in spans), default=0)
+    calendar = WorkCalendar(project_start_date(doc), doc.get("holidays"))
+
+    nodes = []
+    for index, (node, parent_index, depth) in enumerate(order):
+        own = merged[index]
+        # Parents follow their descendants; leaves (and parents with nothing scheduled below) their own segments
+        span = descendants[index] or ((own[0]["start"], max(m["end"] for m in own)) if own else None)
+        events = [s for s in (node.get("segments") or []) if _is_event(s)]
+        nodes.append({
+            "id": node.get("id"),
+            "name": node.get("name"),
+            "parentId": order[parent_index][0].get("id") if parent_index is not None else None,
+            "depth": depth,
+            "childCount": len(node.get("children") or []),
+            "start": span[0] if span else None,
+            "end": span[1] if span else None,
+            "startDate": calendar.date_of(span[0]) if span else None,
+            "endDate": calendar.date_of(max(span[0], span[1] - 1)) if span else None,
+            "duration": span[1] - span[0] if span else 0,
+            "workingDays": calendar.working_days(*span) if span else 0,
+            "segments": [
+                {
+                    "startOffset": m["start"],
+                    "duration": m["end"] - m["start"],
+                    "workingDays": calendar.segment_days(m["start"], m["end"] - m["start"], m["includeWeekends"]),
+                }
+                for m in own
+            ],
+            "eventCount": len(events),
+        })
+
+    return {
+        "startDate": calendar.date_of(0),
+        "start": low if spans else None,
+        "end": high if spans else None,
+        "firstDate": calendar.date_of(low) if spans else None,
+        "lastDate": calendar.date_of(max(low, high - 1)) if spans else None,
+        "workingDays": calendar.working_days(low, high),
+        "taskCount": len(order),
+        "nodes": nodes,
+    }
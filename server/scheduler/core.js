@@ -214,8 +214,12 @@ export class Scheduler {
 
         // Initialize project state
         this.currentProjectName = null;
+        this.savedSnapshot = null; // Last server-acknowledged document (PATCH base)
+        this.clientId = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+        this.eventSource = null;
         this.autoSaveTimeout = null;
         this.autoSaveDelay = 3000; // 3 seconds debounce
+        this.compressSaveThreshold = 16 * 1024; // Gzip full saves larger than this
         this.isProjectLocked = false; // Add lock state
 
         // New project button
@@ -162,6 +162,7 @@ Object.assign(Scheduler.prototype, {
 
     async initializeProjects() {
         await this.refreshProjectList();
+        if (!this.eventSource) this.connectEventStream();
 
         // Restore last project
         const lastProject = localStorage.getItem('lastProject');
@@ -221,15 +222,54 @@ Object.assign(Scheduler.prototype, {
 
         this.updateAutoSaveStatus('saving');
 
+        const projectName = this.currentProjectName;
+        const url = `/api/project/${encodeURIComponent(projectName)}`;
+        const body = JSON.stringify(saveData);
+
         try {
-            const res = await fetch(`/api/project/${encodeURIComponent(this.currentProjectName)}`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(saveData)
-            });
-            const result = await res.json();
+            // Send only what changed since the last acknowledged save; the server
+            // answers 409 if its copy is no longer the one we diffed against.
+            let result = null;
+            const base = this.savedSnapshot;
+            if (base && base.name === projectName) {
+                const ops = this.diffDocuments(base.doc, JSON.parse(body));
+                const patchBody = JSON.stringify(ops);
+                if (patchBody.length < body.length) {
+                    const res = await fetch(url, {
+                        method: 'PATCH',
+                        headers: { 'Content-Type': 'application/json-patch+json', 'If-Match': `"${base.revision}"`, 'X-Client-Id': this.clientId },
+                        body: patchBody
+                    });
+                    if (this.isServerBusy(res)) return this.retrySaveLater(res);
+                    if (res.ok) result = await res.json();
+                }
+            }
+
+            if (!result) {
+                const headers = { 'Content-Type': 'application/json', 'X-Client-Id': this.clientId };
+                // Only overwrite the copy we last saw; if another device saved since, the server answers 409
+                if (base && base.name === projectName) headers['If-Match'] = `"${base.revision}"`;
+                let payload = body;
+                if (body.length >= this.compressSaveThreshold && typeof CompressionStream !== 'undefined') {
+                    payload = await this.gzipText(body);
+                    headers['Content-Encoding'] = 'gzip';
+                }
+                const res = await fetch(url, { method: 'POST', headers, body: payload });
+                if (this.isServerBusy(res)) return this.retrySaveLater(res);
+                if (res.status === 409) {
+                    // Another device saved first: take its version and keep ours one undo step away
+                    const local = JSON.stringify(this.data);
+                    if (this.undoStack[this.undoStack.length - 1] !== local) this.undoStack.push(local);
+                    await this.loadProject(projectName, { remote: true });
+                    this.updateUndoRedoButtons();
+                    this.updateAutoSaveStatus('conflict');
+                    return;
+                }
+                result = await res.json();
+            }
 
             if (result.success) {
+                this.rememberSavedSnapshot(projectName, result.revision, JSON.parse(body));
                 this.updateAutoSaveStatus('saved');
                 this.updateConnectionStatus(true);
             }
@@ -239,6 +279,173 @@ Object.assign(Scheduler.prototype, {
         }
     },
 
+    // Apply RFC 6902 operations (as produced by diffDocuments) to a document in place
+
+    applyPatch(doc, ops) {
+        const parse = (path) => path === '' ? [] : path.slice(1).split('/').map(t => t.replace(/~1/g, '/').replace(/~0/g, '~'));
+        const parentOf = (root, tokens) => tokens.slice(0, -1).reduce((node, key) => {
+            if (node === null || typeof node !== 'object' || !(key in node)) throw new Error(`Path not found: ${key}`);
+            return node[key];
+        }, root);
+
+        for (const op of ops) {
+            const tokens = parse(op.path);
+            if (tokens.length === 0) {
+                if (op.op === 'add' || op.op === 'replace') doc = op.value;
+                continue;
+            }
+            const parent = parentOf(doc, tokens);
+            const key = tokens[tokens.length - 1];
+            if (Array.isArray(parent)) {
+                const index = key === '-' ? parent.length : Number(key);
+                if (op.op === 'add') parent.splice(index, 0, op.value);
+                else if (op.op === 'remove') parent.splice(index, 1);
+                else if (op.op === 'replace') parent[index] = op.value;
+                else throw new Error(`Unsupported patch op: ${op.op}`);
+            } else {
+                if (op.op === 'add' || op.op === 'replace') parent[key] = op.value;
+                else if (op.op === 'remove') delete parent[key];
+                else throw new Error(`Unsupported patch op: ${op.op}`);
+            }
+        }
+        return doc;
+    },
+
+    // Live updates from other devices via Server-Sent Events (/api/events)
+
+    connectEventStream() {
+        if (typeof EventSource === 'undefined') return;
+
+        const source = new EventSource('/api/events');
+        source.addEventListener('save', (e) => this.handleRemoteSave(JSON.parse(e.data)));
+        source.addEventListener('rename', (e) => this.handleRemoteRename(JSON.parse(e.data)));
+        source.addEventListener('delete', (e) => this.handleRemoteChange(JSON.parse(e.data)));
+        source.addEventListener('clear', (e) => this.handleRemoteChange(JSON.parse(e.data)));
+        // Missed too many events while disconnected: resync what is on screen
+        source.addEventListener('reset', () => {
+            this.scheduleProjectListRefresh();
+            if (this.currentProjectName && !this.autoSaveTimeout) this.loadProject(this.currentProjectName, { remote: true });
+        });
+        source.onopen = () => this.updateConnectionStatus(true);
+        source.onerror = () => this.updateConnectionStatus(false); // EventSource reconnects by itself
+        this.eventSource = source;
+    },
+
+    handleRemoteSave(evt) {
+        if (evt.origin === this.clientId) return;
+        this.scheduleProjectListRefresh();
+        if (evt.project !== this.currentProjectName) return;
+
+        const base = this.savedSnapshot;
+        if (base && base.name === evt.project && base.revision === evt.revision) return;
+        // Local edits are waiting to be saved; that save resolves the conflict (409 → reload, local copy on the undo stack)
+        if (this.autoSaveTimeout) return;
+
+        if (evt.patch && base && base.name === evt.project && base.revision === evt.baseRevision) {
+            try {
+                const doc = this.applyPatch(JSON.parse(JSON.stringify(base.doc)), evt.patch);
+                this.rememberSavedSnapshot(evt.project, evt.revision, doc);
+                this.applyLoadedData(JSON.parse(JSON.stringify(doc)));
+                return;
+            } catch (err) {
+                console.log('Remote patch failed, reloading project:', err);
+            }
+        }
+        this.loadProject(evt.project, { remote: true });
+    },
+
+    handleRemoteRename(evt) {
+        if (evt.origin === this.clientId) return;
+        this.scheduleProjectListRefresh();
+        if (evt.project === this.currentProjectName) {
+            if (this.savedSnapshot) this.savedSnapshot.name = evt.newName;
+            this.currentProjectName = evt.newName;
+            this.saveLastProject();
+        }
+    },
+
+    handleRemoteChange(evt) {
+        if (evt.origin === this.clientId) return;
+        this.scheduleProjectListRefresh();
+    },
+
+    // Coalesce bursts of change events into one project list request
+
+    scheduleProjectListRefresh() {
+        clearTimeout(this.listRefreshTimeout);
+        this.listRefreshTimeout = setTimeout(() => this.refreshProjectList(), 300);
+    },
+
+    // Gzip a request body in the browser (the server accepts Content-Encoding: gzip)
+
+    async gzipText(text) {
+        const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+        return await new Response(stream).blob();
+    },
+
+    // Remember the document the server last acknowledged (base for the next PATCH)
+
+    rememberSavedSnapshot(name, revision, doc) {
+        this.savedSnapshot = revision ? { name, revision, doc } : null;
+    },
+
+    // Build RFC 6902 operations turning `before` into `after`
+
+    diffDocuments(before, after, path = '', ops = []) {
+        if (before === after) return ops;
+
+        const isObject = (v) => v !== null && typeof v === 'object' && !Array.isArray(v);
+        const escape = (key) => String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+
+        if (Array.isArray(before) && Array.isArray(after)) {
+            const common = Math.min(before.length, after.length);
+            for (let i = 0; i < common; i++) {
+                this.diffDocuments(before[i], after[i], `${path}/${i}`, ops);
+            }
+            for (let i = common; i < after.length; i++) {
+                ops.push({ op: 'add', path: `${path}/${i}`, value: after[i] });
+            }
+            // Remove from the end so earlier indexes stay valid
+            for (let i = before.length - 1; i >= common; i--) {
+                ops.push({ op: 'remove', path: `${path}/${i}` });
+            }
+            return ops;
+        }
+
+        if (isObject(before) && isObject(after)) {
+            Object.keys(before).forEach(key => {
+                if (!(key in after)) ops.push({ op: 'remove', path: `${path}/${escape(key)}` });
+            });
+            Object.keys(after).forEach(key => {
+                const childPath = `${path}/${escape(key)}`;
+                if (!(key in before)) {
+                    ops.push({ op: 'add', path: childPath, value: after[key] });
+                } else {
+                    this.diffDocuments(before[key], after[key], childPath, ops);
+                }
+            });
+            return ops;
+        }
+
+        ops.push({ op: 'replace', path, value: after });
+        return ops;
+    },
+
+    // 429 (too many saves from this client) or 503 (server overloaded): nothing was stored
+
+    isServerBusy(res) {
+        return res.status === 429 || res.status === 503;
+    },
+
+    // Try the save again once the server's Retry-After has passed (an edit in between reschedules it anyway)
+
+    retrySaveLater(res) {
+        const seconds = Number(res.headers.get('Retry-After')) || 2;
+        if (this.autoSaveTimeout) clearTimeout(this.autoSaveTimeout);
+        this.updateAutoSaveStatus('pending');
+        this.autoSaveTimeout = setTimeout(() => this.saveCurrentProject(), seconds * 1000);
+    },
+
     // Trigger auto-save with debounce
 
     triggerAutoSave() {
@@ -271,10 +478,10 @@ Object.assign(Scheduler.prototype, {
         const dot = document.getElementById('statusDot');
         if (!dot) return;
 
-        dot.classList.remove('pending', 'saving', 'saved');
+        dot.classList.remove('pending', 'saving', 'saved', 'conflict');
         dot.classList.add(status);
 
-        dot.title = { pending: '저장 대기 중...', saving: '저장 중...', saved: '저장됨', error: '저장 실패' }[status] || '';
+        dot.title = { pending: '저장 대기 중...', saving: '저장 중...', saved: '저장됨', error: '저장 실패', conflict: '다른 기기에서 변경되어 최신 버전을 불러왔습니다 (실행 취소로 복구)' }[status] || '';
     },
 
 
@@ -292,7 +499,7 @@ Object.assign(Scheduler.prototype, {
     // Load a specific project from server
 
 
-    async loadProject(projectName) {
+    async loadProject(projectName, { remote = false } = {}) {
         try {
             const res = await fetch(`/api/project/${encodeURIComponent(projectName)}`);
             const data = await res.json();
@@ -302,7 +509,9 @@ Object.assign(Scheduler.prototype, {
                 return;
             }
 
-            this.saveState();
+            this.rememberSavedSnapshot(projectName, res.headers.get('X-Revision'), JSON.parse(JSON.stringify(data)));
+            // A change pushed from another device must not autosave back (devices would ping-pong)
+            if (!remote) this.saveState();
             this.applyLoadedData(data);
             this.currentProjectName = projectName;
             this.saveLastProject();
@@ -359,12 +568,13 @@ Object.assign(Scheduler.prototype, {
         try {
             const res = await fetch(`/api/project/${encodeURIComponent(this.currentProjectName)}`, {
                 method: 'PUT',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', 'X-Client-Id': this.clientId },
                 body: JSON.stringify({ newName: newName.trim() })
             });
             const result = await res.json();
 
             if (result.success) {
+                if (this.savedSnapshot) this.savedSnapshot.name = result.newName;
                 this.currentProjectName = result.newName;
                 this.saveLastProject();
                 await this.refreshProjectList();
@@ -391,7 +601,8 @@ Object.assign(Scheduler.prototype, {
             onConfirm: async () => {
                 try {
                     const res = await fetch(`/api/project/${encodeURIComponent(this.currentProjectName)}`, {
-                        method: 'DELETE'
+                        method: 'DELETE',
+                        headers: { 'X-Client-Id': this.clientId }
                     });
                     const result = await res.json();
 
@@ -447,7 +658,7 @@ Object.assign(Scheduler.prototype, {
 
     async deleteAllData() {
         try {
-            const res = await fetch('/api/projects', { method: 'DELETE' });
+            const res = await fetch('/api/projects', { method: 'DELETE', headers: { 'X-Client-Id': this.clientId } });
             if (!res.ok) throw new Error('서버 데이터 삭제 실패');
 
             // Reset local state
@@ -0,0 +1,253 @@
+"""
+Full-text search over the tasks of every project (GET /api/search).
+
+Each task node is one searchable entry: its name plus the labels, memos and
+child names of its segments. Text is normalized (NFKC, casefolded) and indexed
+by character n-grams instead of words, because Korean text has no reliable
+word boundaries (particles attach to nouns): every run of non-space characters
+contributes its single characters and its bigrams. A query intersects the
+posting sets of its grams and then checks the surviving entries for the actual
+substrings, so answering never reads a project. A save, rename or delete only
+touches the postings of that one project.
+"""
+
+import heapq
+import re
+import threading
+import unicodedata
+
+try:
+    from .schedule import summarize_schedule
+except ImportError:  # Running as a script (python server/server.py)
+    from schedule import summarize_schedule
+
+
+# How much a match in each field counts towards a hit's score
+FIELD_WEIGHTS = {"name": 4, "label": 3, "childName": 2, "memo": 1}
+
+# Characters kept on each side of the match when a long text is shown as a snippet
+SNIPPET_CONTEXT = 30
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Search form of a text: NFKC, casefolded, whitespace collapsed to single spaces"""
+    return _SPACE.sub(" ", unicodedata.normalize("NFKC", str(text)).casefold()).strip()
+
+
+def query_terms(query):
+    """Space-separated terms of a query; a hit has to contain every one"""
+    return [term for term in normalize(query).split(" ") if term]
+
+
+def text_grams(text):
+    """Single characters and bigrams of every run of non-space characters in a normalized text"""
+    grams = set()
+    for run in text.split(" "):
+        grams.update(run)
+        grams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def term_grams(term):
+    """Grams a text must contain to contain `term` (its bigrams; the character itself for one letter)"""
+    if len(term) == 1:
+        return {term}
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+def _node_entries(doc):
+    """One entry per task node, in display (pre-order) order, with its date range from the rollups"""
+    summary = summarize_schedule(doc)
+    # Same walk as summarize_schedule(), so node i lines up with summary["nodes"][i]
+    roots = [n for n in (doc.get("data") or []) if isinstance(n, dict)]
+    stack = [(node, None) for node in reversed(roots)]
+    order = 0
+    while stack:
+        node, parent_path = stack.pop()
+        rollup = summary["nodes"][order]
+        order += 1
+        path = parent_path or []
+        children = [c for c in (node.get("children") or []) if isinstance(c, dict)]
+        if children:
+            child_path = path + [node.get("name") or ""]
+            stack.extend((child, child_path) for child in reversed(children))
+
+        fields = []
+        seen = set()
+
+        def add(field, value):
+            if not isinstance(value, str) or not value.strip() or (field, value) in seen:
+                return
+            seen.add((field, value))
+            display = _SPACE.sub(" ", value).strip()
+            fields.append((field, normalize(value), display))
+
+        add("name", node.get("name"))
+        for seg in node.get("segments") or []:
+            if isinstance(seg, dict):
+                add("label", seg.get("label"))
+                add("childName", seg.get("childName"))
+                add("memo", seg.get("memo"))
+        if not fields:
+            continue
+
+        grams = set()
+        for _, text, _ in fields:
+            grams |= text_grams(text)
+        yield {
+            "nodeId": node.get("id"),
+            "name": node.get("name"),
+            "path": path,
+            "order": order,
+            "startDate": rollup["startDate"],
+            "endDate": rollup["endDate"],
+            "fields": fields,
+            "grams": grams,
+        }
+
+
+def _snippet(display, term):
+    """The field text, cut down to the part around the match when it is long"""
+    if len(display) <= 2 * SNIPPET_CONTEXT + len(term):
+        return display
+    position = max(0, display.casefold().find(term))
+    start = max(0, position - SNIPPET_CONTEXT)
+    end = min(len(display), position + len(term) + SNIPPET_CONTEXT)
+    return ("…" if start else "") + display[start:end] + ("…" if end < len(display) else "")
+
+
+def _score(entry, terms):
+    """(score, best matching field) for an entry containing every term, or None.
+
+    A match counts by its field's weight, doubled when the term is the whole
+    field and 1.5x when the field starts with it.
+    """
+    score = 0
+    best = None
+    for term in terms:
+        term_best = None
+        for field, text, display in entry["fields"]:
+            if term not in text:
+                continue
+            weight = FIELD_WEIGHTS[field]
+            if text == term:
+                weight *= 2
+            elif text.startswith(term):
+                weight *= 1.5
+            if term_best is None or weight > term_best[0]:
+                term_best = (weight, field, display, term)
+        if term_best is None:
+            return None
+        score += term_best[0]
+        if best is None or term_best[0] > best[0]:
+            best = term_best
+    return score, best
+
+
+def _hit(entry, score, best):
+    _, field, display, term = best
+    return {
+        "project": entry["project"],
+        "nodeId": entry["nodeId"],
+        "name": entry["name"],
+        "path": entry["path"],
+        "startDate": entry["startDate"],
+        "endDate": entry["endDate"],
+        "field": field,
+        "text": _snippet(display, term),
+        "score": score,
+    }
+
+
+class SearchIndex:
+    """Inverted index: gram -> ids of the task entries whose text contains it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._entries = {}
+        self._projects = {}
+        self._next_id = 0
+
+    # --- Maintenance ---
+
+    def update(self, project, doc):
+        """(Re)index one project document"""
+        entries = list(_node_entries(doc)) if isinstance(doc, dict) else []
+        with self._lock:
+            self._remove(project)
+            ids = []
+            for entry in entries:
+                entry_id = self._next_id
+                self._next_id += 1
+                entry["project"] = project
+                self._entries[entry_id] = entry
+                for gram in entry["grams"]:
+                    self._postings.setdefault(gram, set()).add(entry_id)
+                ids.append(entry_id)
+            self._projects[project] = ids
+
+    def remove(self, project):
+        with self._lock:
+            self._remove(project)
+
+    def rename(self, old, new):
+        """Entries keep their postings; only the project they point at changes"""
+        with self._lock:
+            ids = self._projects.pop(old, None)
+            if ids is None:
+                return
+            self._remove(new)
+            for entry_id in ids:
+                self._entries[entry_id]["project"] = new
+            self._projects[new] = ids
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._entries.clear()
+            self._projects.clear()
+
+    def _remove(self, project):
+        for entry_id in self._projects.pop(project, ()):
+            entry = self._entries.pop(entry_id)
+            for gram in entry["grams"]:
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(entry_id)
+                    if not posting:
+                        del self._postings[gram]
+
+    # --- Queries ---
+
+    def search(self, query, limit=50, project=None):
+        """Ranked hits for a query (best first), optionally within one project; returns (hits, total)"""
+        terms = query_terms(query)
+        if not terms:
+            return [], 0
+        needed = set().union(*(term_grams(term) for term in terms))
+        scored = []
+        with self._lock:
+            postings = [self._postings.get(gram) for gram in needed]
+            if not all(postings):
+                return [], 0
+            postings.sort(key=len)
+            for entry_id in postings[0].intersection(*postings[1:]):
+                entry = self._entries[entry_id]
+                if project is not None and entry["project"] != project:
+                    continue
+                result = _score(entry, terms)
+                if result is not None:
+                    # Best score first, then shorter names, then project and display order
+                    scored.append((-result[0], len(str(entry["name"] or "")), entry["project"], entry["order"], entry_id,
+                                   result[1]))
+            # Only the hits actually returned are built
+            top = heapq.nsmallest(limit, scored)
+            hits = [_hit(self._entries[item[4]], -item[0], item[5]) for item in top]
+        return hits, len(scored)
+
+    def stats(self):
+        with self._lock:
+            return {"projects": len(self._projects), "entries": len(self._entries), "grams": len(self._postings)}
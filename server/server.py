@@ -4,13 +4,66 @@ Quantum Scheduler - Shared Network Server
 중앙 서버PC에서 실행하여 데이터를 공유하는 역할을 합니다.
 """
 
+import functools
+import gzip
+import hmac
 import http.server
 import json
+import logging
 import os
+import queue
 import re
+import signal
 import sys
-from urllib.parse import urlparse, unquote
-from datetime import datetime
+import threading
+import time
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlparse, unquote, parse_qs
+from datetime import datetime, timedelta
+
+# Startup is timed from here: phase durations (ms) go to the log and /api/health
+LOAD_STARTED = time.perf_counter()
+STARTUP = {}
+
+try:
+    from .aio_server import AsyncHTTPServer
+    from .archive import CONFLICT_POLICIES, ArchiveError, export_archive, import_archive
+    from .body import RequestBodyError, declared_length, read_json, spool_body
+    from .cache import ProjectCache
+    from .events import EventBroker
+    from .ics import build_calendar
+    from .jsonpatch import apply_patch, InvalidPatchError, JsonPatchError
+    from .limits import BoundedExecutor, RateLimiter, overload_response, retry_after
+    from .logs import ACCESS_LOG, setup_queued_logging, shutdown_logging
+    from .metrics import METRICS, CountingReader, CountingWriter
+    from .project_index import ProjectIndex
+    from .schedule import summarize_schedule
+    from .search import SearchIndex
+    from .sqlite_store import SQLiteProjectStore
+    from .static_assets import StaticAssets, IMMUTABLE_CACHE, REVALIDATE_CACHE
+    from .storage import ProjectExistsError, ProjectStore, atomic_write
+    from .timeline import TimelineIndex, parse_day
+    from .watcher import start_watcher
+except ImportError:  # Running as a script (python server/server.py)
+    from aio_server import AsyncHTTPServer
+    from archive import CONFLICT_POLICIES, ArchiveError, export_archive, import_archive
+    from body import RequestBodyError, declared_length, read_json, spool_body
+    from cache import ProjectCache
+    from events import EventBroker
+    from ics import build_calendar
+    from jsonpatch import apply_patch, InvalidPatchError, JsonPatchError
+    from limits import BoundedExecutor, RateLimiter, overload_response, retry_after
+    from logs import ACCESS_LOG, setup_queued_logging, shutdown_logging
+    from metrics import METRICS, CountingReader, CountingWriter
+    from project_index import ProjectIndex
+    from schedule import summarize_schedule
+    from search import SearchIndex
+    from sqlite_store import SQLiteProjectStore
+    from static_assets import StaticAssets, IMMUTABLE_CACHE, REVALIDATE_CACHE
+    from storage import ProjectExistsError, ProjectStore, atomic_write
+    from timeline import TimelineIndex, parse_day
+    from watcher import start_watcher
 
 def safe_filename(name):
     """Sanitize filename while preserving Korean and common characters"""
@@ -22,6 +75,100 @@ def safe_filename(name):
 
 PORT = int(os.environ.get("PORT", 8088))
 
+# Upper bound for project bodies kept in memory (MB)
+CACHE_MAX_BYTES = int(os.environ.get("QS_CACHE_MB", 32)) * 1024 * 1024
+
+# Saves to the same project within this window (ms) collapse into one disk write; 0 writes immediately
+WRITE_DELAY = int(os.environ.get("QS_WRITE_DELAY_MS", 500)) / 1000
+
+# On-disk project format: "pretty" (indented JSON), "compact" (minified JSON), "gzip" (.json.gz)
+# or "journal" (.jsonl snapshot + appended patches, with revision history)
+STORAGE_FORMAT = os.environ.get("QS_STORAGE_FORMAT", "compact")
+
+# Where projects live: "files" (server/list/, in STORAGE_FORMAT) or "sqlite" (server/projects.sqlite)
+STORAGE_BACKEND = os.environ.get("QS_STORAGE_BACKEND", "files")
+
+# Versions kept per journaled project; older ones are dropped by background compaction
+HISTORY_KEEP = int(os.environ.get("QS_HISTORY_KEEP", 200))
+
+# HTTP engine: "threaded" (connections run on a pool of QS_WORKERS threads, with at most QS_QUEUE_DEPTH more
+# waiting and the rest answered 503) or "asyncio" (event loop in front of the same bounded pool, HTTP/1.1 keep-alive)
+SERVER_MODE = os.environ.get("QS_SERVER_MODE", "threaded")
+
+# Requests handled at once, by a fixed pool of worker threads in both engines (see QS_QUEUE_DEPTH for the rest).
+# Threaded mode holds a worker for a whole connection (slow uploads included), hence the larger default
+WORKERS = int(os.environ.get("QS_WORKERS", 8 if SERVER_MODE == "asyncio" else 32))
+
+# Requests allowed to wait for a worker; beyond that they are answered 503 with Retry-After
+QUEUE_DEPTH = int(os.environ.get("QS_QUEUE_DEPTH", 64))
+
+# Project writes (POST/PUT/PATCH/DELETE on /api/project*) per second per client address, with bursts of
+# up to QS_WRITE_BURST; over that, 429 with Retry-After. 0 turns the limit off
+WRITE_RATE = float(os.environ.get("QS_WRITE_RATE", 10))
+WRITE_BURST = int(os.environ.get("QS_WRITE_BURST", 30))
+
+# Picking up projects changed by other programs (files storage): "auto" (inotify on Linux, polling
+# elsewhere), "inotify", "poll" or "off" (only a full rescan when the list directory's mtime moves)
+WATCH_MODE = os.environ.get("QS_WATCH", "auto")
+
+# Changes are applied once the directory has been quiet this long (ms); polling looks every QS_WATCH_POLL_MS
+WATCH_DEBOUNCE = int(os.environ.get("QS_WATCH_DEBOUNCE_MS", 50)) / 1000
+WATCH_POLL_INTERVAL = int(os.environ.get("QS_WATCH_POLL_MS", 1000)) / 1000
+
+# Idle keep-alive connections are closed after this many seconds (asyncio mode)
+KEEPALIVE_SECONDS = int(os.environ.get("QS_KEEPALIVE_SECONDS", 15))
+
+# Responses smaller than this are sent uncompressed even when the client accepts gzip
+GZIP_MIN_BYTES = 1024
+
+# Request bodies (after gzip decoding) larger than this are refused with 413
+MAX_BODY_BYTES = int(os.environ.get("QS_MAX_BODY_MB", 32)) * 1024 * 1024
+
+# Uploaded archives (POST /api/archive) larger than this are refused with 413
+MAX_ARCHIVE_BYTES = int(os.environ.get("QS_MAX_ARCHIVE_MB", 1024)) * 1024 * 1024
+
+# Streamed responses are written in pieces of about this size
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Patches larger than this (serialized) are left out of change events; clients reload instead
+EVENT_PATCH_MAX_BYTES = 64 * 1024
+
+# Log verbosity: DEBUG, INFO, WARNING or ERROR (DEBUG adds a line per project save, patch and delete)
+LOG_LEVEL = os.environ.get("QS_LOG_LEVEL", "INFO")
+
+# One record per request (route, status, duration, bytes) in the "access" log: 1 to enable
+ACCESS_LOG_ENABLED = os.environ.get("QS_ACCESS_LOG", "0") == "1"
+
+# Log file; frozen builds default to server_debug.log next to the exe, scripts log to the console only
+LOG_FILE = os.environ.get("QS_LOG_FILE", "")
+
+# The log file rotates at this size (MB), keeping QS_LOG_BACKUPS old files
+LOG_MAX_BYTES = int(os.environ.get("QS_LOG_MAX_MB", 10)) * 1024 * 1024
+LOG_BACKUPS = int(os.environ.get("QS_LOG_BACKUPS", 5))
+
+# Rotate by time instead of size: a TimedRotatingFileHandler interval such as "midnight" or "H"
+LOG_ROTATE = os.environ.get("QS_LOG_ROTATE", "")
+
+# Log line format: "text" or "json" (one object per line, with the structured fields)
+LOG_FORMAT = os.environ.get("QS_LOG_FORMAT", "text")
+
+# Shared secret for POST /api/shutdown, handed to the server by the tray app; without it the endpoint is off
+CONTROL_TOKEN = os.environ.get("QS_CONTROL_TOKEN", "")
+
+log = logging.getLogger("server")
+
+
+def setup_logging():
+    """Start the queued log writer; frozen builds (no console attached) log to a rotating server_debug.log."""
+    frozen = getattr(sys, 'frozen', False)
+    log_file = LOG_FILE or (os.path.join(os.path.dirname(sys.executable), 'server_debug.log') if frozen else None)
+    setup_queued_logging(LOG_LEVEL, ACCESS_LOG_ENABLED, log_file, LOG_MAX_BYTES, LOG_BACKUPS, LOG_ROTATE,
+                         json_format=LOG_FORMAT == "json", console=not frozen)
+    log.info("Server Process Started")
+    log.info("Python: %s", sys.version)
+
+setup_logging()
+
 # Fix for PyInstaller (Frozen) Environment
 if getattr(sys, 'frozen', False):
     # If frozen, sys.executable is the exe path.
@@ -33,6 +180,9 @@ else:
     # If running as script, use the script's directory
     DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Keep projects somewhere else (benchmarks, a second instance); static files are still found next to the code
+DATA_DIR = os.environ.get("QS_DATA_DIR") or DATA_DIR
+
 # Ensure DATA_DIR exists
 if not os.path.exists(DATA_DIR):
     try:
@@ -43,6 +193,8 @@ if not os.path.exists(DATA_DIR):
 # Static files live next to the data (standard deployment)
 STATIC_DIR = None
 possible_paths = [DATA_DIR]
+if not getattr(sys, 'frozen', False):
+    possible_paths.append(os.path.dirname(os.path.abspath(__file__)))
 
 # If frozen, we might have bundled static files in temp (MEI) but we want to serve them.
 if getattr(sys, 'frozen', False):
@@ -59,10 +211,12 @@ for path in possible_paths:
         break
 
 if STATIC_DIR is None:
-    print("[ERROR] Cannot find index.html!")
-    print("Please place index.html, script.js, style.css in the server folder.")
+    log.error("Cannot find index.html! Please place index.html, script.js, style.css in the server folder.")
     STATIC_DIR = DATA_DIR  # Fallback
 
+# HTML/JS/CSS served precompressed from memory (loaded in run()); a frozen bundle never changes on disk
+ASSETS = StaticAssets(STATIC_DIR, watch=not getattr(sys, 'frozen', False))
+
 SCHEDULE_FILE = os.path.join(DATA_DIR, "schedule.json")
 
 # Project JSON files are stored in "list" subfolder
@@ -73,32 +227,290 @@ if not os.path.exists(LIST_DIR):
     except OSError:
         pass
 
+# Project metadata index, persisted next to the data so startup doesn't re-read every project
+INDEX_FILE = os.path.join(DATA_DIR, "project_index.json")
+
+if STORAGE_BACKEND == "sqlite":
+    # The list/ files and schedule.json are only read once, to import them
+    STORE = SQLiteProjectStore(
+        os.path.join(DATA_DIR, "projects.sqlite"),
+        legacy=ProjectStore(LIST_DIR, ProjectIndex(), CACHE_MAX_BYTES, 0, STORAGE_FORMAT),
+        legacy_schedule=SCHEDULE_FILE,
+    )
+else:
+    STORE = ProjectStore(LIST_DIR, ProjectIndex(INDEX_FILE), CACHE_MAX_BYTES, WRITE_DELAY, STORAGE_FORMAT, HISTORY_KEEP)
+
+# Encoded /summary responses, keyed by project and checked against its revision
+SUMMARIES = ProjectCache(4 * 1024 * 1024)
+
+# Encoded /calendar.ics feeds, likewise rebuilt only when the revision changes
+CALENDARS = ProjectCache(4 * 1024 * 1024)
+
+# Live change feed for /api/events
+EVENTS = EventBroker()
+
+
+def publish_change(event, name, info):
+    """Forward a storage change to event-stream clients"""
+    data = {k: v for k, v in info.items() if v is not None and k != "document"}
+    patch = data.pop("patch", None)
+    if patch is not None and len(json.dumps(patch)) <= EVENT_PATCH_MAX_BYTES:
+        data["patch"] = patch
+    EVENTS.publish(event, name, data)
+
+STORE.add_listener(publish_change)
+
+# Task search (/api/search) and dated segments (/api/timeline) across all projects,
+# kept current from the same change notifications
+SEARCH = SearchIndex()
+TIMELINE = TimelineIndex()
+CONTENT_INDEXES = (SEARCH, TIMELINE)
+
+# Store changes waiting for the content indexes. A save only queues its document here (under the
+# project lock, so changes queue in the order they happened); one thread applies them, so indexing
+# never adds to a save's latency and an indexing error can't fail the save
+INDEX_QUEUE = queue.Queue()
+INDEX_PROGRESS = threading.Condition()
+_index_queued = 0
+_index_applied = 0
+
+# Longest a search or timeline query waits for changes made before it to reach the indexes
+INDEX_WAIT_SECONDS = 2
+
+
+def index_change(event, name, info):
+    global _index_queued
+    with INDEX_PROGRESS:
+        _index_queued += 1
+        INDEX_QUEUE.put((event, name, info))
+
+STORE.add_listener(index_change)
+
+
+def apply_to_indexes(event, name, info):
+    """One store change applied to every content index; a failure is logged and leaves the other indexes current"""
+    for index in CONTENT_INDEXES:
+        try:
+            if event == "save":
+                index.update(name, info["document"])
+            elif event == "rename":
+                index.rename(name, info["newName"])
+            elif event == "delete":
+                index.remove(name)
+            elif event == "clear":
+                index.clear()
+        except Exception:
+            log.exception("Could not apply %s of '%s' to the %s", event, name, type(index).__name__)
+
+
+def apply_index_changes():
+    """Content-index thread: apply queued store changes in the order they were made"""
+    global _index_applied
+    while True:
+        event, name, info = INDEX_QUEUE.get()
+        apply_to_indexes(event, name, info)
+        with INDEX_PROGRESS:
+            _index_applied += 1
+            INDEX_PROGRESS.notify_all()
+
+
+def wait_for_indexes(timeout=INDEX_WAIT_SECONDS):
+    """Block until every change queued before this call is indexed (or `timeout` passes)"""
+    with INDEX_PROGRESS:
+        target = _index_queued
+        INDEX_PROGRESS.wait_for(lambda: _index_applied >= target, timeout)
+
+
+def index_all_projects():
+    """Fill the search and timeline indexes from every stored project (once, at startup)"""
+    for entry in STORE.list()[0]:
+        stored = STORE.read(entry["name"])
+        if stored is None:
+            continue
+        try:
+            doc = json.loads(stored[0].decode("utf-8"))
+        except ValueError as e:
+            log.warning("Could not index project '%s': %s", entry["name"], e)
+            continue
+        apply_to_indexes("save", entry["name"], {"document": doc})
+    # One bulk build of the interval tree rather than an insert per segment
+    TIMELINE.build()
+
+
+def log_progress(operation):
+    """progress(done, total) callback for archive operations, logging about every tenth of the way"""
+    def progress(done, total):
+        if done == total or done % max(1, total // 10) == 0:
+            log.info("%s: %d/%d projects", operation, done, total)
+    return progress
+
+
+# Token buckets for project writes, per client address
+WRITE_LIMITER = RateLimiter(WRITE_RATE, WRITE_BURST)
+
+
+def route_label(path):
+    """Route a request path is counted under in /api/metrics (project names folded into :name)"""
+    if path.startswith("/api/project/"):
+        for suffix in ("/summary", "/history", "/calendar.ics"):
+            if path.endswith(suffix):
+                return "/api/project/:name" + suffix
+        return "/api/project/:name"
+    if path in ("/api/projects", "/api/projects/bulk", "/api/events", "/api/metrics", "/api/health", "/api/shutdown",
+                "/api/search", "/api/timeline", "/api/archive"):
+        return path
+    # Anything else under /api/ is a 404; keep unknown paths from growing the label set
+    return "/api/other" if path.startswith("/api/") else "static"
+
+
+def metered(dispatch):
+    """Record status, latency and bytes of each request handled by a do_* method"""
+    @functools.wraps(dispatch)
+    def wrapper(self):
+        route = route_label(urlparse(self.path).path)
+        received, sent = self.rfile.count, self.wfile.count
+        self.response_status = None
+        started = time.perf_counter()
+        METRICS.request_started()
+        try:
+            return dispatch(self)
+        finally:
+            status = self.response_status or 500
+            seconds = time.perf_counter() - started
+            bytes_in, bytes_out = self.rfile.count - received, self.wfile.count - sent
+            METRICS.request_finished(self.command, route, status, seconds, bytes_in, bytes_out)
+            if ACCESS_LOG.isEnabledFor(logging.INFO):
+                ACCESS_LOG.info(
+                    '%s "%s %s" %d %.1fms in=%d out=%d', self.client_address[0], self.command, self.path,
+                    status, seconds * 1000, bytes_in, bytes_out,
+                    extra={"client": self.client_address[0], "method": self.command, "path": self.path,
+                           "route": route, "status": status, "durationMs": round(seconds * 1000, 3),
+                           "bytesIn": bytes_in, "bytesOut": bytes_out},
+                )
+    return wrapper
+
+
+def throttled(dispatch):
+    """Answer 429 instead of dispatching a project write once the client has used up its WRITE_LIMITER tokens"""
+    @functools.wraps(dispatch)
+    def wrapper(self):
+        if urlparse(self.path).path.startswith("/api/project"):
+            wait = WRITE_LIMITER.acquire(self.client_address[0])
+            if wait:
+                seconds = retry_after(wait)
+                log.warning("Throttled %s %s from %s (retry in %ds).", self.command, self.path, self.client_address[0],
+                            seconds)
+                # The body is left unread, so the connection can't be reused
+                self.send_json({"success": False, "error": "Too many writes", "retryAfter": seconds}, status=429,
+                               headers={"Retry-After": str(seconds), "Connection": "close"})
+                return
+        return dispatch(self)
+    return wrapper
+
 
 class SchedulerHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=STATIC_DIR, **kwargs)
-    
+
+    def setup(self):
+        super().setup()
+        # Byte counts for /api/metrics
+        self.rfile = CountingReader(self.rfile)
+        self.wfile = CountingWriter(self.wfile)
+
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+
+    @metered
     def do_GET(self):
         parsed = urlparse(self.path)
         
+        # API: Live change feed (Server-Sent Events)
+        if parsed.path == "/api/events":
+            self.stream_events(parse_qs(parsed.query))
+            return
+
+        # API: Liveness and startup timings (the tray waits on this)
+        if parsed.path == "/api/health":
+            self.send_health()
+            return
+
+        # API: Request/storage metrics (Prometheus text, or JSON with ?format=json)
+        if parsed.path == "/api/metrics":
+            self.send_metrics(parse_qs(parsed.query))
+            return
+
+        # API: Several (or all) projects in one streamed NDJSON response
+        if parsed.path == "/api/projects/bulk":
+            self.bulk_projects(parse_qs(parsed.query))
+            return
+
+        # API: Every project as one streamed zip (backups)
+        if parsed.path == "/api/archive":
+            self.send_archive()
+            return
+
+        # API: Task search across projects
+        if parsed.path == "/api/search":
+            self.search_projects(parse_qs(parsed.query))
+            return
+
+        # API: Dated segments of all projects in a date range
+        if parsed.path == "/api/timeline":
+            self.timeline(parse_qs(parsed.query))
+            return
+
         # API: List all projects
         if parsed.path == "/api/projects":
-            self.list_projects()
+            self.list_projects(parse_qs(parsed.query))
             return
             
-        # API: Load specific project
+        # API: Server-computed schedule rollups
+        if parsed.path.startswith("/api/project/") and parsed.path.endswith("/summary"):
+            project_name = unquote(parsed.path[len("/api/project/"):-len("/summary")])
+            self.project_summary(project_name)
+            return
+
+        # API: iCalendar subscription feed
+        if parsed.path.startswith("/api/project/") and parsed.path.endswith("/calendar.ics"):
+            project_name = unquote(parsed.path[len("/api/project/"):-len("/calendar.ics")])
+            self.project_calendar(project_name)
+            return
+
+        # API: Version history of a journaled project
+        if parsed.path.startswith("/api/project/") and parsed.path.endswith("/history"):
+            project_name = unquote(parsed.path[len("/api/project/"):-len("/history")])
+            self.project_history(project_name)
+            return
+
+        # API: Load specific project (?version=N for an older journaled version)
         if parsed.path.startswith("/api/project/"):
             project_name = unquote(parsed.path.replace("/api/project/", ""))
-            self.load_project(project_name)
+            version = parse_qs(parsed.query).get("version", [None])[0]
+            if version is not None:
+                self.load_project_version(project_name, version)
+            else:
+                self.load_project(project_name)
             return
 
         # Redirect root to index.html
         if parsed.path == "/" or parsed.path == "":
             self.path = "/index.html"
-        
-        # Serve static files from scheduler directory
+
+        # App assets come from memory; anything else from the static directory
+        if self.send_asset(parsed):
+            return
         return super().do_GET()
+
+    @metered
+    def do_HEAD(self):
+        if self.send_asset(urlparse(self.path), head_only=True):
+            return
+        return super().do_HEAD()
     
+    @metered
+    @throttled
     def do_POST(self):
         parsed = urlparse(self.path)
         
@@ -108,8 +520,20 @@ class SchedulerHandler(http.server.SimpleHTTPRequestHandler):
             self.save_project(project_name)
             return
 
+        # API: Import a zip made by GET /api/archive
+        if parsed.path == "/api/archive":
+            self.receive_archive(parse_qs(parsed.query))
+            return
+
+        # API: Graceful stop requested by the tray app
+        if parsed.path == "/api/shutdown":
+            self.request_shutdown()
+            return
+
         self.send_error(404, "Not Found")
 
+    @metered
+    @throttled
     def do_DELETE(self):
         parsed = urlparse(self.path)
         
@@ -126,6 +550,8 @@ class SchedulerHandler(http.server.SimpleHTTPRequestHandler):
         
         self.send_error(404, "Not Found")
 
+    @metered
+    @throttled
     def do_PUT(self):
         parsed = urlparse(self.path)
         
@@ -137,99 +563,649 @@ class SchedulerHandler(http.server.SimpleHTTPRequestHandler):
         
         self.send_error(404, "Not Found")
 
-    def send_json(self, data):
+    @metered
+    @throttled
+    def do_PATCH(self):
+        parsed = urlparse(self.path)
+
+        # API: Apply incremental changes (JSON Patch) to a project
+        if parsed.path.startswith("/api/project/"):
+            project_name = unquote(parsed.path.replace("/api/project/", ""))
+            self.patch_project(project_name)
+            return
+
+        self.send_error(404, "Not Found")
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_body(body, "application/json; charset=utf-8", status, headers)
+
+    def send_body(self, body, content_type, status=200, headers=None):
+        """Send a response body, gzip-encoded when the client accepts it and it is big enough to matter"""
+        compressed = len(body) >= GZIP_MIN_BYTES and self.accepts_gzip()
+        if compressed:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        for key, value in (headers or {}).items():
+            if key == "ETag" and compressed:
+                # Each encoding is its own representation, so it gets its own strong ETag
+                value = value[:-1] + '-gzip"'
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def accepts_gzip(self):
+        return self.accepts_encoding("gzip")
+
+    def accepts_encoding(self, name):
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = part.strip().partition(";")
+            if coding.strip().lower() == name:
+                return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+        return False
+
+    def send_asset(self, parsed, head_only=False):
+        """Serve a preloaded static asset; returns False if the path isn't one"""
+        path = unquote(parsed.path)
+        asset = ASSETS.get("/index.html" if path in ("", "/") else path)
+        if asset is None:
+            return False
+
+        if asset.br is not None and self.accepts_encoding("br"):
+            body, encoding = asset.br, "br"
+        elif asset.gzip is not None and self.accepts_gzip():
+            body, encoding = asset.gzip, "gzip"
+        else:
+            body, encoding = asset.identity, None
+        etag = asset.etag if encoding is None else asset.etag[:-1] + f'-{encoding}"'
+        # Only the fingerprinted URL is immutable; a bare or stale ?v= must still revalidate
+        fingerprinted = parse_qs(parsed.query).get("v", [None])[0] == ASSETS.fingerprint
+        cache_control = IMMUTABLE_CACHE if asset.immutable and fingerprinted else REVALIDATE_CACHE
+
+        if self.etag_matches(asset.etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return True
+
         self.send_response(200)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode("utf-8"))
+        if not head_only:
+            self.wfile.write(body)
+        return True
+
+    def read_json_body(self):
+        """Receive (chunked or Content-Length, optionally gzip) and parse a JSON body of at most MAX_BODY_BYTES"""
+        return read_json(self.rfile, self.headers, MAX_BODY_BYTES)
+
+    def read_json_object(self):
+        """read_json_body() for routes that take a JSON object; anything else (an array, a number) is a 400"""
+        data = self.read_json_body()
+        if not isinstance(data, dict):
+            raise RequestBodyError(400, "Request body must be a JSON object")
+        return data
+
+    def body_limit(self):
+        """Largest request body this request may send"""
+        return MAX_ARCHIVE_BYTES if urlparse(self.path).path == "/api/archive" else MAX_BODY_BYTES
+
+    def reject_body(self, error):
+        """Answer a RequestBodyError; the rest of the body may still be unread, so the connection is closed"""
+        log.warning("Rejected request body: %s", error)
+        self.send_json({"success": False, "error": str(error)}, status=error.status, headers={"Connection": "close"})
+
+    def handle_expect_100(self):
+        # Refuse an oversized upload before the client starts sending it
+        try:
+            declared_length(self.headers, self.body_limit())
+        except RequestBodyError as e:
+            self.reject_body(e)
+            return False
+        return super().handle_expect_100()
+
+    def client_id(self):
+        """Id the browser tab sends with its writes, echoed in change events so it can skip its own"""
+        return self.headers.get("X-Client-Id") or None
 
-    def list_projects(self):
-        """List all project files in the data directory"""
+    def stream_events(self, query):
+        """Open a Server-Sent Events stream of project changes (optionally ?project=<name>)"""
+        project = query.get("project", [None])[0]
+        project = safe_filename(project) if project else None
+        last_event_id = self.headers.get("Last-Event-ID") or query.get("lastEventId", [None])[0]
         try:
-            projects = []
-            if os.path.exists(LIST_DIR):
-                for file in os.listdir(LIST_DIR):
-                    if file.endswith(".json") and file != "schedule.json":
-                        filepath = os.path.join(LIST_DIR, file)
-                        stat = os.stat(filepath)
-                        projects.append({
-                            "name": file.replace(".json", ""),
-                            "filename": file,
-                            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                            "size": stat.st_size
-                        })
-            # Sort by modification time (newest first)
-            projects.sort(key=lambda x: x["modified"], reverse=True)
-            self.send_json({"projects": projects})
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+        self.wfile.write(b"retry: 3000\n\n")
+        self.wfile.flush()
+
+        # The fan-out thread owns the connection from here on; this handler thread returns
+        self.server.detach(self.request)
+        EVENTS.attach_socket(self.connection, project, last_event_id)
+        self.close_connection = True
+
+    def send_health(self):
+        """Liveness probe: what is running, and how long startup took"""
+        self.send_json({
+            "status": "ok",
+            "pid": os.getpid(),
+            "engine": SERVER_MODE,
+            "storage": STORAGE_BACKEND,
+            "projects": STORE.count(),
+            "build": ASSETS.fingerprint,
+            "uptimeSeconds": round(time.time() - METRICS.started, 1),
+            "startupMs": STARTUP,
+            "load": dict(self.server.pool.stats(), throttledWrites=WRITE_LIMITER.limited),
+        }, headers={"Cache-Control": "no-store"})
+
+    def request_shutdown(self):
+        """Stop serving after this response; run() then flushes pending saves and exits.
+
+        On Windows the tray can only hard-kill its child, so this is how it stops
+        the server without losing writes still waiting in the write-behind window.
+        """
+        token = self.headers.get("X-Control-Token", "")
+        if not CONTROL_TOKEN or not hmac.compare_digest(token, CONTROL_TOKEN):
+            self.send_json({"success": False, "error": "Forbidden"}, 403)
+            return
+        log.info("Shutdown requested by the tray app.")
+        self.send_json({"success": True})
+        # shutdown() waits for serve_forever() to return, which can't happen inside a request
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def send_metrics(self, query):
+        """Request counts, latency/size histograms and storage timings"""
+        if query.get("format", [""])[0] == "json" or "application/json" in self.headers.get("Accept", ""):
+            self.send_json(METRICS.snapshot(), headers={"Cache-Control": "no-store"})
+        else:
+            self.send_body(METRICS.prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8",
+                           headers={"Cache-Control": "no-store"})
+
+    def search_projects(self, query):
+        """Ranked task hits for ?q= from the in-memory search index (optionally ?project=, ?limit=)"""
+        try:
+            text = query.get("q", [""])[0]
+            limit = min(max(int(query.get("limit", [50])[0]), 1), 500)
+            project = query.get("project", [None])[0]
+            wait_for_indexes()
+            hits, total = SEARCH.search(text, limit, safe_filename(project) if project else None)
+            self.send_json({"query": text, "total": total, "hits": hits}, headers={"Cache-Control": "no-store"})
+        except ValueError:
+            self.send_json({"success": False, "error": "Invalid limit"}, 400)
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def timeline(self, query):
+        """Segments and events of every project overlapping ?from=..&to= (inclusive dates; default the next two weeks)"""
+        try:
+            first_day = parse_day(query.get("from", [""])[0], datetime.now().date())
+            last_day = parse_day(query.get("to", [""])[0], first_day + timedelta(days=13))
+        except ValueError:
+            self.send_json({"success": False, "error": "Dates must be YYYY-MM-DD"}, 400)
+            return
+        if last_day < first_day:
+            self.send_json({"success": False, "error": "'to' is before 'from'"}, 400)
+            return
+        try:
+            project = query.get("project", [None])[0]
+            wait_for_indexes()
+            segments = TIMELINE.query(first_day, last_day, safe_filename(project) if project else None)
+            self.send_json({
+                "from": first_day.isoformat(),
+                "to": last_day.isoformat(),
+                "total": len(segments),
+                "segments": segments,
+            }, headers={"Cache-Control": "no-store"})
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def list_projects(self, query):
+        """List projects (newest first) from the in-memory index.
+
+        Optional query parameters: since (epoch seconds or ISO time) returns only
+        projects changed after it plus the names deleted since; offset/limit page.
+        """
+        try:
+            since = query.get("since", [None])[0]
+            if since:
+                try:
+                    since = float(since)
+                except ValueError:
+                    since = datetime.fromisoformat(since).timestamp()
+            offset = int(query.get("offset", [0])[0])
+            limit = query.get("limit", [None])[0]
+            limit = int(limit) if limit else None
+        except ValueError:
+            self.send_json({"error": "Invalid since/offset/limit"}, status=400)
+            return
+
+        try:
+            server_time = datetime.now().timestamp()
+            projects, total, deleted = STORE.list(since or None, offset, limit)
+            self.send_json({"projects": projects, "total": total, "deleted": deleted, "serverTime": server_time})
         except Exception as e:
             self.send_error(500, str(e))
 
+    def bulk_projects(self, query):
+        """Stream projects as NDJSON, one {"name", "revision", "project"} object per line.
+
+        ?names=a,b (or repeated names=) picks projects, ?all=1 streams every project
+        newest first, and ?fields=startDate,holidays keeps only those document fields.
+        """
+        every = query.get("all", ["0"])[0] not in ("", "0", "false")
+        if every:
+            # An empty store is an empty stream, not an error
+            names = [entry["name"] for entry in STORE.list()[0]]
+        else:
+            names = [safe_filename(n) for value in query.get("names", []) for n in value.split(",") if n.strip()]
+        if not names and not every:
+            self.send_json({"error": "Pass names=<a,b,...> or all=1"}, status=400)
+            return
+        fields = [f for value in query.get("fields", []) for f in value.split(",") if f and f not in ("name", "revision")]
+
+        def lines():
+            # One project in memory at a time
+            for name in names:
+                stored = STORE.read(name)
+                if stored is None:
+                    yield json.dumps({"name": name, "error": "Project not found"}, ensure_ascii=False).encode("utf-8") + b"\n"
+                    continue
+                raw, revision = stored
+                head = json.dumps({"name": name, "revision": revision}, ensure_ascii=False).encode("utf-8")[:-1]
+                if fields or b"\n" in raw:
+                    doc = json.loads(raw.decode("utf-8"))
+                    if fields:
+                        doc = {f: doc[f] for f in fields if f in doc}
+                    raw = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                yield head + b', "project": ' + raw + b"}\n"
+
+        self.send_stream("application/x-ndjson; charset=utf-8", lines())
+
+    def send_archive(self):
+        """Stream every project as a zip (see archive.py); X-Archive-Projects tells clients how many to expect"""
+        filename = datetime.now().strftime("quantum-scheduler-%Y%m%d-%H%M%S.zip")
+        started = time.perf_counter()
+
+        def pieces():
+            sent = 0
+            for piece in export_archive(STORE, log_progress("Archive export")):
+                sent += len(piece)
+                yield piece
+            log.info("Archive exported: %d bytes in %.1fs.", sent, time.perf_counter() - started)
+
+        self.send_stream("application/zip", pieces(), compress=False, headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Archive-Projects": str(STORE.count()),
+        })
+
+    def receive_archive(self, query):
+        """Import a zip of projects; ?policy=skip|overwrite|rename (default skip) decides what happens to taken names"""
+        policy = query.get("policy", ["skip"])[0]
+        if policy not in CONFLICT_POLICIES:
+            self.send_json({"success": False, "error": f"policy must be one of {', '.join(CONFLICT_POLICIES)}"},
+                           status=400, headers={"Connection": "close"})
+            return
+        try:
+            started = time.perf_counter()
+            with spool_body(self.rfile, self.headers, MAX_ARCHIVE_BYTES) as spool:
+                result = import_archive(STORE, spool, policy, safe_filename, MAX_BODY_BYTES, origin=self.client_id(),
+                                        progress=log_progress("Archive import"))
+            # A restored backup is on disk before the client hears it succeeded
+            STORE.flush()
+            self.send_json({"success": True, **result})
+            log.info("Archive imported (%s): %s in %.1fs.", policy,
+                     ", ".join(f"{n} {outcome}" for outcome, n in result["counts"].items() if n) or "nothing",
+                     time.perf_counter() - started)
+        except RequestBodyError as e:
+            self.reject_body(e)
+        except ArchiveError as e:
+            log.warning("Rejected archive: %s", e)
+            self.send_json({"success": False, "error": str(e)}, status=400)
+        except Exception as e:
+            log.exception("Error importing archive: %s", e)
+            self.send_error(500, str(e))
+
+    def send_stream(self, content_type, pieces, compress=True, headers=None):
+        """Send a body of unknown length: chunked on HTTP/1.1, close-delimited otherwise, gzip if accepted.
+
+        compress=False is for bodies that are compressed already (zip).
+        """
+        chunked = self.request_version == "HTTP/1.1" and self.protocol_version == "HTTP/1.1"
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress and self.accepts_gzip() else None
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache")
+        if compress:
+            self.send_header("Vary", "Accept-Encoding")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if compressor:
+            self.send_header("Content-Encoding", "gzip")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+        def write(data):
+            if data:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+        buffer = bytearray()
+        try:
+            for piece in pieces:
+                buffer += compressor.compress(piece) if compressor else piece
+                if len(buffer) >= STREAM_CHUNK_BYTES:
+                    write(bytes(buffer))
+                    buffer.clear()
+            if compressor:
+                buffer += compressor.flush()
+            write(bytes(buffer))
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except Exception as e:
+            # Headers are gone already; cutting the connection is the only way to signal it
+            log.error("Streamed response aborted: %s", e)
+            self.close_connection = True
+
     def load_project(self, project_name):
         """Load a specific project file"""
         try:
             safe_name = safe_filename(project_name)
-            filepath = os.path.join(LIST_DIR, f"{safe_name}.json")
+            stored = STORE.read(safe_name)
 
-            
-            if os.path.exists(filepath):
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = f.read()
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json; charset=utf-8")
+            if stored is None:
+                self.send_json({"error": "Project not found", "name": project_name})
+                return
+
+            data, revision = stored
+            etag = f'"{revision}"'
+            if self.etag_matches(etag):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("X-Revision", revision)
+                self.end_headers()
+                return
+
+            self.send_body(data, "application/json; charset=utf-8", headers={
+                "ETag": etag,
+                "Cache-Control": "no-cache",
+                "X-Revision": revision,
+            })
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def project_summary(self, project_name):
+        """Per-node rollups (parent ranges, merged segments, working days) for a project"""
+        try:
+            safe_name = safe_filename(project_name)
+            stored = STORE.read(safe_name)
+            if stored is None:
+                self.send_json({"success": False, "error": "Project not found", "name": project_name}, 404)
+                return
+
+            data, revision = stored
+            etag = f'"{revision}-summary"'
+            if self.etag_matches(etag):
+                self.send_response(304)
+                self.send_header("ETag", etag)
                 self.end_headers()
-                self.wfile.write(data.encode("utf-8"))
+                return
+
+            cached = SUMMARIES.get(safe_name)
+            if cached is not None and cached[1] == revision:
+                body = cached[0]
             else:
-                self.send_json({"error": "Project not found", "name": project_name})
+                summary = summarize_schedule(json.loads(data.decode("utf-8")))
+                body = json.dumps(dict(summary, name=safe_name, revision=revision), ensure_ascii=False).encode("utf-8")
+                SUMMARIES.put(safe_name, body, revision)
+            self.send_body(body, "application/json; charset=utf-8", headers={
+                "ETag": etag,
+                "Cache-Control": "no-cache",
+                "X-Revision": revision,
+            })
         except Exception as e:
             self.send_error(500, str(e))
 
+    def project_calendar(self, project_name):
+        """The project's task segments as an iCalendar feed calendar apps can subscribe to"""
+        try:
+            safe_name = safe_filename(project_name)
+            stored = STORE.read(safe_name)
+            if stored is None:
+                self.send_json({"success": False, "error": "Project not found", "name": project_name}, 404)
+                return
+
+            data, revision = stored
+            modified = STORE.modified(safe_name) or time.time()
+            etag = f'"{revision}-ics"'
+            headers = {
+                "ETag": etag,
+                "Last-Modified": formatdate(modified, usegmt=True),
+                "Cache-Control": "no-cache",
+                "X-Revision": revision,
+            }
+            if self.etag_matches(etag) or self.not_modified_since(modified):
+                self.send_response(304)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                return
+
+            cached = CALENDARS.get(safe_name)
+            if cached is not None and cached[1] == revision:
+                body = cached[0]
+            else:
+                body = build_calendar(json.loads(data.decode("utf-8")), safe_name, modified)
+                CALENDARS.put(safe_name, body, revision)
+            self.send_body(body, "text/calendar; charset=utf-8", headers=headers)
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def project_history(self, project_name):
+        """List the retained versions of a project stored in journal format"""
+        try:
+            safe_name = safe_filename(project_name)
+            versions = STORE.history(safe_name)
+            if versions is None:
+                self.send_json({"success": False, "error": "No history for this project", "name": project_name}, 404)
+                return
+            for entry in versions:
+                entry["time"] = datetime.fromtimestamp(entry["time"]).isoformat() if entry["time"] else None
+            self.send_json({"name": safe_name, "versions": versions})
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def load_project_version(self, project_name, version):
+        """Load a journaled project as it was at an earlier version"""
+        try:
+            safe_name = safe_filename(project_name)
+            stored = STORE.read_version(safe_name, int(version)) if version.isdigit() else None
+            if stored is None:
+                self.send_json({"success": False, "error": "Version not found", "name": project_name, "version": version}, 404)
+                return
+
+            data, revision = stored
+            etag = f'"{revision}"'
+            if self.etag_matches(etag):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            # A past version never changes
+            self.send_body(data, "application/json; charset=utf-8", headers={
+                "ETag": etag,
+                "Cache-Control": "private, max-age=3600",
+                "X-Revision": revision,
+            })
+        except Exception as e:
+            self.send_error(500, str(e))
+
+    def etag_matches(self, etag):
+        """True if the request's If-None-Match names this ETag"""
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        # Any encoding of the same revision is still fresh
+        candidates = [re.sub(r'-(gzip|br)"$', '"', c.strip()) for c in header.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    def not_modified_since(self, modified):
+        """True if If-Modified-Since is at or after `modified` (ignored when If-None-Match is sent)"""
+        header = self.headers.get("If-Modified-Since")
+        if not header or "If-None-Match" in self.headers:
+            return False
+        try:
+            since = parsedate_to_datetime(header).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole seconds
+        return int(modified) <= since
+
+    def if_match(self, revision):
+        """True if the request's If-Match names this revision (None: the project doesn't exist)"""
+        header = self.headers.get("If-Match", "")
+        for candidate in header.split(","):
+            candidate = re.sub(r'-(gzip|br)"$', '"', candidate.strip())
+            if revision is not None and candidate in ("*", f'"{revision}"', revision):
+                return True
+        return False
+
     def save_project(self, project_name):
-        """Save to a specific project file"""
+        """Save to a specific project file.
+
+        With If-Match, the save only goes through if the stored copy is still that
+        revision (409 otherwise), so a stale device can't overwrite newer data.
+        """
         try:
-            content_length = int(self.headers.get("Content-Length", 0))
-            body = self.rfile.read(content_length)
-            incoming_data = json.loads(body.decode("utf-8"))
+            incoming_data = self.read_json_object()
             
             # Sanitize filename (preserves Korean)
             safe_name = safe_filename(project_name)
-            filepath = os.path.join(LIST_DIR, f"{safe_name}.json")
             
-            # Write new data
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(incoming_data, f, ensure_ascii=False, indent=2)
+            with STORE.locked(safe_name):
+                if "If-Match" in self.headers:
+                    stored = STORE.read(safe_name)
+                    current_revision = stored[1] if stored else None
+                    if not self.if_match(current_revision):
+                        self.send_json({"success": False, "error": "Revision mismatch", "revision": current_revision}, status=409)
+                        return
+
+                # Accepted into memory; the store commits it to disk shortly after
+                revision, version, changed = STORE.save(safe_name, incoming_data, origin=self.client_id())
             
             save_time = incoming_data.get("saveDate") or datetime.now().isoformat()
             
-            self.send_json({"success": True, "saved": save_time, "filename": f"{safe_name}.json"})
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Project '{safe_name}' saved.")
+            self.send_json({"success": True, "saved": save_time, "filename": safe_name + STORE.extension,
+                            "revision": revision, "version": version, "unchanged": not changed})
+            log.debug("Project '%s' %s.", safe_name, "saved" if changed else "unchanged, not rewritten")
             
+        except RequestBodyError as e:
+            self.reject_body(e)
         except Exception as e:
-            print(f"Error saving project: {e}")
+            log.exception("Error saving project: %s", e)
+            self.send_error(500, str(e))
+
+    def patch_project(self, project_name):
+        """Apply a JSON Patch (RFC 6902) to a stored project.
+
+        The client names the revision it diffed against in If-Match; if the stored
+        copy has moved on, or the patch doesn't apply to it (a failed test op, a
+        missing path), it gets 409 and falls back to a full POST. A malformed
+        patch document gets 400, and a patch without If-Match 428: it was diffed
+        against some revision, and applying it to whatever is stored could
+        silently merge into the wrong document.
+        """
+        try:
+            operations = self.read_json_body()
+
+            if not self.headers.get("If-Match", "").strip():
+                self.send_json({"success": False, "error": "PATCH requires an If-Match revision"}, status=428)
+                return
+
+            safe_name = safe_filename(project_name)
+
+            # Hold the project lock so a concurrent save can't slip in between read and write
+            with STORE.locked(safe_name):
+                stored = STORE.read(safe_name)
+
+                if stored is None:
+                    self.send_json({"success": False, "error": "Project not found"}, status=404)
+                    return
+
+                raw, current_revision = stored
+
+                if not self.if_match(current_revision):
+                    self.send_json({"success": False, "error": "Revision mismatch", "revision": current_revision}, status=409)
+                    return
+
+                try:
+                    patched = apply_patch(json.loads(raw.decode("utf-8")), operations)
+                except InvalidPatchError as e:
+                    self.send_json({"success": False, "error": str(e), "revision": current_revision}, status=400)
+                    return
+                except JsonPatchError as e:
+                    self.send_json({"success": False, "error": str(e), "revision": current_revision}, status=409)
+                    return
+                if not isinstance(patched, dict):
+                    self.send_json({"success": False, "error": "Patched project must be a JSON object",
+                                    "revision": current_revision}, status=400)
+                    return
+
+                revision, version, changed = STORE.save(safe_name, patched, patch=operations, origin=self.client_id())
+
+            save_time = patched.get("saveDate") or datetime.now().isoformat()
+
+            self.send_json({"success": True, "saved": save_time, "filename": safe_name + STORE.extension,
+                            "revision": revision, "version": version, "unchanged": not changed})
+            log.debug("Project '%s' patched (%d ops).", safe_name, len(operations))
+
+        except RequestBodyError as e:
+            self.reject_body(e)
+        except Exception as e:
+            log.exception("Error patching project: %s", e)
             self.send_error(500, str(e))
 
     def delete_project(self, project_name):
         """Delete a project file"""
         try:
             safe_name = safe_filename(project_name)
-            filepath = os.path.join(LIST_DIR, f"{safe_name}.json")
             
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            if STORE.delete(safe_name, origin=self.client_id()):
                 self.send_json({"success": True, "deleted": project_name})
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Project '{safe_name}' deleted.")
+                log.debug("Project '%s' deleted.", safe_name)
             else:
                 self.send_json({"success": False, "error": "Project not found"})
         except Exception as e:
-            print(f"Error deleting project: {e}")
+            log.exception("Error deleting project: %s", e)
             self.send_error(500, str(e))
 
     def rename_project(self, project_name):
         """Rename a project file"""
         try:
-            content_length = int(self.headers.get("Content-Length", 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode("utf-8"))
-            new_name = data.get("newName", "").strip()
+            data = self.read_json_object()
+            new_name = data.get("newName")
+            new_name = new_name.strip() if isinstance(new_name, str) else ""
             
             if not new_name:
                 self.send_json({"success": False, "error": "New name required"})
@@ -238,29 +1214,24 @@ class SchedulerHandler(http.server.SimpleHTTPRequestHandler):
             safe_old = safe_filename(project_name)
             safe_new = safe_filename(new_name)
             
-            old_path = os.path.join(LIST_DIR, f"{safe_old}.json")
-            new_path = os.path.join(LIST_DIR, f"{safe_new}.json")
-            
-            if os.path.exists(old_path):
-                os.rename(old_path, new_path)
+            if STORE.rename(safe_old, safe_new, origin=self.client_id()):
                 self.send_json({"success": True, "oldName": safe_old, "newName": safe_new})
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Project renamed: '{safe_old}' -> '{safe_new}'")
+                log.info("Project renamed: '%s' -> '%s'", safe_old, safe_new)
             else:
                 self.send_json({"success": False, "error": "Project not found"})
+        except ProjectExistsError:
+            self.send_json({"success": False, "error": "A project with that name already exists"}, status=409)
+        except RequestBodyError as e:
+            self.reject_body(e)
         except Exception as e:
-            print(f"Error renaming project: {e}")
+            log.exception("Error renaming project: %s", e)
             self.send_error(500, str(e))
 
     def delete_all_projects(self):
         """Delete all project files in the list directory"""
         try:
-            count = 0
             # Remove all files in the LIST_DIR
-            if os.path.exists(LIST_DIR):
-                for file in os.listdir(LIST_DIR):
-                    if file.endswith(".json"):
-                        os.remove(os.path.join(LIST_DIR, file))
-                        count += 1
+            count = STORE.delete_all(origin=self.client_id())
             
             # Also reset default schedule if it exists
             if os.path.exists(SCHEDULE_FILE):
@@ -268,15 +1239,57 @@ class SchedulerHandler(http.server.SimpleHTTPRequestHandler):
                 count += 1
             
             self.send_json({"success": True, "deleted_count": count})
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] All {count} projects/data deleted.")
+            log.info("All %d projects/data deleted.", count)
         except Exception as e:
-            print(f"Error deleting all projects: {e}")
+            log.exception("Error deleting all projects: %s", e)
             self.send_error(500, str(e))
 
 
 
+class SchedulerHTTPServer(http.server.ThreadingHTTPServer):
+    """ThreadingHTTPServer that runs connections on a bounded pool and lets a handler hand its connection to another owner.
+
+    A connection arriving while every worker is busy and `queue_depth` more are
+    waiting is answered 503 (with Retry-After) from the accept loop and closed.
+    """
+
+    def __init__(self, server_address, handler_class, workers=32, queue_depth=64):
+        super().__init__(server_address, handler_class)
+        self.pool = BoundedExecutor(workers, queue_depth)
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        if self.pool.submit(self.process_request_thread, request, client_address) is None:
+            log.warning("Request pool full (%d workers, %d queued); refusing %s.", self.pool.workers,
+                        self.pool.queue_depth, client_address[0])
+            try:
+                request.settimeout(1)
+                request.sendall(overload_response())
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+    def detach(self, request):
+        """Keep the socket open after the handler returns (e.g. an event stream)"""
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+
+@functools.lru_cache(maxsize=None)
 def get_local_ip():
-    """Get local IP address for network access"""
+    """Get local IP address for network access (looked up once)"""
     import socket
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -287,83 +1300,136 @@ def get_local_ip():
     except:
         return "127.0.0.1"
 
-def setup_logging():
-    """Redirect stdout/stderr to a log file when frozen (no console attached)."""
-    # Running as a script keeps the terminal output — redirecting it only hurts development.
-    if getattr(sys, 'frozen', False):
-        log_path = os.path.join(os.path.dirname(sys.executable), 'server_debug.log')
-        sys.stdout = sys.stderr = open(log_path, 'a', encoding='utf-8', buffering=1)
-    print(f"[{datetime.now()}] Server Process Started")
-    print(f"[{datetime.now()}] Python: {sys.version}")
-
-setup_logging()
-
-
 def run():
     try:
         # Ensure we are in the script's directory (or DATA_DIR)
-        print(f"[{datetime.now()}] run() called")
-        print(f"[{datetime.now()}] DATA_DIR: {DATA_DIR}")
-        print(f"[{datetime.now()}] STATIC_DIR: {STATIC_DIR}")
-        
+        log.info("run() called")
+        log.info("DATA_DIR: %s", DATA_DIR)
+        log.info("STATIC_DIR: %s", STATIC_DIR)
+        STARTUP["loadMs"] = round((time.perf_counter() - LOAD_STARTED) * 1000, 1)
+
         if os.path.exists(DATA_DIR):
             os.chdir(DATA_DIR)
-            print(f"[{datetime.now()}] Changed CWD to: {os.getcwd()}")
-        
+            log.info("Changed CWD to: %s", os.getcwd())
+
+        # The port file doubles as the readiness signal, so one left by an earlier run must go first
+        port_file = os.path.join(DATA_DIR, "server_port.txt")
+        try:
+            os.remove(port_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("Could not remove stale port file: %s", e)
+
         # Handler wrapping to catch request errors
         class LoggingHandler(SchedulerHandler):
+            def log_request(self, code='-', size='-'):
+                pass  # metered() writes the access log, with timings, when QS_ACCESS_LOG=1
+
             def log_message(self, format, *args):
-                print(f"[{datetime.now()}] {format % args}")
+                log.info(format, *args)
             
             def log_error(self, format, *args):
-                print(f"[{datetime.now()}] ERROR: {format % args}")
+                log.warning(format, *args)
 
         # Try to find an available port
         httpd = None
         bound_port = None
+        started = time.perf_counter()
         
         # Try ports from PORT to PORT+10
         for try_port in range(PORT, PORT + 10):
             try:
-                print(f"[{datetime.now()}] Attempting to bind to port {try_port}...")
-                server_instance = http.server.ThreadingHTTPServer(("", try_port), LoggingHandler)
+                log.info("Attempting to bind to port %d...", try_port)
+                if SERVER_MODE == "asyncio":
+                    server_instance = AsyncHTTPServer(("", try_port), LoggingHandler, EVENTS, WORKERS, KEEPALIVE_SECONDS,
+                                                      QUEUE_DEPTH, clean_name=safe_filename)
+                else:
+                    server_instance = SchedulerHTTPServer(("", try_port), LoggingHandler, WORKERS, QUEUE_DEPTH)
                 httpd = server_instance
                 bound_port = try_port
                 break
             except OSError as e:
-                print(f"[{datetime.now()}] Port {try_port} is busy ({e}). Trying next...")
+                log.warning("Port %d is busy (%s). Trying next...", try_port, e)
         
         if not httpd:
             raise Exception(f"Could not find an available port in range {PORT}-{PORT+9}")
+        STARTUP["bindMs"] = round((time.perf_counter() - started) * 1000, 1)
 
-        # Save the actual port to a file for tray app to read
-        port_file = os.path.join(DATA_DIR, "server_port.txt")
+        # With the port held, connections queue in the backlog while the index and assets load
+        started = time.perf_counter()
+        STORE.rebuild_index()
+        STARTUP["indexMs"] = round((time.perf_counter() - started) * 1000, 1)
+        log.info("Indexed %d projects (%s storage).", STORE.count(), STORAGE_BACKEND)
+        started = time.perf_counter()
+        index_all_projects()
+        threading.Thread(target=apply_index_changes, name="content-index", daemon=True).start()
+        STARTUP["contentMs"] = round((time.perf_counter() - started) * 1000, 1)
+        log.info("Search index: %d tasks; timeline: %d dated segments.", SEARCH.stats()["entries"], TIMELINE.count())
+        # External edits to list/ reach the index, caches and event clients as they happen
+        watcher = None
+        if STORAGE_BACKEND == "files":
+            watcher = start_watcher(LIST_DIR, STORE.refresh, WATCH_MODE, WATCH_DEBOUNCE, WATCH_POLL_INTERVAL)
+            STORE.watched = watcher is not None
+            log.info("Watching %s for external changes: %s.", LIST_DIR, watcher.mode if watcher else "off")
+        started = time.perf_counter()
+        log.info("Loaded %d static assets (build %s).", ASSETS.load(), ASSETS.fingerprint)
+        STARTUP["assetsMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Ready: the tray app watches for this file (written atomically, so it never sees a partial port)
         try:
-            with open(port_file, "w") as f:
-                f.write(str(bound_port))
+            atomic_write(port_file, str(bound_port).encode("ascii"))
         except Exception as e:
-            print(f"[{datetime.now()}] Warning: Could not write port file: {e}")
+            log.warning("Could not write port file: %s", e)
+        STARTUP["readyMs"] = round((time.perf_counter() - LOAD_STARTED) * 1000, 1)
+        log.info("Ready on port %d in %.0f ms (load %.0f, bind %.0f, index %.0f, content %.0f, assets %.0f).",
+                 bound_port, STARTUP["readyMs"], STARTUP["loadMs"], STARTUP["bindMs"], STARTUP["indexMs"],
+                 STARTUP["contentMs"], STARTUP["assetsMs"])
 
         with httpd:
             local_ip = get_local_ip()
-            print("=" * 60)
-            print("  Quantum Scheduler - Shared Network Server")
-            print("=" * 60)
-            print(f"\n  * Local Access:   http://localhost:{bound_port}")
-            print(f"  * Network Access: http://{local_ip}:{bound_port}")
-            print(f"\n  Data Directory:   {DATA_DIR}")
-            print(f"  Schedule File:    {SCHEDULE_FILE}")
-            print("\n  [SERVER STATUS: RUNNING]")
-            print("  Press Ctrl+C to stop the server.")
-            print("=" * 60)
+            log.info("\n".join([
+                "=" * 60,
+                "  Quantum Scheduler - Shared Network Server",
+                "=" * 60,
+                f"\n  * Local Access:   http://localhost:{bound_port}",
+                f"  * Network Access: http://{local_ip}:{bound_port}",
+                f"\n  Data Directory:   {DATA_DIR}",
+                f"  Schedule File:    {SCHEDULE_FILE}",
+                f"  HTTP Engine:      {SERVER_MODE} ({WORKERS} workers, queue {QUEUE_DEPTH})",
+                "\n  [SERVER STATUS: RUNNING]",
+                "  Press Ctrl+C to stop the server.",
+                "=" * 60,
+            ]))
             
-            httpd.serve_forever()
+            # Turn SIGTERM into a normal exit so pending saves still get flushed
+            try:
+                signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            except ValueError:
+                pass  # Not in the main thread
+
+            try:
+                httpd.serve_forever()
+            finally:
+                if watcher is not None:
+                    watcher.stop()
+                    watcher.join(1.0)
+                STORE.close()
+                log.info("Pending saves flushed.")
+                # No port file once the server is gone, so nothing mistakes it for a running one
+                try:
+                    with open(port_file) as f:
+                        ours = f.read().strip() == str(bound_port)
+                    if ours:
+                        os.remove(port_file)
+                except OSError:
+                    pass
             
     except Exception as e:
-        print(f"[{datetime.now()}] FATAL CRASH: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("FATAL CRASH: %s", e)
         raise
+    finally:
+        shutdown_logging()
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,274 @@
+"""
+SQLite project storage (QS_STORAGE_BACKEND=sqlite).
+
+Project documents, their listing metadata and revisions live in one database
+file in WAL mode: any number of request threads read concurrently while a
+single writer commits. Renames, delete-all and archive imports are single
+transactions, and listings are an indexed query. On first start the existing
+list/ files and the legacy schedule.json are imported once; the files themselves are left in place.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    from .metrics import METRICS
+    from .project_index import TOMBSTONE_SECONDS, public_entry, summarize_project
+    from .storage import ProjectExistsError, StorageBackend, content_revision, encode_project, unchanged_save
+except ImportError:  # Running as a script (python server/server.py)
+    from metrics import METRICS
+    from project_index import TOMBSTONE_SECONDS, public_entry, summarize_project
+    from storage import ProjectExistsError, StorageBackend, content_revision, encode_project, unchanged_save
+
+log = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    revision TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    task_count INTEGER NOT NULL,
+    first_date TEXT,
+    last_date TEXT
+);
+CREATE INDEX IF NOT EXISTS projects_mtime ON projects (mtime);
+CREATE TABLE IF NOT EXISTS tombstones (
+    name TEXT PRIMARY KEY,
+    deleted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tombstones_deleted_at ON tombstones (deleted_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+LISTING_COLUMNS = "name, size, mtime, revision, version, task_count, first_date, last_date"
+
+
+class SQLiteProjectStore(StorageBackend):
+    """Projects in a single WAL-mode SQLite database.
+
+    `legacy` is a ProjectStore over the old list directory and `legacy_schedule`
+    the old schedule.json; both are only read by the one-shot migration.
+    """
+
+    def __init__(self, db_path, legacy=None, legacy_schedule=None):
+        super().__init__()
+        self.db_path = db_path
+        self.legacy = legacy
+        self.legacy_schedule = legacy_schedule
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Databases created before version counters existed
+        if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(projects)")}:
+            conn.execute("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+    # --- Connections ---
+
+    def _conn(self):
+        """This thread's connection; it is closed when the thread goes away"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """One write transaction at a time; readers carry on against the last commit"""
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            # With synchronous=NORMAL this is the WAL write; the fsync comes at checkpoints
+            with METRICS.timed("commit"):
+                conn.execute("COMMIT")
+
+    # --- Reads ---
+
+    def read(self, name):
+        row = self._conn().execute("SELECT body, revision FROM projects WHERE name = ?", (name,)).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def list(self, since=None, offset=0, limit=None):
+        conn = self._conn()
+        where, params = ("WHERE mtime > ?", [since]) if since is not None else ("", [])
+        total = conn.execute(f"SELECT COUNT(*) FROM projects {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {LISTING_COLUMNS} FROM projects {where} ORDER BY mtime DESC LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset],
+        ).fetchall()
+        deleted = []
+        if since is not None:
+            deleted = [r[0] for r in conn.execute("SELECT name FROM tombstones WHERE deleted_at > ?", (since,))]
+        return [public_entry(self._entry(row)) for row in rows], total, deleted
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def modified(self, name):
+        row = self._conn().execute("SELECT mtime FROM projects WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _entry(self, row):
+        name, size, mtime, revision, version, task_count, first_date, last_date = row
+        return {
+            "name": name,
+            "filename": name + self.extension,
+            "size": size,
+            "mtime": mtime,
+            "revision": revision,
+            "version": version,
+            "taskCount": task_count,
+            "firstDate": first_date,
+            "lastDate": last_date,
+        }
+
+    # --- Writes ---
+
+    def save(self, name, data, patch=None, origin=None):
+        with self.locked(name):
+            with self._transaction() as conn:
+                revision, version, changed, base_revision = self._write(conn, name, data)
+            if changed:
+                self._notify("save", name, revision=revision, version=version, patch=patch, origin=origin,
+                             document=data, baseRevision=base_revision)
+        return revision, version, changed
+
+    def save_many(self, items, origin=None):
+        """All the saves in one transaction: either every document is stored or none is"""
+        results = []
+        with self._transaction() as conn:
+            for name, data in items:
+                results.append((name,) + self._write(conn, name, data))
+        # Listeners only hear about committed saves; documents are read back one at a time
+        for name, revision, version, changed, base_revision in results:
+            if changed:
+                document = json.loads(self.read(name)[0].decode("utf-8"))
+                self._notify("save", name, revision=revision, version=version, origin=origin, document=document,
+                             baseRevision=base_revision)
+        return [result[:4] for result in results]
+
+    def _write(self, conn, name, data):
+        """Store one document inside a transaction; returns (revision, version, changed, previous revision)"""
+        raw = encode_project(data, "compact")
+        revision = content_revision(raw)
+        row = conn.execute("SELECT body, revision, version FROM projects WHERE name = ?", (name,)).fetchone()
+        if row and unchanged_save((bytes(row[0]), row[1]), raw, revision, data):
+            return row[1], row[2], False, row[1]
+        version = row[2] + 1 if row else 1
+        self._upsert(conn, name, raw, data, revision, time.time(), version)
+        return revision, version, True, row[1] if row else None
+
+    @staticmethod
+    def _upsert(conn, name, raw, doc, revision, mtime, version=1):
+        task_count, first_date, last_date = summarize_project(doc)
+        conn.execute(
+            "INSERT OR REPLACE INTO projects (name, body, revision, version, size, mtime, task_count, first_date, last_date)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, raw, revision, version, len(raw), mtime, task_count, first_date, last_date),
+        )
+        conn.execute("DELETE FROM tombstones WHERE name = ?", (name,))
+
+    def delete(self, name, origin=None):
+        with self.locked(name):
+            now = time.time()
+            with self._transaction() as conn:
+                removed = conn.execute("DELETE FROM projects WHERE name = ?", (name,)).rowcount > 0
+                if removed:
+                    self._tombstone(conn, [name], now)
+            if removed:
+                self._notify("delete", name, origin=origin)
+            return removed
+
+    def rename(self, old, new, origin=None):
+        with self.locked(old, new):
+            now = time.time()
+            with self._transaction() as conn:
+                if conn.execute("SELECT 1 FROM projects WHERE name = ?", (old,)).fetchone() is None:
+                    return False
+                if new != old and conn.execute("SELECT 1 FROM projects WHERE name = ?", (new,)).fetchone():
+                    raise ProjectExistsError(new)
+                conn.execute("UPDATE projects SET name = ?, mtime = ? WHERE name = ?", (new, now, old))
+                conn.execute("DELETE FROM tombstones WHERE name = ?", (new,))
+                self._tombstone(conn, [old], now)
+            self._notify("rename", old, newName=new, origin=origin)
+            return True
+
+    def delete_all(self, origin=None):
+        now = time.time()
+        with self._transaction() as conn:
+            names = [r[0] for r in conn.execute("SELECT name FROM projects")]
+            conn.execute("DELETE FROM projects")
+            self._tombstone(conn, names, now)
+        self._notify("clear", None, origin=origin)
+        return len(names)
+
+    @staticmethod
+    def _tombstone(conn, names, when):
+        conn.executemany("INSERT OR REPLACE INTO tombstones (name, deleted_at) VALUES (?, ?)",
+                         [(n, when) for n in names])
+        conn.execute("DELETE FROM tombstones WHERE deleted_at < ?", (when - TOMBSTONE_SECONDS,))
+
+    # --- Migration / lifecycle ---
+
+    def rebuild_index(self):
+        """Import the file-based projects the first time the database is used"""
+        conn = self._conn()
+        if conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone():
+            return
+        imported = 0
+        with self._transaction() as conn:
+            if self.legacy is not None:
+                self.legacy.rebuild_index()
+                for name in self.legacy.index.names():
+                    stored = self.legacy.read(name)
+                    entry = self.legacy.index.get(name)
+                    if stored is None or entry is None:
+                        continue
+                    raw, revision = stored
+                    # Keep the stored bytes, so revisions (and browsers' ETags) stay valid
+                    self._upsert(conn, name, raw, json.loads(raw.decode("utf-8")), revision, entry["mtime"],
+                                 entry.get("version", 1))
+                    imported += 1
+            if self.legacy_schedule and os.path.exists(self.legacy_schedule):
+                exists = conn.execute("SELECT 1 FROM projects WHERE name = 'schedule'").fetchone()
+                try:
+                    with open(self.legacy_schedule, "rb") as f:
+                        raw = f.read()
+                    doc = json.loads(raw.decode("utf-8"))
+                    if not exists and isinstance(doc, dict):
+                        self._upsert(conn, "schedule", raw, doc, content_revision(raw),
+                                     os.stat(self.legacy_schedule).st_mtime)
+                        imported += 1
+                except (OSError, ValueError) as e:
+                    log.warning("Could not import legacy schedule: %s", e)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)",
+                         (datetime.now().isoformat(),))
+        log.info("Imported %d projects into %s.", imported, self.db_path)
+
+    def close(self):
+        """Fold the WAL back into the database file"""
+        try:
+            self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            log.warning("WAL checkpoint failed: %s", e)
@@ -0,0 +1,153 @@
+"""
+In-memory static asset layer.
+
+The app's HTML, JS and CSS are read once at startup, precompressed (gzip, plus
+brotli when the optional `brotli` package is installed) and served from memory
+with strong ETags. References between assets (ES module imports, CSS @import,
+the <script> and <link> tags in index.html) are rewritten to carry a build
+fingerprint (?v=<hash>), so those URLs can be cached as immutable while
+index.html itself is always revalidated.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+
+ASSET_EXTENSIONS = (".html", ".js", ".mjs", ".css", ".svg")
+
+# Data folders that may sit next to the static files (script mode serves from DATA_DIR)
+SKIP_DIRS = {"list", "journal", "__pycache__"}
+
+# Without a frozen bundle, files are re-checked at most this often so edits show up on reload
+RELOAD_CHECK_SECONDS = 2.0
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Relative module specifiers: import x from './a.js', import './a.js', import('./a.js')
+_JS_IMPORT = re.compile(r"""(\bfrom\s*|\bimport\s*\(?\s*)(['"])(\.{1,2}/[^'"?#]+)(?:\?[^'"]*)?\2""")
+# CSS: @import url("a.css") / @import "a.css"
+_CSS_IMPORT = re.compile(r"""(@import\s+(?:url\(\s*)?)(['"])([^'"?#:]+)(?:\?[^'"]*)?\2""")
+# HTML: local src/href attributes pointing at scripts and stylesheets
+_HTML_REF = re.compile(r"""(\b(?:src|href)=)(['"])([^'"?#:]+\.(?:js|mjs|css))(?:\?[^'"]*)?\2""")
+
+
+class Asset:
+    """One static file: its rewritten body and the gzip/brotli encodings of it (None where not smaller)"""
+
+    __slots__ = ("path", "content_type", "etag", "identity", "immutable", "gzip", "br")
+
+    def __init__(self, path, content_type, body, immutable):
+        self.path = path
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.identity = body
+        self.immutable = immutable
+        self.gzip = self._smaller(gzip.compress(body, compresslevel=9, mtime=0))
+        self.br = self._smaller(brotli.compress(body, quality=11)) if brotli is not None else None
+
+    def _smaller(self, compressed):
+        return compressed if len(compressed) < len(self.identity) else None
+
+
+class StaticAssets:
+    """URL path -> precompressed Asset for everything under static_dir."""
+
+    def __init__(self, static_dir, watch=True):
+        self.static_dir = static_dir
+        self.watch = watch
+        self.fingerprint = ""
+        self._assets = {}
+        self._mtimes = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)read every asset from disk; returns how many were loaded"""
+        sources = {}
+        mtimes = {}
+        for root, dirs, files in os.walk(self.static_dir):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")]
+            for file in files:
+                if not file.endswith(ASSET_EXTENSIONS):
+                    continue
+                full = os.path.join(root, file)
+                url = "/" + os.path.relpath(full, self.static_dir).replace(os.sep, "/")
+                try:
+                    with open(full, "rb") as f:
+                        sources[url] = f.read()
+                    mtimes[full] = os.stat(full).st_mtime_ns
+                except OSError as e:
+                    log.warning("Could not load static file '%s': %s", full, e)
+
+        # One fingerprint for the whole build: any change gives every asset a new URL
+        digest = hashlib.sha1()
+        for url in sorted(sources):
+            digest.update(url.encode("utf-8"))
+            digest.update(sources[url])
+        fingerprint = digest.hexdigest()[:10]
+
+        assets = {}
+        for url, body in sources.items():
+            body = self._rewrite(url, body, fingerprint)
+            content_type = mimetypes.guess_type(url)[0] or "application/octet-stream"
+            if url.endswith(".mjs"):
+                content_type = "text/javascript"
+            if content_type.startswith("text/") or content_type.endswith(("javascript", "+xml")):
+                content_type += "; charset=utf-8"
+            assets[url] = Asset(url, content_type, body, immutable=not url.endswith(".html"))
+
+        with self._lock:
+            self._assets = assets
+            self._mtimes = mtimes
+            self.fingerprint = fingerprint
+            self._checked = time.monotonic()
+        return len(assets)
+
+    @staticmethod
+    def _rewrite(url, body, fingerprint):
+        pattern = {".js": _JS_IMPORT, ".mjs": _JS_IMPORT, ".css": _CSS_IMPORT, ".html": _HTML_REF}.get(
+            os.path.splitext(url)[1]
+        )
+        if pattern is None:
+            return body
+        text = body.decode("utf-8")
+        text = pattern.sub(lambda m: f"{m.group(1)}{m.group(2)}{m.group(3)}?v={fingerprint}{m.group(2)}", text)
+        return text.encode("utf-8")
+
+    def get(self, url_path):
+        """Asset for a request path, or None to fall back to the filesystem handler"""
+        if self.watch and time.monotonic() - self._checked >= RELOAD_CHECK_SECONDS:
+            self._reload_if_changed()
+        with self._lock:
+            return self._assets.get(url_path)
+
+    def _reload_if_changed(self):
+        with self._lock:
+            self._checked = time.monotonic()
+            mtimes = dict(self._mtimes)
+        changed = False
+        for path, mtime in mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    changed = True
+                    break
+            except OSError:
+                changed = True
+                break
+        if changed:
+            count = self.load()
+            log.info("Static files changed, reloaded %d assets (build %s).", count, self.fingerprint)
@@ -0,0 +1,675 @@
+"""
+Project storage: per-project locking, atomic commits and write-behind saves.
+
+Saves are accepted into memory and written by a background flusher. Repeated
+saves of the same project within the write window collapse into one disk
+write, and every write goes through a temp file + os.replace so a crash never
+leaves a truncated project behind.
+
+Projects are stored as <name>.json (pretty or compact JSON), <name>.json.gz or
+<name>.jsonl (an append-only journal, see journal.py) depending on the
+configured format; files in the other formats are still read, and are migrated
+the next time the project is saved.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from .cache import ProjectCache
+    from .journal import JOURNAL_EXTENSION, ProjectJournal
+    from .metrics import METRICS
+except ImportError:  # Running as a script (python server/server.py)
+    from cache import ProjectCache
+    from journal import JOURNAL_EXTENSION, ProjectJournal
+    from metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+
+STORAGE_FORMATS = ("pretty", "compact", "gzip", "journal")
+
+# The index sidecar is rewritten at most this often (seconds)
+INDEX_SAVE_DELAY = 2.0
+PROJECT_EXTENSIONS = (".json", ".json.gz", JOURNAL_EXTENSION)
+
+# Deleted journals are moved here (inside the list directory) instead of being removed
+DELETED_DIR = ".deleted"
+
+# Fields the browser rewrites on every save even when nothing in the project changed
+VOLATILE_FIELDS = ("saveDate",)
+
+
+def project_name_from_file(filename):
+    """Project name for a file in the list directory, or None if it isn't a project file"""
+    if filename == "schedule.json":
+        return None
+    for ext in PROJECT_EXTENSIONS:
+        if filename.endswith(ext):
+            return filename[:-len(ext)]
+    return None
+
+
+def encode_project(data, storage_format):
+    """Serialize a project document to the JSON bytes used for revisions and responses"""
+    with METRICS.timed("serialize"):
+        if storage_format == "pretty":
+            return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def content_revision(raw):
+    """Revision tag for a stored project: a short hash of its on-disk bytes"""
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def unchanged_save(stored, raw, revision, data):
+    """True if saving `data` (encoded as raw/revision) over `stored` (raw, revision) would change nothing.
+
+    Byte-identical saves match on the revision. A save that only differs in
+    VOLATILE_FIELDS encodes to the same length (saveDate is a fixed-width ISO
+    time), so only then is the stored copy parsed and compared field by field.
+    """
+    stored_raw, stored_revision = stored
+    if revision == stored_revision:
+        return True
+    if len(raw) != len(stored_raw) or not isinstance(data, dict):
+        return False
+    try:
+        stored_doc = json.loads(stored_raw.decode("utf-8"))
+    except ValueError:
+        return False
+    if not isinstance(stored_doc, dict):
+        return False
+    # Compared as canonical JSON, not with ==, which takes true for 1 and 0 for false (and NaN for a change)
+    return all(_canonical(stored_doc.get(k)) == _canonical(data.get(k))
+               for k in stored_doc.keys() | data.keys() if k not in VOLATILE_FIELDS)
+
+
+def _canonical(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def atomic_write(path, raw):
+    """Write bytes to path so readers see either the old or the new file, never a partial one"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+            f.flush()
+            with METRICS.timed("fsync"):
+                os.fsync(f.fileno())
+        # mkstemp creates 0600 files; keep the permissions a plain open() would have given
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ProjectExistsError(Exception):
+    """A rename whose target name is already taken by another project."""
+
+
+class StorageBackend:
+    """What SchedulerHandler needs from project storage.
+
+    ProjectStore (a directory of files) and SQLiteProjectStore (sqlite_store.py)
+    implement it. read() returns (raw JSON bytes, revision) or None; list()
+    returns (entries newest first, total, names deleted since `since`). Besides
+    its content revision, every project has a version counter that goes up by
+    one with each save that changes it. Every save, rename, delete and
+    delete-all is reported to change listeners.
+    """
+
+    extension = ".json"
+
+    def __init__(self):
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._listeners = []
+
+    # --- Change notifications ---
+
+    def add_listener(self, listener):
+        """Call listener(event, name, info) after every save, rename, delete and delete-all (a save's info carries the document)"""
+        self._listeners.append(listener)
+
+    def _notify(self, event, name, **info):
+        for listener in self._listeners:
+            try:
+                listener(event, name, info)
+            except Exception as e:
+                log.error("Change listener failed for '%s': %s", name, e)
+
+    # --- Locking ---
+
+    def _lock_for(self, name):
+        with self._locks_guard:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks[name] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def locked(self, *names):
+        """Hold the per-project locks for names (taken in sorted order to avoid deadlocks)"""
+        locks = [self._lock_for(n) for n in sorted(set(names))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    # --- Operations ---
+
+    def read(self, name):
+        raise NotImplementedError
+
+    def list(self, since=None, offset=0, limit=None):
+        raise NotImplementedError
+
+    def count(self):
+        """Number of stored projects"""
+        return self.list(limit=0)[1]
+
+    def modified(self, name):
+        """When the project was last changed (epoch seconds), None if it doesn't exist"""
+        raise NotImplementedError
+
+    def save(self, name, data, patch=None, origin=None):
+        """Store a project document; returns (revision, version, changed).
+
+        A save that wouldn't change the stored project (see unchanged_save) is
+        not written and returns the current revision and version with changed=False.
+        """
+        raise NotImplementedError
+
+    def save_many(self, items, origin=None):
+        """Store (name, document) pairs taken one at a time from `items`; returns [(name, revision, version, changed)].
+
+        The caller holds the locks of all the names. Here each is an ordinary
+        save; a backend that can commit them together overrides this.
+        """
+        return [(name,) + self.save(name, data, origin=origin) for name, data in items]
+
+    def delete(self, name, origin=None):
+        raise NotImplementedError
+
+    def rename(self, old, new, origin=None):
+        """Give a project a new name; False if it doesn't exist, ProjectExistsError if `new` is another project's"""
+        raise NotImplementedError
+
+    def delete_all(self, origin=None):
+        raise NotImplementedError
+
+    def history(self, name):
+        """Retained versions (newest first), or None if the backend keeps no history"""
+        return None
+
+    def read_version(self, name, version):
+        return None
+
+    def rebuild_index(self):
+        """Startup hook: bring metadata in line with what is stored"""
+
+    def flush(self):
+        """Make every accepted save durable"""
+
+    def close(self):
+        self.flush()
+
+
+class ProjectStore(StorageBackend):
+    """Directory of <name>.json project files with an in-memory write-behind queue.
+
+    `index` is a ProjectIndex kept in step with every save, rename and delete.
+    """
+
+    def __init__(self, list_dir, index, cache_max_bytes, write_delay=0.5, storage_format="compact", history_keep=200):
+        super().__init__()
+        if storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown storage format {storage_format!r} (expected one of {', '.join(STORAGE_FORMATS)})")
+        self.list_dir = list_dir
+        self.index = index
+        self.write_delay = write_delay
+        self.storage_format = storage_format
+        self.extension = {"gzip": ".json.gz", "journal": JOURNAL_EXTENSION}.get(storage_format, ".json")
+        self.cache = ProjectCache(cache_max_bytes)
+        self.journal = ProjectJournal(history_keep)
+
+        # name -> (raw bytes, revision, accepted-at timestamp, due time, saves to write), where saves
+        # are (raw, revision, version): every one since the last write for journals, else the latest
+        self._pending = {}
+        self._pending_cond = threading.Condition()
+        self._closed = False
+        self._flusher = None
+        self._index_due = None
+        self._compact_queue = set()
+
+        # Directory mtime after our own last change; anything else moving it is an external edit
+        self._dir_mtime_ns = None
+        # Set while a watcher (watcher.py) reports external changes through refresh()
+        self.watched = False
+
+    # --- Reads ---
+
+    def path(self, name, extension=None):
+        return os.path.join(self.list_dir, name + (extension or self.extension))
+
+    def _existing_path(self, name):
+        """Path of the project's file on disk (current format first), or None"""
+        for ext in (self.extension,) + tuple(e for e in PROJECT_EXTENSIONS if e != self.extension):
+            path = self.path(name, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _read_file(self, path):
+        if path.endswith(JOURNAL_EXTENSION):
+            return self.journal.read(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        return gzip.decompress(data) if path.endswith(".gz") else data
+
+    def read(self, name):
+        """Return (raw bytes, revision) for a project, or None if it does not exist"""
+        with self._pending_cond:
+            pending = self._pending.get(name)
+        if pending is not None:
+            return pending[0], pending[1]
+
+        cached = self.cache.get(name)
+        if cached is not None:
+            return cached
+
+        path = self._existing_path(name)
+        if path is None:
+            return None
+        try:
+            raw = self._read_file(path)
+        except FileNotFoundError:
+            return None
+
+        revision = content_revision(raw)
+        self.cache.put(name, raw, revision)
+        return raw, revision
+
+    def list(self, since=None, offset=0, limit=None):
+        """Project metadata from the index (newest first), including saves not yet flushed.
+
+        Returns (entries, total, names deleted since `since`).
+        """
+        self._check_external_changes()
+        return self.index.query(since, offset, limit)
+
+    def count(self):
+        return len(self.index.names())
+
+    def modified(self, name):
+        entry = self.index.get(name)
+        return entry["mtime"] if entry else None
+
+    def history(self, name):
+        """Retained versions of a journaled project (newest first), or None if it has no journal"""
+        with self.locked(name):
+            self._flush_one(name)
+            path = self._existing_path(name)
+            if path is None or not path.endswith(JOURNAL_EXTENSION):
+                return None
+            return self.journal.history(path)
+
+    def read_version(self, name, version):
+        """(raw bytes, revision) of a journaled project at `version`, or None"""
+        with self.locked(name):
+            self._flush_one(name)
+            path = self._existing_path(name)
+            if path is None or not path.endswith(JOURNAL_EXTENSION):
+                return None
+            return self.journal.read_version(path, version)
+
+    # --- Index maintenance ---
+
+    def rebuild_index(self):
+        """Reconcile the project index with the directory (startup or external change)"""
+        self.flush()
+        self.index.rebuild(self.list_dir, self._read_file)
+        self.cache.clear()
+        self._note_own_change()
+        self._schedule_index_save()
+
+    def _note_own_change(self):
+        try:
+            self._dir_mtime_ns = os.stat(self.list_dir).st_mtime_ns
+        except OSError:
+            self._dir_mtime_ns = None
+
+    def _check_external_changes(self):
+        # One stat of the directory instead of one per file; files added, removed or
+        # atomically replaced behind our back change it. A directory watcher makes it unnecessary.
+        if self.watched:
+            return
+        try:
+            current = os.stat(self.list_dir).st_mtime_ns
+        except OSError:
+            return
+        if current != self._dir_mtime_ns:
+            log.info("External change in %s, re-indexing.", self.list_dir)
+            self.rebuild_index()
+
+    def refresh(self, names=None):
+        """Pick up changes other programs made to these projects' files (None: all of them); returns the changed names.
+
+        Only files whose size or mtime differ from the index are read, so our
+        own writes are passed over. A changed project is hashed, re-indexed and
+        reported to change listeners as a save (or as a delete when its file is
+        gone); one with a save still waiting to be written keeps that save.
+        """
+        if names is None:
+            names = set(self.index.names())
+            try:
+                names.update(n for n in map(project_name_from_file, os.listdir(self.list_dir)) if n)
+            except OSError:
+                pass
+        changed = [name for name in sorted(names) if self._refresh_one(name)]
+        self._note_own_change()
+        return changed
+
+    def _refresh_one(self, name):
+        with self.locked(name):
+            with self._pending_cond:
+                if name in self._pending:
+                    log.warning("'%s' changed on disk while a save is pending; keeping the save.", name)
+                    return False
+            entry = self.index.get(name)
+            path = self._existing_path(name)
+            if path is None:
+                if entry is None:
+                    return False
+                self.cache.invalidate(name)
+                self.index.remove(name, time.time())
+                self._schedule_index_save()
+                self._notify("delete", name, external=True)
+                return True
+            filename = os.path.basename(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return False  # Removed again already; that change is on its way
+            if entry and entry["filename"] == filename and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                return False
+            self.journal.forget(path)
+            try:
+                raw = self._read_file(path)
+                doc = json.loads(raw.decode("utf-8"))
+            except (OSError, ValueError) as e:
+                # Left unindexed, so the next change to the file tries again
+                log.warning("Could not reload '%s' after an external change: %s", filename, e)
+                return False
+            revision = content_revision(raw)
+            self._schedule_index_save()
+            if entry and entry["revision"] == revision:
+                self.index.touch(name, filename, stat.st_mtime, stat.st_size)
+                return False
+            version = entry.get("version", 1) + 1 if entry else 1
+            self.index.update(name, filename, raw, doc, stat.st_mtime, stat.st_size, revision, version)
+            self.cache.put(name, raw, revision)
+            self._notify("save", name, revision=revision, version=version, document=doc, external=True,
+                         baseRevision=entry["revision"] if entry else None)
+            return True
+
+    # --- Writes ---
+
+    def save(self, name, data, patch=None, origin=None):
+        """Accept a project into memory and schedule its disk write; returns (revision, version, changed).
+
+        `patch` (the JSON Patch that produced data, if any) and `origin` (the saving
+        client's id) are only passed on to change listeners.
+        """
+        raw = encode_project(data, self.storage_format)
+        revision = content_revision(raw)
+
+        with self.locked(name):
+            previous_entry = self.index.get(name)
+            if previous_entry is not None:
+                stored = self.read(name)
+                if stored is not None and unchanged_save(stored, raw, revision, data):
+                    return stored[1], previous_entry.get("version", 1), False
+            version = previous_entry.get("version", 1) + 1 if previous_entry else 1
+            if self.storage_format == "journal" and previous_entry and previous_entry["filename"] == name + self.extension:
+                # The journal's numbers win should the index have lost count (a sidecar rebuilt from scratch)
+                version = max(version, self.journal.version(self.path(name)) + 1)
+            self.index.update(name, name + self.extension, raw, data, time.time(), len(raw), revision, version)
+            # Cached only once indexed, so a save that fails on the way leaves nothing readable behind
+            self.cache.put(name, raw, revision)
+            if self.write_delay <= 0 or self._closed:
+                self._write_file(name, [(raw, revision, version)])
+            else:
+                now = time.time()
+                with self._pending_cond:
+                    previous = self._pending.get(name)
+                    # Keep the first due time so a steady stream of saves still hits disk every window
+                    due = previous[3] if previous else now + self.write_delay
+                    # A journal keeps every version it was asked to; the other formats only the newest
+                    earlier = previous[4] if previous and self.storage_format == "journal" else []
+                    self._pending[name] = (raw, revision, now, due, earlier + [(raw, revision, version)])
+                    self._ensure_flusher()
+                    self._pending_cond.notify()
+
+            self._notify("save", name, revision=revision, version=version, patch=patch, origin=origin, document=data,
+                         baseRevision=previous_entry["revision"] if previous_entry else None)
+        return revision, version, True
+
+    def delete(self, name, origin=None):
+        with self.locked(name):
+            with self._pending_cond:
+                had_pending = self._pending.pop(name, None) is not None
+            self.cache.invalidate(name)
+            removed = had_pending
+            for ext in PROJECT_EXTENSIONS:
+                try:
+                    self._discard(self.path(name, ext))
+                    removed = True
+                except FileNotFoundError:
+                    pass
+            self.index.remove(name, time.time())
+            self._note_own_change()
+            self._schedule_index_save()
+            if removed:
+                self._notify("delete", name, origin=origin)
+            return removed
+
+    def rename(self, old, new, origin=None):
+        with self.locked(old, new):
+            self._flush_one(old)
+            old_path = self._existing_path(old)
+            if old_path is None:
+                return False
+            if new != old:
+                with self._pending_cond:
+                    taken = new in self._pending
+                existing = self._existing_path(new)
+                # On a case-insensitive disk, "Plan" -> "plan" finds the project's own file
+                if taken or (existing is not None and not os.path.samefile(existing, old_path)):
+                    raise ProjectExistsError(new)
+            ext = next(e for e in PROJECT_EXTENSIONS if old_path.endswith(e))
+            new_path = self.path(new, ext)
+            self.journal.forget(old_path)
+            self.journal.forget(new_path)
+            os.rename(old_path, new_path)
+            # Bump the mtime so the rename shows up for ?since= listings and the index stays consistent
+            os.utime(new_path)
+            self._remove_other_formats(new, ext)
+            self.cache.invalidate(old)
+            self.cache.invalidate(new)
+            self.index.rename(old, new, new + ext, os.stat(new_path).st_mtime)
+            self._note_own_change()
+            self._schedule_index_save()
+            self._notify("rename", old, newName=new, origin=origin)
+            return True
+
+    def delete_all(self, origin=None):
+        """Remove every project file; returns how many were deleted"""
+        with self._pending_cond:
+            names = set(self._pending)
+            self._pending.clear()
+        count = 0
+        if os.path.exists(self.list_dir):
+            for file in os.listdir(self.list_dir):
+                name = project_name_from_file(file)
+                if name is not None or file == "schedule.json":
+                    names.discard(name)
+                    with self.locked(name or file):
+                        self._discard(os.path.join(self.list_dir, file))
+                    count += 1
+        self.cache.clear()
+        self.index.clear(time.time())
+        self._note_own_change()
+        self._schedule_index_save()
+        self._notify("clear", None, origin=origin)
+        return count + len(names)
+
+    def _write_file(self, name, saves):
+        """Commit saves ((raw JSON, revision, version), oldest first) in the configured format and drop copies in other formats"""
+        path = self.path(name)
+        raw = saves[-1][0]
+        if self.storage_format == "journal":
+            self.journal.append(path, saves)
+            if self.journal.needs_compaction(path):
+                with self._pending_cond:
+                    self._compact_queue.add(name)
+                    self._ensure_flusher()
+                    self._pending_cond.notify()
+        else:
+            data = gzip.compress(raw, compresslevel=6, mtime=0) if self.storage_format == "gzip" else raw
+            atomic_write(path, data)
+        self._remove_other_formats(name, self.extension)
+        stat = os.stat(path)
+        self.index.touch(name, name + self.extension, stat.st_mtime, stat.st_size)
+        self._note_own_change()
+        self._schedule_index_save()
+
+    def _remove_other_formats(self, name, keep_extension):
+        for ext in PROJECT_EXTENSIONS:
+            if ext != keep_extension:
+                try:
+                    os.remove(self.path(name, ext))
+                    self.journal.forget(self.path(name, ext))
+                except FileNotFoundError:
+                    pass
+
+    def _discard(self, path):
+        """Remove a project file; journals are kept in DELETED_DIR so their history can still be recovered"""
+        if not path.endswith(JOURNAL_EXTENSION):
+            os.remove(path)
+            return
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)  # Before the trash directory, so other formats don't leave an empty one
+        self.journal.forget(path)
+        trash = os.path.join(self.list_dir, DELETED_DIR)
+        os.makedirs(trash, exist_ok=True)
+        base = os.path.basename(path)[:-len(JOURNAL_EXTENSION)]
+        os.rename(path, os.path.join(trash, f"{base}.{int(time.time() * 1000)}{JOURNAL_EXTENSION}"))
+
+    def _compact(self, name):
+        with self.locked(name):
+            path = self.path(name)
+            if not path.endswith(JOURNAL_EXTENSION) or not os.path.exists(path):
+                return
+            try:
+                data = self.journal.compacted(path)
+                if data is not None:
+                    atomic_write(path, data)
+                    self.journal.forget(path)
+                    stat = os.stat(path)
+                    self.index.touch(name, os.path.basename(path), stat.st_mtime, stat.st_size)
+                    self._note_own_change()
+                    self._schedule_index_save()
+            except (OSError, ValueError) as e:
+                log.error("Could not compact journal of '%s': %s", name, e)
+
+    # --- Write-behind flushing ---
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="project-flusher", daemon=True)
+            self._flusher.start()
+
+    def _schedule_index_save(self):
+        with self._pending_cond:
+            if self._index_due is None:
+                self._index_due = time.time() + INDEX_SAVE_DELAY
+            self._ensure_flusher()
+            self._pending_cond.notify()
+
+    def _flush_loop(self):
+        while True:
+            with self._pending_cond:
+                while not self._closed:
+                    now = time.time()
+                    due = [n for n, entry in self._pending.items() if entry[3] <= now]
+                    save_index = self._index_due is not None and self._index_due <= now
+                    if due or save_index or self._compact_queue:
+                        break
+                    deadlines = [entry[3] for entry in self._pending.values()]
+                    if self._index_due is not None:
+                        deadlines.append(self._index_due)
+                    self._pending_cond.wait(min(deadlines) - now if deadlines else None)
+                if self._closed:
+                    return
+                if save_index:
+                    self._index_due = None
+                compact, self._compact_queue = self._compact_queue, set()
+            for name in due:
+                self._flush_one(name)
+            for name in compact:
+                self._compact(name)
+            if save_index:
+                self.index.save_sidecar()
+
+    def _flush_one(self, name):
+        with self.locked(name):
+            with self._pending_cond:
+                entry = self._pending.pop(name, None)
+            if entry is None:
+                return
+            try:
+                self._write_file(name, entry[4])
+            except OSError as e:
+                log.error("Could not write project '%s': %s", name, e)
+                # Retry on the next window rather than dropping the save
+                with self._pending_cond:
+                    self._pending.setdefault(name, entry[:3] + (time.time() + max(self.write_delay, 1.0),) + entry[4:])
+                    self._pending_cond.notify()
+
+    def flush(self):
+        """Write every pending save to disk now"""
+        with self._pending_cond:
+            names = list(self._pending)
+        for name in names:
+            self._flush_one(name)
+        self.index.save_sidecar()
+
+    def close(self):
+        """Flush pending saves and stop the background writer"""
+        self.flush()
+        with self._pending_cond:
+            self._closed = True
+            self._pending_cond.notify_all()
@@ -0,0 +1,288 @@
+"""
+Cross-project timeline (GET /api/timeline): every segment and event of every
+project as an interval of absolute dates.
+
+Segment offsets are relative to their project's startDate, so each project's
+segments are converted to day ordinals when it is saved. All intervals live in
+one treap (a randomly balanced binary search tree) ordered by start day, where
+every node also knows the latest end day below it. A save removes only that
+project's old intervals and inserts its new ones, O(log n) each; at startup
+the tree is built once, in one pass over the sorted intervals. A query walks
+the tree in start order, skips subtrees that end before the lower bound and
+stops at the first start past the upper bound, so it costs about O(log n + k)
+for k overlapping intervals.
+"""
+
+import random
+import threading
+from datetime import date, timedelta
+
+try:
+    from .project_index import project_start_date
+except ImportError:  # Running as a script (python server/server.py)
+    from project_index import project_start_date
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_event(seg):
+    return bool(seg.get("isEvent")) or str(seg.get("id", "")).startswith("e_")
+
+
+def project_intervals(project, doc):
+    """(start ordinal, end ordinal (exclusive), item) for every dated segment of a project document"""
+    base = project_start_date(doc) if isinstance(doc, dict) else None
+    if base is None:
+        return []  # Offsets mean nothing without a start date
+    intervals = []
+    stack = [n for n in reversed(doc.get("data") or []) if isinstance(n, dict)]
+    while stack:
+        node = stack.pop()
+        for seg in node.get("segments") or []:
+            if not isinstance(seg, dict) or not _is_number(seg.get("startOffset")) or not _is_number(seg.get("duration")):
+                continue
+            try:
+                start = base + timedelta(days=int(seg["startOffset"]))
+                # A zero-length segment (an event) still occupies its day
+                days = max(1, int(seg["duration"]))
+                end_date = start + timedelta(days=days - 1)
+            except (OverflowError, ValueError):
+                continue  # Past the calendar (year 1..9999), infinite or NaN
+            intervals.append((start.toordinal(), start.toordinal() + days, {
+                "project": project,
+                "nodeId": node.get("id"),
+                "name": node.get("name"),
+                "label": seg.get("label") or seg.get("childName") or None,
+                "isEvent": _is_event(seg),
+                "startDate": start.isoformat(),
+                "endDate": end_date.isoformat(),
+                "duration": days,
+            }))
+        stack.extend(reversed([c for c in (node.get("children") or []) if isinstance(c, dict)]))
+    return intervals
+
+
+class _Node:
+    """One interval in the treap; key is (start, sequence number) so equal starts stay distinct"""
+
+    __slots__ = ("key", "end", "item", "priority", "left", "right", "max_end")
+
+    def __init__(self, key, end, item):
+        self.key = key
+        self.end = end
+        self.item = item
+        self.priority = random.random()
+        self.left = self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    node.max_end = max(node.end,
+                       node.left.max_end if node.left else node.end,
+                       node.right.max_end if node.right else node.end)
+
+
+def _split(node, key):
+    """(nodes with keys < key, nodes with keys >= key)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, rest = _split(node.right, key)
+        _update(node)
+        return node, rest
+    rest, node.left = _split(node.left, key)
+    _update(node)
+    return rest, node
+
+
+def _merge(low, high):
+    """Join two treaps where every key in `low` is smaller than every key in `high`"""
+    if low is None or high is None:
+        return low or high
+    if low.priority > high.priority:
+        low.right = _merge(low.right, high)
+        _update(low)
+        return low
+    high.left = _merge(low, high.left)
+    _update(high)
+    return high
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if new.priority > node.priority:
+        new.left, new.right = _split(node, new.key)
+        _update(new)
+        return new
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+    else:
+        node.right = _insert(node.right, new)
+    _update(node)
+    return node
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    _update(node)
+    return node
+
+
+def _build(nodes):
+    """Treap over nodes sorted by key, in O(n): a Cartesian tree on their priorities"""
+    spine = []
+    for node in nodes:
+        node.left = node.right = None
+        last = None
+        while spine and spine[-1].priority < node.priority:
+            last = spine.pop()
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+    # Children before parents for the max_end pass
+    order, stack = [], spine[:1]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(child for child in (node.left, node.right) if child is not None)
+    for node in reversed(order):
+        _update(node)
+    return spine[0] if spine else None
+
+
+def _overlapping(root, low, high):
+    """Items of the intervals with start < high and end > low, in start order"""
+    found = []
+    stack = []
+    node = root
+    while True:
+        # Subtrees that end by `low` hold nothing of interest
+        while node is not None and node.max_end > low:
+            stack.append(node)
+            node = node.left
+        if not stack:
+            return found
+        node = stack.pop()
+        if node.key[0] >= high:
+            return found  # Everything after this starts later still
+        if node.end > low:
+            found.append(node.item)
+        node = node.right
+
+
+def _signature(start, end, item):
+    """What makes two intervals interchangeable; None (never reused) if an item value can't be hashed"""
+    key = (start, end) + tuple(item.values())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class TimelineIndex:
+    """Every project's intervals in one treap, plus project -> its nodes in it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = None
+        self._projects = {}
+        self._sequence = 0
+        # Until build(), updates only collect nodes (startup loads every project first)
+        self._built = False
+
+    # --- Maintenance ---
+
+    def update(self, project, doc):
+        """Replace one project's intervals; only those that differ from before leave or enter the tree"""
+        intervals = project_intervals(project, doc)
+        with self._lock:
+            # An autosave usually changes a few segments; identical intervals keep their nodes
+            unchanged, gone = {}, []
+            for node in self._projects.pop(project, ()):
+                signature = _signature(node.key[0], node.end, node.item)
+                (gone if signature is None else unchanged.setdefault(signature, [])).append(node)
+            nodes = []
+            for start, end, item in intervals:
+                signature = _signature(start, end, item)
+                same = unchanged.get(signature) if signature is not None else None
+                if same:
+                    nodes.append(same.pop())
+                    continue
+                self._sequence += 1
+                node = _Node((start, self._sequence), end, item)
+                if self._built:
+                    self._root = _insert(self._root, node)
+                nodes.append(node)
+            if self._built:
+                for node in gone + [node for left in unchanged.values() for node in left]:
+                    self._root = _delete(self._root, node.key)
+            self._projects[project] = nodes
+
+    def remove(self, project):
+        with self._lock:
+            self._remove(project)
+
+    def _remove(self, project):
+        nodes = self._projects.pop(project, ())
+        if self._built:
+            for node in nodes:
+                self._root = _delete(self._root, node.key)
+
+    def rename(self, old, new):
+        """Intervals keep their place in the tree; only the project their items name changes"""
+        with self._lock:
+            nodes = self._projects.pop(old, None)
+            if nodes is None:
+                return
+            self._remove(new)
+            for node in nodes:
+                node.item["project"] = new
+            self._projects[new] = nodes
+
+    def build(self):
+        """Put every collected interval in the tree at once; later updates go in one by one"""
+        with self._lock:
+            self._build()
+
+    def _build(self):
+        self._root = _build(sorted((node for nodes in self._projects.values() for node in nodes),
+                                   key=lambda node: node.key))
+        self._built = True
+
+    def clear(self):
+        with self._lock:
+            self._root = None
+            self._projects.clear()
+
+    # --- Queries ---
+
+    def query(self, first_day, last_day, project=None):
+        """Segments overlapping the dates first_day..last_day (inclusive), by start date"""
+        with self._lock:
+            if not self._built:
+                self._build()
+            items = _overlapping(self._root, first_day.toordinal(), last_day.toordinal() + 1)
+            return [dict(item) for item in items if project is None or item["project"] == project]
+
+    def count(self):
+        with self._lock:
+            return sum(len(nodes) for nodes in self._projects.values())
+
+
+def parse_day(value, default):
+    """YYYY-MM-DD (or a longer ISO timestamp) as a date; `default` when empty"""
+    if not value:
+        return default
+    return date.fromisoformat(value[:10])
@@ -0,0 +1,215 @@
+"""
+Watch the project directory for changes made by other programs (sync clients, scripts, editors).
+
+On Linux the directory is watched with inotify, called through ctypes so no
+extra package is needed. Elsewhere, or if inotify can't be set up, a thread
+compares the size and mtime of each project file every poll interval; that is
+one directory scan, and no file is read. Either way, the names of changed
+projects are collected and handed to the callback once no further change has
+come in for the debounce time, so a burst of writes (a sync client catching
+up, an editor's write-then-rename) becomes one reload per project. When
+events were lost (inotify queue overflow), the callback gets None, meaning
+every project has to be checked.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+try:
+    from .storage import project_name_from_file
+except ImportError:  # Running as a script (python server/server.py)
+    from storage import project_name_from_file
+
+log = logging.getLogger(__name__)
+
+
+WATCH_MODES = ("auto", "inotify", "poll", "off")
+
+# Changes are delivered after at most this many seconds even if new ones keep coming in
+MAX_DELAY = 1.0
+
+# inotify(7) event bits
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+# A file is only looked at once it is complete: closed after writing, or renamed into place
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len (then len bytes of NUL-padded name)
+
+
+class _Watcher(threading.Thread):
+    """Collects changed project names; callback(names) runs once they have been quiet for `debounce` seconds."""
+
+    def __init__(self, directory, callback, debounce):
+        super().__init__(name=f"{self.mode}-watcher", daemon=True)
+        self.directory = directory
+        self.callback = callback
+        self.debounce = debounce
+        self._changed = set()
+        self._everything = False
+        self._first_change = None
+        self._last_change = None
+        self._stopping = threading.Event()
+
+    def _note(self, filename):
+        name = project_name_from_file(filename)
+        if name is not None:
+            self._changed.add(name)
+            self._touch()
+
+    def _note_everything(self):
+        self._everything = True
+        self._touch()
+
+    def _touch(self):
+        self._last_change = time.monotonic()
+        if self._first_change is None:
+            self._first_change = self._last_change
+
+    def _quiet_for(self):
+        """Seconds left until the collected changes are due, None when there are none"""
+        if self._last_change is None:
+            return None
+        due = min(self._last_change + self.debounce, self._first_change + MAX_DELAY)
+        return max(0.0, due - time.monotonic())
+
+    def _deliver(self):
+        names, self._changed = (None if self._everything else self._changed), set()
+        self._everything = False
+        self._first_change = self._last_change = None
+        try:
+            self.callback(names)
+        except Exception as e:
+            log.exception("Handling changes in %s failed: %s", self.directory, e)
+
+    def stop(self):
+        self._stopping.set()
+
+
+class InotifyWatcher(_Watcher):
+    mode = "inotify"
+
+    def __init__(self, directory, callback, debounce=0.05):
+        super().__init__(directory, callback, debounce)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        # Written to by stop() to wake the select() below
+        self._wake_read, self._wake_write = os.pipe()
+
+    def run(self):
+        try:
+            while not self._stopping.is_set():
+                ready, _, _ = select.select([self._fd, self._wake_read], [], [], self._quiet_for())
+                if self._fd in ready:
+                    self._read_events()
+                if self._quiet_for() == 0:
+                    self._deliver()
+            if self._last_change is not None:
+                self._deliver()  # What came in before the watch ended
+        finally:
+            for fd in (self._fd, self._wake_read, self._wake_write):
+                os.close(fd)
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                log.warning("inotify queue overflowed; checking every project in %s.", self.directory)
+                self._note_everything()
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                log.warning("%s was removed or moved; no longer watching it.", self.directory)
+                self._note_everything()
+                self._stopping.set()
+            elif name:
+                self._note(os.fsdecode(name))
+
+    def stop(self):
+        super().stop()
+        try:
+            os.write(self._wake_write, b"x")
+        except OSError:
+            pass
+
+
+class PollingWatcher(_Watcher):
+    mode = "poll"
+
+    def __init__(self, directory, callback, debounce=0.05, interval=1.0):
+        super().__init__(directory, callback, debounce)
+        self.interval = interval
+        self._seen = self._scan()
+
+    def _scan(self):
+        """file name -> (size, mtime_ns) for every project file in the directory"""
+        seen = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if project_name_from_file(entry.name) is None:
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    seen[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            log.warning("Could not scan %s: %s", self.directory, e)
+        return seen
+
+    def run(self):
+        while True:
+            quiet = self._quiet_for()
+            if self._stopping.wait(self.interval if quiet is None else min(quiet, self.interval)):
+                return
+            seen = self._scan()
+            for filename in seen.keys() | self._seen.keys():
+                if seen.get(filename) != self._seen.get(filename):
+                    self._note(filename)
+            self._seen = seen
+            if self._quiet_for() == 0:
+                self._deliver()
+
+
+def start_watcher(directory, callback, mode="auto", debounce=0.05, poll_interval=1.0):
+    """Start watching directory (see WATCH_MODES); returns the running watcher, or None for mode "off" """
+    if mode not in WATCH_MODES:
+        raise ValueError(f"Unknown watch mode {mode!r} (expected one of {', '.join(WATCH_MODES)})")
+    if mode == "off":
+        return None
+    watcher = None
+    if mode == "inotify" or (mode == "auto" and sys.platform.startswith("linux")):
+        try:
+            watcher = InotifyWatcher(directory, callback, debounce)
+        except (OSError, AttributeError) as e:
+            log.warning("inotify unavailable (%s); polling %s instead.", e, directory)
+    if watcher is None:
+        watcher = PollingWatcher(directory, callback, debounce, poll_interval)
+    watcher.start()
+    return watcher
@@ -1,8 +1,9 @@
 // 순수 로직 자체 점검: node test_scheduler.mjs
-// DOM 없이 도는 부분만 검사한다 (날짜 키, 공휴일 판정, ICS 이스케이프).
+// DOM 없이 도는 부분만 검사한다 (날짜 키, 공휴일 판정, ICS 이스케이프, 저장 diff).
 import assert from 'node:assert/strict';
 import { Scheduler } from './server/scheduler/core.js';
 import './server/scheduler/data.js';
+import './server/scheduler/persistence.js';
 
 const s = Object.create(Scheduler.prototype);
 
@@ -32,4 +33,20 @@ const escapeICS = (text) => String(text)
 assert.equal(escapeICS('a,b;c'), 'a\\,b\\;c');
 assert.equal(escapeICS('줄1\n줄2'), '줄1\\n줄2', '줄바꿈이 ICS를 깨뜨림');
 
-console.log('통과: 날짜 키 / 공휴일 / 작업일 / ICS 이스케이프');
+// --- diffDocuments: 저장본 대비 바뀐 부분만 JSON Patch로 ---
+const before = { saveDate: 'a', holidays: ['2026-01-01'], data: [{ id: 1, name: 'A', 'x/y': 1, segments: [{ s: 1 }, { s: 2 }] }] };
+const after = { saveDate: 'b', holidays: ['2026-01-01', '2026-03-01'], data: [{ id: 1, name: 'B', segments: [{ s: 1 }] }] };
+assert.deepEqual(s.diffDocuments(before, after), [
+    { op: 'replace', path: '/saveDate', value: 'b' },
+    { op: 'add', path: '/holidays/1', value: '2026-03-01' },
+    { op: 'remove', path: '/data/0/x~1y' },
+    { op: 'replace', path: '/data/0/name', value: 'B' },
+    { op: 'remove', path: '/data/0/segments/1' }
+]);
+assert.deepEqual(s.diffDocuments(after, after), [], '변경 없으면 빈 패치');
+
+// --- applyPatch: 다른 기기에서 온 패치를 적용하면 같은 문서가 나와야 한다 ---
+const patched = s.applyPatch(JSON.parse(JSON.stringify(before)), s.diffDocuments(before, after));
+assert.deepEqual(patched, after, 'diff → apply 왕복이 어긋남');
+
+console.log('통과: 날짜 키 / 공휴일 / 작업일 / ICS 이스케이프 / JSON Patch diff·apply');
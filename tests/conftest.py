@@ -0,0 +1,95 @@
+"""
+Shared fixtures: the server package on sys.path, and real server processes on temporary data directories.
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Seconds to wait for a started server to write its port file
+STARTUP_TIMEOUT = 15
+
+
+class Client:
+    """Minimal JSON client for one server process"""
+
+    def __init__(self, process, port, data_dir):
+        self.process = process
+        self.port = port
+        self.data_dir = data_dir
+
+    def stop(self):
+        """SIGTERM, which flushes pending saves, and wait for the process to exit"""
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request; returns (status, headers, decoded JSON or raw bytes)"""
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        try:
+            conn.request(method, path, body=body, headers=dict({"Content-Type": "application/json"}, **(headers or {})))
+            response = conn.getresponse()
+            raw = response.read()
+        finally:
+            conn.close()
+        try:
+            payload = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            payload = raw
+        return response.status, response.headers, payload
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    """start_server(data_dir=None, **env) runs server/server.py (on a new data directory by default) and returns a Client"""
+    clients = []
+
+    def start(data_dir=None, **env):
+        if data_dir is None:
+            data_dir = tmp_path / f"data{len(clients)}"
+            data_dir.mkdir()
+        port_file = data_dir / "server_port.txt"
+        # Only the settings a test asks for; none inherited from the shell running the tests
+        environ = {key: value for key, value in os.environ.items() if not key.startswith("QS_")}
+        environ.update(PORT=str(_free_port()), QS_DATA_DIR=str(data_dir), QS_WATCH="off")
+        environ.update({key: str(value) for key, value in env.items()})
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "server", "server.py")], env=environ,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        client = Client(process, None, data_dir)
+        clients.append(client)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while not port_file.exists():
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail("server did not start")
+            time.sleep(0.02)
+        client.port = int(port_file.read_text())
+        return client
+
+    yield start
+    for client in clients:
+        client.stop()
+
+
+@pytest.fixture
+def server(start_server):
+    return start_server()
@@ -0,0 +1,87 @@
+import io
+import json
+import zipfile
+from urllib.parse import quote
+
+import pytest
+
+import backup
+
+DOCS = {
+    "a": {"name": "a", "data": [{"name": "원본 A"}]},
+    "일정": {"name": "일정", "startDate": "2025-01-06", "data": [{"name": "작업", "children": [{"name": "하위"}]}]},
+}
+
+
+def _seed(server, docs):
+    for name, doc in docs.items():
+        assert server.request("POST", "/api/project/" + quote(name), doc)[0] == 200
+
+
+def _projects(server):
+    listing = server.request("GET", "/api/projects")[2]["projects"]
+    return {entry["name"]: server.request("GET", "/api/project/" + quote(entry["name"]))[2] for entry in listing}
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, doc in members.items():
+            archive.writestr(f"projects/{name}.json", json.dumps(doc, ensure_ascii=False))
+    return buffer.getvalue()
+
+
+def test_export_import_round_trip(start_server, tmp_path):
+    source = start_server()
+    _seed(source, DOCS)
+    path = str(tmp_path / "backup.zip")
+    size, projects = backup.export_backup(f"http://127.0.0.1:{source.port}", path)
+    assert projects == 2 and size > 0
+
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        assert sorted(entry["name"] for entry in manifest["projects"]) == sorted(DOCS)
+        assert archive.namelist()[-1] == "manifest.json"
+
+    target = start_server()
+    result = backup.import_backup(f"http://127.0.0.1:{target.port}", path)
+    assert result["counts"]["created"] == 2
+    assert _projects(target) == DOCS
+    # Importing the same archive again changes nothing
+    assert backup.import_backup(f"http://127.0.0.1:{target.port}", path)["counts"]["skipped"] == 2
+
+
+@pytest.mark.parametrize("policy, outcomes, stored", [
+    ("skip", {"a": ("a", "skipped"), "b": ("b", "created")},
+     {"a": DOCS["a"], "b": {"data": ["b"]}}),
+    ("overwrite", {"a": ("a", "overwritten"), "b": ("b", "created")},
+     {"a": {"data": ["imported a"]}, "b": {"data": ["b"]}}),
+    ("rename", {"a": ("a (2)", "renamed"), "b": ("b", "created")},
+     {"a": DOCS["a"], "a (2)": {"data": ["imported a"]}, "b": {"data": ["b"]}}),
+])
+def test_conflict_policies(server, policy, outcomes, stored):
+    _seed(server, {"a": DOCS["a"]})
+    status, _, result = server.request("POST", f"/api/archive?policy={policy}",
+                                       _zip({"a": {"data": ["imported a"]}, "b": {"data": ["b"]}}),
+                                       {"Content-Type": "application/zip"})
+    assert status == 200 and result["success"]
+    assert {p["name"]: (p["savedAs"] or p["name"], p["result"]) for p in result["projects"]} == outcomes
+    assert _projects(server) == stored
+
+
+def test_rename_policy_numbers_past_taken_names(server):
+    _seed(server, {"a": DOCS["a"], "a (2)": DOCS["a"]})
+    result = server.request("POST", "/api/archive?policy=rename", _zip({"a": {"data": []}}))[2]
+    assert result["projects"] == [{"name": "a", "savedAs": "a (3)", "result": "renamed"}]
+
+
+def test_bad_archive_changes_nothing(server):
+    _seed(server, {"a": DOCS["a"]})
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("projects/b.json", "{}")
+        archive.writestr("projects/c.json", "[not json")
+    status, _, result = server.request("POST", "/api/archive?policy=overwrite", buffer.getvalue())
+    assert status == 400 and not result["success"]
+    assert server.request("POST", "/api/archive?policy=merge", _zip({}))[0] == 400
+    assert _projects(server) == {"a": DOCS["a"]}
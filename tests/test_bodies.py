@@ -0,0 +1,95 @@
+import gzip
+import io
+import json
+import socket
+
+import pytest
+
+from server import body as body_module
+from server.body import RequestBodyError, read_json
+
+
+def _read(raw, headers=None):
+    return read_json(io.BytesIO(raw), dict({"Content-Length": str(len(raw))}, **(headers or {})), 1024 * 1024)
+
+
+@pytest.mark.parametrize("body", ["[1,2]", "3", '"text"', "null"])
+def test_save_refuses_a_non_object(server, body):
+    status, _, result = server.request("POST", "/api/project/p", body)
+    assert status == 400
+    assert not result["success"]
+    assert server.request("GET", "/api/project/p")[2]["error"] == "Project not found"
+    assert server.request("GET", "/api/projects")[2]["total"] == 0
+
+
+@pytest.mark.parametrize("body, status", [("[1,2]", 400), ('{"newName": 5}', 200)])
+def test_rename_refuses_a_bad_body(server, body, status):
+    server.request("POST", "/api/project/p", {"data": []})
+    answered, _, result = server.request("PUT", "/api/project/p", body)
+    assert answered == status
+    assert not result["success"]
+    assert server.request("GET", "/api/project/p")[2] == {"data": []}
+
+
+def test_patch_must_leave_an_object(server):
+    revision = server.request("POST", "/api/project/p", {"data": []})[2]["revision"]
+    status, _, _ = server.request("PATCH", "/api/project/p", [{"op": "replace", "path": "", "value": [1]}],
+                                  {"If-Match": f'"{revision}"'})
+    assert status == 400
+    assert server.request("GET", "/api/project/p/summary")[0] == 200
+
+
+def test_invalid_json_and_oversized_bodies(start_server):
+    server = start_server(QS_MAX_BODY_MB=1)
+    assert server.request("POST", "/api/project/p", "{not json")[0] == 400
+    # Refused on the declared length alone, before any of the body is read
+    with socket.create_connection(("127.0.0.1", server.port), timeout=10) as sock:
+        sock.sendall(b"POST /api/project/p HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n" % (2 * 1024 * 1024))
+        assert sock.recv(4096).startswith(b"HTTP/1.0 413")
+
+
+def test_gzip_body(server):
+    doc = {"data": [{"name": "압축"}]}
+    status, _, result = server.request("POST", "/api/project/p", gzip.compress(json.dumps(doc).encode("utf-8")),
+                                       {"Content-Encoding": "gzip"})
+    assert status == 200 and result["success"]
+    assert server.request("GET", "/api/project/p")[2] == doc
+
+
+@pytest.mark.parametrize("block", [1, 3, 64 * 1024])
+@pytest.mark.parametrize("text", [
+    '{"name": "일정", "data": [{"id": 1, "children": [{"id": 2}]}, [], {}], "n": [1.5e-3, -12, 1E+2]}',
+    '[[1, [2, [3]]], {"a": {"b": {"c": null}}}, true, false, "\\u00e9\\"\\\\"]',
+    '{"a": 1, "a": 2}',
+    '12345',
+    ' {} ',
+])
+def test_incremental_parse_matches_json_loads(monkeypatch, block, text):
+    monkeypatch.setattr(body_module, "READ_BLOCK", block)
+    assert _read(text.encode("utf-8")) == json.loads(text)
+
+
+@pytest.mark.parametrize("block", [1, 64 * 1024])
+@pytest.mark.parametrize("text", ["", "{", '{"a" 1}', '{"a": 1,}', "[1 2]", "{1: 2}", "[1.]", "1e", "1 2", '{"a": 1}}'])
+def test_incremental_parse_rejects_invalid_json(monkeypatch, block, text):
+    monkeypatch.setattr(body_module, "READ_BLOCK", block)
+    with pytest.raises(RequestBodyError) as raised:
+        _read(text.encode("utf-8"))
+    assert raised.value.status == 400
+
+
+def test_parse_holds_one_root_task_at_a_time(monkeypatch):
+    monkeypatch.setattr(body_module, "READ_BLOCK", 1024)
+    tasks = [{"id": i, "name": f"작업 {i}", "children": [{"id": j, "memo": "x" * 100} for j in range(10)]}
+             for i in range(200)]
+    raw = json.dumps({"name": "p", "data": tasks}, ensure_ascii=False).encode("utf-8")
+    decoded = []
+    decode = body_module._DECODER.raw_decode
+    monkeypatch.setattr(body_module, "_DECODER", type("Recorder", (), {
+        "raw_decode": staticmethod(lambda text: decoded.append(len(text)) or decode(text)),
+    }))
+    assert _read(raw)["data"] == tasks
+    one_task = len(json.dumps(tasks[0], ensure_ascii=False))
+    assert max(decoded) <= 2 * (one_task + body_module.READ_BLOCK)
+    assert len(raw) > 20 * max(decoded)
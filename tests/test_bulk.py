@@ -0,0 +1,70 @@
+import gzip
+import http.client
+import json
+from urllib.parse import quote
+
+
+def _bulk(server, query, headers=None):
+    """(status, headers, [decoded lines]) of GET /api/projects/bulk"""
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    try:
+        conn.request("GET", "/api/projects/bulk?" + query, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read()
+    finally:
+        conn.close()
+    if response.status != 200:
+        return response.status, response.headers, json.loads(body)
+    assert body == b"" or body.endswith(b"\n")
+    return response.status, response.headers, [json.loads(line) for line in body.splitlines()]
+
+
+def _seed(server):
+    docs = {
+        "a": {"name": "a", "startDate": "2025-01-06", "holidays": ["2025-01-07"], "data": [{"name": "x"}]},
+        "일정": {"name": "일정", "startDate": "2025-02-03", "data": [{"name": "줄\n바꿈"}]},
+    }
+    revisions = {}
+    for name, doc in docs.items():
+        revisions[name] = server.request("POST", "/api/project/" + quote(name), doc)[2]["revision"]
+    return docs, revisions
+
+
+def test_one_line_per_project(server):
+    docs, revisions = _seed(server)
+    status, headers, lines = _bulk(server, "names=" + quote("일정,a,missing"))
+    assert status == 200
+    assert headers["Content-Type"].startswith("application/x-ndjson")
+    assert lines == [
+        {"name": "일정", "revision": revisions["일정"], "project": docs["일정"]},
+        {"name": "a", "revision": revisions["a"], "project": docs["a"]},
+        {"name": "missing", "error": "Project not found"},
+    ]
+
+
+def test_all_projects_with_field_projection(server):
+    docs, revisions = _seed(server)
+    status, _, lines = _bulk(server, "all=1&fields=startDate,holidays")
+    assert status == 200
+    assert sorted((line["name"], line["revision"]) for line in lines) == sorted(revisions.items())
+    for line in lines:
+        expected = {field: docs[line["name"]][field] for field in ("startDate", "holidays") if field in docs[line["name"]]}
+        assert line["project"] == expected
+
+
+def test_gzip_stream(server):
+    docs, _ = _seed(server)
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    conn.request("GET", "/api/projects/bulk?all=1", headers={"Accept-Encoding": "gzip"})
+    response = conn.getresponse()
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = gzip.decompress(response.read())
+    conn.close()
+    assert sorted(json.loads(line)["name"] for line in body.splitlines()) == sorted(docs)
+
+
+def test_empty_store(server):
+    status, _, lines = _bulk(server, "all=1&fields=startDate")
+    assert (status, lines) == (200, [])
+    status, _, result = _bulk(server, "fields=startDate")
+    assert status == 400 and "error" in result
@@ -0,0 +1,51 @@
+def _save(server, doc, headers=None):
+    return server.request("POST", "/api/project/p", doc, headers)
+
+
+def test_if_none_match_answers_304(server):
+    revision = _save(server, {"data": []})[2]["revision"]
+    status, headers, doc = server.request("GET", "/api/project/p")
+    assert status == 200 and doc == {"data": []}
+    assert headers["ETag"] == f'"{revision}"'
+    assert headers["Cache-Control"] == "no-cache"
+
+    status, headers, body = server.request("GET", "/api/project/p", headers={"If-None-Match": f'"{revision}"'})
+    assert status == 304 and body == b""
+    assert headers["ETag"] == f'"{revision}"'
+    # The gzip representation's ETag, and lists of them, still name the same revision
+    for header in (f'"{revision}-gzip"', f'"0000000000000000", W/"{revision}"', "*"):
+        assert server.request("GET", "/api/project/p", headers={"If-None-Match": header})[0] == 304
+    assert server.request("GET", "/api/project/p", headers={"If-None-Match": '"0000000000000000"'})[0] == 200
+
+
+def test_gzip_response_gets_its_own_etag(server):
+    revision = _save(server, {"data": [{"name": "작업 " * 200}]})[2]["revision"]
+    status, headers, _ = server.request("GET", "/api/project/p", headers={"Accept-Encoding": "gzip"})
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert headers["ETag"] == f'"{revision}-gzip"'
+    assert "Accept-Encoding" in headers["Vary"]
+    assert server.request("GET", "/api/project/p", headers={"If-None-Match": headers["ETag"],
+                                                             "Accept-Encoding": "gzip"})[0] == 304
+
+
+def test_etag_changes_after_a_save(server):
+    first = _save(server, {"data": []})[2]["revision"]
+    second = _save(server, {"data": [{"name": "a"}]})[2]["revision"]
+    assert second != first
+    status, headers, doc = server.request("GET", "/api/project/p", headers={"If-None-Match": f'"{first}"'})
+    assert status == 200 and doc == {"data": [{"name": "a"}]}
+    assert headers["ETag"] == f'"{second}"'
+
+
+def test_stale_if_match_answers_409(server):
+    first = _save(server, {"data": []})[2]["revision"]
+    second = _save(server, {"data": [{"name": "newer"}]}, {"If-Match": f'"{first}"'})[2]["revision"]
+
+    status, _, result = _save(server, {"data": [{"name": "stale"}]}, {"If-Match": f'"{first}"'})
+    assert status == 409
+    assert result == {"success": False, "error": "Revision mismatch", "revision": second}
+    assert server.request("GET", "/api/project/p")[2] == {"data": [{"name": "newer"}]}
+
+    # A project that doesn't exist yet matches no revision either
+    status, _, result = server.request("POST", "/api/project/q", {"data": []}, {"If-Match": f'"{first}"'})
+    assert status == 409 and result["revision"] is None
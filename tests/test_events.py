@@ -0,0 +1,81 @@
+import http.client
+import socket
+import time
+
+import pytest
+
+from server.events import EventBroker, SocketFanout
+
+
+def _open_stream(server, query):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.request("GET", "/api/events" + query)
+    response = conn.getresponse()
+    assert response.status == 200
+    assert response.readline() == b"retry: 3000\n"
+    return conn, response
+
+
+def _next_event(response):
+    """(event, data) of the next event on the stream, skipping heartbeats"""
+    event = None
+    while True:
+        line = response.readline().decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: ") and event:
+            return event, line[len("data: "):]
+
+
+@pytest.mark.parametrize("engine", ["threaded", "asyncio"])
+def test_project_filter_uses_the_sanitized_name(start_server, engine):
+    server = start_server(QS_SERVER_MODE=engine)
+    conn, response = _open_stream(server, "?project=%3Calpha%3E")
+    try:
+        server.request("POST", "/api/project/beta", {"data": []})
+        server.request("POST", "/api/project/alpha", {"data": []})
+        event, data = _next_event(response)
+        assert event == "save"
+        assert '"project":"alpha"' in data
+    finally:
+        conn.close()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_fanout_forgets_closed_clients():
+    broker = EventBroker()
+    fanout = SocketFanout(broker)
+    ours, theirs = socket.socketpair()
+    fanout.add(ours, None, None)
+    assert broker.subscriber_count() == 1
+    broker.publish("save", "p", {"project": "p"})
+    assert b"event: save" in theirs.recv(4096)
+
+    theirs.close()
+    _wait_for(lambda: not fanout._clients and broker.subscriber_count() == 0)
+
+
+def test_fanout_drop_uses_the_registered_fd():
+    broker = EventBroker()
+    fanout = SocketFanout(broker)
+    ours, theirs = socket.socketpair()
+    fanout.add(ours, None, None)
+    (old,) = fanout._clients.values()
+    # Closed before it is dropped: fileno() is -1 by now
+    ours.close()
+    fanout._drop(old)
+    assert not fanout._clients and broker.subscriber_count() == 0
+
+    # A newer connection on the same fd survives a late second drop of the old one
+    newer, peer = socket.socketpair()
+    fanout.add(newer, None, None)
+    fanout._drop(old)
+    assert list(fanout._clients.values())[0].sock is newer
+    for sock in (theirs, peer):
+        sock.close()
@@ -0,0 +1,80 @@
+from urllib.parse import quote
+
+import pytest
+
+from server.ics import build_calendar, escape_text, fold_line
+
+
+# The escapeICS() cases of test_scheduler.mjs, plus the backslash and CRLF rules it implements
+@pytest.mark.parametrize("text, escaped", [
+    ("a,b;c", "a\\,b\\;c"),
+    ("줄1\n줄2", "줄1\\n줄2"),
+    ("줄1\r\n줄2", "줄1\\n줄2"),
+    ("C:\\temp", "C:\\\\temp"),
+    ("\\;", "\\\\\\;"),
+    ("plain", "plain"),
+    (42, "42"),
+])
+def test_escape_text(text, escaped):
+    assert escape_text(text) == escaped
+
+
+def _unfold(folded):
+    return folded.replace("\r\n ", "")
+
+
+@pytest.mark.parametrize("line", [
+    "SUMMARY:" + "a" * 67,
+    "SUMMARY:" + "a" * 68,
+    "SUMMARY:" + "a" * 300,
+    "SUMMARY:" + "일정" * 60,
+    "DESCRIPTION:" + "x" + "한" * 40,
+    "SUMMARY:" + "😀" * 30,
+])
+def test_fold_line(line):
+    folded = fold_line(line)
+    pieces = folded.split("\r\n")
+    assert all(len(piece.encode("utf-8")) <= 75 for piece in pieces)
+    assert all(piece.startswith(" ") for piece in pieces[1:])
+    assert _unfold(folded) == line
+    assert (len(pieces) == 1) == (len(line.encode("utf-8")) <= 75)
+
+
+def test_calendar_escapes_and_folds_every_line():
+    doc = {"startDate": "2025-03-02T15:00:00.000Z", "data": [
+        {"id": 1, "name": "회의, 준비; 자료\\초안", "segments": [
+            {"id": "s1", "startOffset": 0, "duration": 2, "memo": "첫 줄\n둘째 줄 " + "긴 메모 " * 20},
+        ]},
+    ]}
+    body = build_calendar(doc, "프로젝트", 0).decode("utf-8")
+    assert body.endswith("\r\n") and "\n" not in body.replace("\r\n", "")
+    assert all(len(line.encode("utf-8")) <= 75 for line in body.split("\r\n"))
+    lines = _unfold(body).split("\r\n")
+    assert "SUMMARY:회의\\, 준비\\; 자료\\\\초안" in lines
+    assert "DESCRIPTION:첫 줄\\n둘째 줄 " + "긴 메모 " * 20 in lines
+
+
+def test_calendar_feed(server):
+    name = "일정 공유"
+    server.request("POST", "/api/project/" + quote(name), {"startDate": "2025-03-03", "data": [
+        {"id": 1, "name": "촬영, 편집", "segments": [{"id": "s1", "startOffset": 1, "duration": 3}]},
+    ]})
+    status, headers, body = server.request("GET", "/api/project/" + quote(name) + "/calendar.ics")
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/calendar")
+    lines = _unfold(body.decode("utf-8")).split("\r\n")
+    assert "SUMMARY:촬영\\, 편집" in lines
+    assert "DTSTART;VALUE=DATE:20250304" in lines
+    assert "DTEND;VALUE=DATE:20250307" in lines
+
+
+def test_segments_past_the_calendar_are_left_out():
+    doc = {"startDate": "2025-03-03", "data": [{"id": 1, "name": "a", "segments": [
+        {"id": "far", "startOffset": 1e9, "duration": 1},
+        {"id": "long", "startOffset": 0, "duration": 1e12},
+        {"id": "nan", "startOffset": float("nan"), "duration": 1},
+        {"id": "ok", "startOffset": 0, "duration": 1},
+    ]}]}
+    body = build_calendar(doc, "p").decode("utf-8")
+    assert body.count("BEGIN:VEVENT") == 1
+    assert "UID:1-ok-p@quantum-scheduler" in body
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from server import journal as journal_module
+from server.journal import ProjectJournal
+
+
+def _raw(doc):
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def test_versions_round_trip(tmp_path):
+    path = str(tmp_path / "p.jsonl")
+    journal = ProjectJournal()
+    docs = [{"name": "p", "data": [{"name": f"task {i}"}] * i} for i in range(1, 5)]
+    for i, doc in enumerate(docs):
+        assert journal.append(path, [(_raw(doc), f"r{i}", i + 1)]) == i + 1
+    assert [entry["version"] for entry in journal.history(path)] == [4, 3, 2, 1]
+    for i, doc in enumerate(docs):
+        assert journal.read_version(path, i + 1) == (_raw(doc), f"r{i}")
+    assert ProjectJournal().read(path) == _raw(docs[-1])
+
+
+def test_failed_append_leaves_the_head_as_on_disk(tmp_path, monkeypatch):
+    path = str(tmp_path / "p.jsonl")
+    journal = ProjectJournal()
+    first = {"name": "p", "data": [{"name": "a"}, {"name": "b"}]}
+    journal.append(path, [(_raw(first), "r1", 1)])
+
+    def unwritable(file, mode="r", *args, **kwargs):
+        if "a" in mode:
+            raise OSError("disk full")
+        return open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(journal_module, "open", unwritable, raising=False)
+    with pytest.raises(OSError):
+        journal.append(path, [(_raw({"name": "p", "data": [{"name": "a"}]}), "r2", 2)])
+    monkeypatch.undo()
+
+    assert json.loads(journal.read(path)) == first
+
+
+def test_batched_saves_get_a_line_each(tmp_path):
+    path = str(tmp_path / "p.jsonl")
+    journal = ProjectJournal()
+    docs = [{"data": [{"name": str(i)}]} for i in range(3)]
+    assert journal.append(path, [(_raw(doc), f"r{i}", i + 3) for i, doc in enumerate(docs)]) == 5
+    assert [entry["version"] for entry in journal.history(path)] == [5, 4, 3]
+    assert journal.read_version(path, 4) == (_raw(docs[1]), "r1")
+    # Numbers never go backwards, even if asked to
+    assert journal.append(path, [(_raw({"data": []}), "r9", 2)]) == 6
@@ -0,0 +1,72 @@
+import pytest
+
+from server.jsonpatch import InvalidPatchError, JsonPatchError, apply_patch, diff
+
+
+def test_diff_round_trip():
+    before = {"name": "a", "data": [{"name": "x", "children": []}, {"name": "y"}]}
+    after = {"name": "b", "data": [{"name": "x", "children": [{"name": "z"}]}], "saveDate": "2025-01-01"}
+    assert apply_patch(before, diff(before, after)) == after
+
+
+@pytest.mark.parametrize("operations", [
+    {"op": "add", "path": "/a", "value": 1},
+    [{"op": "frobnicate", "path": "/a"}],
+    [{"op": "add", "value": 1}],
+    [{"op": "add", "path": "a", "value": 1}],
+    [{"op": "replace", "path": "/a"}],
+    [{"op": "move", "from": "/a", "path": "/a/b"}],
+])
+def test_malformed_patch(operations):
+    with pytest.raises(InvalidPatchError):
+        apply_patch({"a": {"b": 1}}, operations)
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "test", "path": "/a", "value": 2}],
+    [{"op": "remove", "path": "/missing"}],
+    [{"op": "replace", "path": "/list/5", "value": 0}],
+])
+def test_patch_that_does_not_apply(operations):
+    with pytest.raises(JsonPatchError) as raised:
+        apply_patch({"a": 1, "list": [0]}, operations)
+    assert not isinstance(raised.value, InvalidPatchError)
+
+
+def _saved(server, name, doc):
+    status, _, result = server.request("POST", f"/api/project/{name}", doc)
+    assert status == 200
+    return result["revision"]
+
+
+@pytest.mark.parametrize("operations, status", [
+    ([{"op": "replace", "path": "/name", "value": "b"}], 200),
+    ([{"op": "test", "path": "/name", "value": "other"}], 409),
+    ([{"op": "remove", "path": "/missing"}], 409),
+    ({"op": "replace", "path": "/name", "value": "b"}, 400),
+    ([{"op": "frobnicate", "path": "/name"}], 400),
+    ([{"op": "replace", "value": "b"}], 400),
+])
+def test_patch_status(server, operations, status):
+    revision = _saved(server, "p", {"name": "a", "data": []})
+    answered, _, result = server.request("PATCH", "/api/project/p", operations, {"If-Match": f'"{revision}"'})
+    assert answered == status
+    assert result["success"] is (status == 200)
+
+
+def test_patch_against_stale_revision(server):
+    _saved(server, "p", {"name": "a", "data": []})
+    status, _, result = server.request("PATCH", "/api/project/p", [{"op": "replace", "path": "/name", "value": "b"}],
+                                       {"If-Match": '"0000000000000000"'})
+    assert status == 409
+    assert result["error"] == "Revision mismatch"
+
+
+@pytest.mark.parametrize("headers", [None, {"If-Match": ""}])
+def test_patch_without_if_match(server, headers):
+    _saved(server, "p", {"name": "a", "data": []})
+    status, _, result = server.request("PATCH", "/api/project/p", [{"op": "replace", "path": "/name", "value": "b"}],
+                                       headers)
+    assert status == 428
+    assert not result["success"]
+    assert server.request("GET", "/api/project/p")[2]["name"] == "a"
@@ -0,0 +1,44 @@
+import threading
+
+from server.limits import BoundedExecutor, RateLimiter
+
+
+def test_rate_limiter_allows_a_burst_then_refills(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("server.limits.time.monotonic", lambda: clock[0])
+    limiter = RateLimiter(rate=2, burst=3)
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == 0.5
+    assert limiter.acquire("b") == 0  # Buckets are per key
+    clock[0] += 0.5
+    assert limiter.acquire("a") == 0
+    assert limiter.limited == 1
+
+
+def test_rate_zero_means_no_limit():
+    limiter = RateLimiter(rate=0, burst=1)
+    assert all(limiter.acquire("a") == 0 for _ in range(100))
+
+
+def test_bounded_executor_refuses_beyond_its_queue():
+    release = threading.Event()
+    pool = BoundedExecutor(workers=1, queue_depth=1)
+    running = pool.submit(release.wait)
+    queued = pool.submit(lambda: "done")
+    assert pool.submit(lambda: None) is None
+    assert pool.stats()["rejected"] == 1
+    release.set()
+    assert running.result(5) and queued.result(5) == "done"
+    pool.shutdown()
+
+
+def test_project_writes_are_throttled_per_client(start_server):
+    server = start_server(QS_WRITE_RATE=1, QS_WRITE_BURST=3)
+    statuses = [server.request("POST", "/api/project/p", {"data": [i]})[0] for i in range(5)]
+    assert statuses[:3] == [200, 200, 200]
+    assert statuses[3:] == [429, 429]
+    status, headers, result = server.request("DELETE", "/api/project/p")
+    assert status == 429 and int(headers["Retry-After"]) >= 1 and not result["success"]
+    # Reads are never throttled
+    assert server.request("GET", "/api/project/p")[0] == 200
+    assert server.request("GET", "/api/health")[2]["load"]["throttledWrites"] == 3
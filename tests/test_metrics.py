@@ -0,0 +1,71 @@
+import re
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+SAVE_ROUTE = (("method", "POST"), ("route", "/api/project/:name"))
+
+
+def _scrape(server):
+    """{(name, sorted label pairs): value}, checking the text format on the way"""
+    status, headers, body = server.request("GET", "/api/metrics")
+    assert status == 200
+    assert headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    text = body.decode("utf-8")
+    assert text.endswith("\n")
+    samples = {}
+    kinds = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram") and name not in kinds
+            kinds[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in kinds else name
+        # Every sample follows the TYPE line of its family
+        assert family in kinds, line
+        assert name == family or kinds[family] == "histogram"
+        samples[name, tuple(sorted(LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+def _buckets(samples, name, labels):
+    found = [(float("inf") if dict(key[1])["le"] == "+Inf" else float(dict(key[1])["le"]), value)
+             for key, value in samples.items()
+             if key[0] == name + "_bucket" and tuple(p for p in key[1] if p[0] != "le") == labels]
+    return [value for _, value in sorted(found)]
+
+
+def test_histograms_are_well_formed(server):
+    server.request("POST", "/api/project/p", {"data": []})
+    samples = _scrape(server)
+    for name in ("qs_http_request_duration_seconds", "qs_http_request_body_bytes", "qs_http_response_bytes"):
+        buckets = _buckets(samples, name, SAVE_ROUTE)
+        assert buckets and buckets == sorted(buckets)
+        assert buckets[-1] == samples[name + "_count", SAVE_ROUTE] == 1
+
+
+def test_counts_grow_with_requests(server):
+    server.request("POST", "/api/project/p", {"data": []})
+    before = _scrape(server)
+    for i in range(3):
+        server.request("POST", "/api/project/p", {"data": [{"name": "x" * 4096 * i}]})
+    after = _scrape(server)
+
+    ok = ("qs_http_requests_total", SAVE_ROUTE + (("status", "200"),))
+    assert after[ok] == before[ok] + 3
+    for name in ("qs_http_request_duration_seconds", "qs_http_request_body_bytes", "qs_http_response_bytes"):
+        assert after[name + "_count", SAVE_ROUTE] == before[name + "_count", SAVE_ROUTE] + 3
+        assert after[name + "_sum", SAVE_ROUTE] > before[name + "_sum", SAVE_ROUTE]
+        assert _buckets(after, name, SAVE_ROUTE)[-1] == _buckets(before, name, SAVE_ROUTE)[-1] + 3
+    # The 4 KB and 8 KB bodies land above the smaller buckets
+    body_before = _buckets(before, "qs_http_request_body_bytes", SAVE_ROUTE)
+    body_after = _buckets(after, "qs_http_request_body_bytes", SAVE_ROUTE)
+    assert body_after[0] == body_before[0] + 1
+    # The scrape before this one was counted too
+    assert after["qs_http_requests_total", (("method", "GET"), ("route", "/api/metrics"), ("status", "200"))] >= 1
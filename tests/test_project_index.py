@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import pytest
+
+from server.project_index import ProjectIndex, summarize_project
+
+
+def _write(directory, name, doc):
+    path = os.path.join(directory, name + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("segment", [
+    {"startOffset": 1e9, "duration": 1},
+    {"startOffset": 0, "duration": 1e300},
+    {"startOffset": -1e9, "duration": 1},
+    {"startOffset": float("inf"), "duration": 1},
+    {"startOffset": float("nan"), "duration": 1},
+])
+def test_offsets_past_the_calendar_have_no_dates(segment):
+    doc = {"startDate": "2025-01-01", "data": [{"name": "a", "segments": [segment]}]}
+    assert summarize_project(doc) == (1, None, None)
+
+
+def test_rebuild_indexes_projects_with_huge_offsets(tmp_path):
+    list_dir = str(tmp_path / "list")
+    os.makedirs(list_dir)
+    _write(list_dir, "far", {"startDate": "2025-01-01", "data": [{"segments": [{"startOffset": 1e9, "duration": 1}]}]})
+    index = ProjectIndex()
+    index.rebuild(list_dir, _read)
+    entry = index.get("far")
+    assert (entry["taskCount"], entry["firstDate"], entry["lastDate"]) == (1, None, None)
+
+
+def test_tombstones_survive_a_restart(tmp_path):
+    list_dir = str(tmp_path / "list")
+    os.makedirs(list_dir)
+    sidecar = str(tmp_path / "project_index.json")
+    for name in ("a", "b"):
+        _write(list_dir, name, {"data": []})
+    index = ProjectIndex(sidecar)
+    index.rebuild(list_dir, _read)
+    since = time.time()
+
+    os.remove(os.path.join(list_dir, "a.json"))
+    index.remove("a", time.time())
+    index.save_sidecar()
+
+    restarted = ProjectIndex(sidecar)
+    restarted.rebuild(list_dir, _read)
+    entries, total, deleted = restarted.query(since)
+    assert deleted == ["a"]
+    assert [e["name"] for e in restarted.query()[0]] == ["b"]
+
+
+def test_files_removed_while_stopped_are_reported_deleted(tmp_path):
+    list_dir = str(tmp_path / "list")
+    os.makedirs(list_dir)
+    sidecar = str(tmp_path / "project_index.json")
+    path = _write(list_dir, "a", {"data": []})
+    index = ProjectIndex(sidecar)
+    index.rebuild(list_dir, _read)
+    index.save_sidecar()
+    since = time.time()
+
+    os.remove(path)
+    restarted = ProjectIndex(sidecar)
+    restarted.rebuild(list_dir, _read)
+    assert restarted.query(since)[2] == ["a"]
+
+
+def test_recreated_project_is_not_reported_deleted(tmp_path):
+    list_dir = str(tmp_path / "list")
+    os.makedirs(list_dir)
+    sidecar = str(tmp_path / "project_index.json")
+    path = _write(list_dir, "a", {"data": []})
+    index = ProjectIndex(sidecar)
+    index.rebuild(list_dir, _read)
+    since = time.time()
+    os.remove(path)
+    index.remove("a", time.time())
+    index.save_sidecar()
+
+    _write(list_dir, "a", {"data": []})
+    restarted = ProjectIndex(sidecar)
+    restarted.rebuild(list_dir, _read)
+    assert restarted.query(since)[2] == []
+
+
+def test_listing_since_reports_deletions_across_restarts(start_server):
+    server = start_server(QS_WRITE_DELAY_MS=0)
+    for name in ("a", "b"):
+        assert server.request("POST", f"/api/project/{name}", {"data": []})[0] == 200
+    since = server.request("GET", "/api/projects")[2]["serverTime"]
+    time.sleep(0.01)
+    assert server.request("DELETE", "/api/project/a")[2]["success"]
+    server.stop()
+
+    restarted = start_server(server.data_dir)
+    listing = restarted.request("GET", f"/api/projects?since={since}")[2]
+    assert listing["deleted"] == ["a"]
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from server.schedule import WorkCalendar, summarize_schedule
+
+
+def _walked(base, holidays, start, end):
+    """Working days the way getWorkingDays() in data.js finds them: one day at a time"""
+    days = (base + timedelta(days=i) for i in range(start, end))
+    return sum(1 for day in days if day.weekday() < 5 and day.isoformat() not in holidays)
+
+
+def test_working_days_match_a_day_by_day_walk():
+    base = date(2025, 3, 5)
+    holidays = ["2025-03-10", "2025-03-15", "2025-04-01"]
+    calendar = WorkCalendar(base, holidays)
+    for start in range(-20, 20):
+        for end in range(start - 2, start + 60, 3):
+            assert calendar.working_days(start, end) == _walked(base, holidays, start, end)
+
+
+def test_holidays_that_are_not_date_strings_are_ignored():
+    calendar = WorkCalendar(date(2025, 3, 3), ["2025-03-04", ["2025-03-05"], {"day": "2025-03-06"}, 7, None, "soon"])
+    assert calendar.working_days(0, 5) == 4
+
+
+def test_offsets_past_the_calendar():
+    doc = {
+        "startDate": "2025-01-01",
+        "holidays": [["not", "hashable"]],
+        "data": [{"name": "far", "segments": [
+            {"startOffset": 1e9, "duration": 1e12},
+            {"startOffset": float("inf"), "duration": 1},
+        ]}],
+    }
+    node = summarize_schedule(doc)["nodes"][0]
+    assert (node["start"], node["duration"]) == (10 ** 9, 10 ** 12)
+    assert (node["startDate"], node["endDate"]) == (None, None)
+    # 10**12 days are whole weeks of five working days plus one day, which is a weekday
+    assert (date(2025, 1, 1) + timedelta(days=(10 ** 9 + 10 ** 12 - 1) % 7)).weekday() < 5
+    assert node["workingDays"] == 10 ** 12 // 7 * 5 + 1
@@ -0,0 +1,80 @@
+from urllib.parse import quote
+
+from server.search import SearchIndex
+
+
+def _doc(*nodes):
+    return {"startDate": "2025-03-03", "data": list(nodes)}
+
+
+def _names(hits):
+    return [(hit["project"], hit["name"]) for hit in hits]
+
+
+def test_korean_matches_any_substring():
+    index = SearchIndex()
+    index.update("p", _doc(
+        {"id": 1, "name": "디자인 검토 회의를", "segments": [{"startOffset": 0, "duration": 2}]},
+        {"id": 2, "name": "개발", "segments": [{"startOffset": 0, "duration": 1, "memo": "서버 배포 준비"}]},
+    ))
+    for query in ("자인", "검토", "회의", "디자인 회의", "인"):
+        assert _names(index.search(query)[0]) == [("p", "디자인 검토 회의를")], query
+    hits, total = index.search("배포")
+    assert total == 1 and hits[0]["field"] == "memo" and hits[0]["text"] == "서버 배포 준비"
+    assert hits[0]["startDate"] == "2025-03-03"
+    # Every term has to match, and grams alone are not enough (the bigrams of 검회 are not a substring)
+    assert index.search("디자인 배포")[1] == 0
+    assert index.search("검회")[1] == 0
+
+
+def test_ranking_by_field_then_exact_and_prefix():
+    index = SearchIndex()
+    index.update("p", _doc(
+        {"id": 1, "name": "기타", "segments": [{"memo": "검토"}]},
+        {"id": 2, "name": "작업", "segments": [{"label": "자료 검토"}]},
+        {"id": 3, "name": "문서 검토"},
+        {"id": 4, "name": "검토 일정"},
+        {"id": 5, "name": "검토"},
+    ))
+    hits, total = index.search("검토")
+    assert total == 5
+    # Exact name, prefix of a name, inside a name, a label, a memo
+    assert [hit["nodeId"] for hit in hits] == [5, 4, 3, 2, 1]
+    assert index.search("검토", limit=2)[0][1]["nodeId"] == 4
+
+
+def test_save_rename_and_delete_touch_only_that_project():
+    index = SearchIndex()
+    index.update("a", _doc({"id": 1, "name": "촬영 준비"}))
+    index.update("b", _doc({"id": 1, "name": "촬영 편집"}))
+    assert sorted(_names(index.search("촬영")[0])) == [("a", "촬영 준비"), ("b", "촬영 편집")]
+
+    index.update("a", _doc({"id": 1, "name": "녹음"}))
+    assert _names(index.search("촬영")[0]) == [("b", "촬영 편집")]
+    assert _names(index.search("녹음")[0]) == [("a", "녹음")]
+
+    index.rename("b", "c")
+    assert _names(index.search("편집")[0]) == [("c", "촬영 편집")]
+    assert index.search("편집", project="b")[1] == 0
+
+    index.remove("a")
+    assert index.search("녹음")[1] == 0
+    assert index.stats() == {"projects": 1, "entries": 1, "grams": len({"촬", "영", "편", "집", "촬영", "편집"})}
+
+
+def test_non_string_names():
+    index = SearchIndex()
+    index.update("p", _doc({"id": 1, "name": 42, "segments": [{"label": "검토"}]}, {"id": 2, "name": "검토"}))
+    assert [hit["nodeId"] for hit in index.search("검토")[0]] == [2, 1]
+
+
+def test_saves_are_searchable_right_away(server):
+    for i in range(5):
+        server.request("POST", "/api/project/p", {"data": [{"id": 1, "name": f"버전 {i}"}]})
+        status, _, result = server.request("GET", "/api/search?q=" + quote(f"버전 {i}"))
+        assert status == 200
+        assert [hit["name"] for hit in result["hits"]] == [f"버전 {i}"]
+    server.request("PUT", "/api/project/p", {"newName": "q"})
+    assert [hit["project"] for hit in server.request("GET", "/api/search?q=4")[2]["hits"]] == ["q"]
+    server.request("DELETE", "/api/project/q")
+    assert server.request("GET", "/api/search?q=4")[2]["total"] == 0
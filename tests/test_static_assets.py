@@ -0,0 +1,64 @@
+import gzip
+
+from server.static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticAssets
+
+
+def _write(directory, path, text):
+    full = directory / path
+    full.parent.mkdir(parents=True, exist_ok=True)
+    full.write_text(text, encoding="utf-8")
+
+
+def test_load_rewrites_references_and_precompresses(tmp_path):
+    _write(tmp_path, "index.html", '<link href="style.css?v=1"><script type="module" src="script.js"></script>')
+    _write(tmp_path, "script.js", "import { a } from './scheduler/a.js';\n" + "// filler\n" * 200)
+    _write(tmp_path, "scheduler/a.js", "export const a = import('../lazy.js');\n")
+    _write(tmp_path, "style.css", '@import url("styles/base.css");\n')
+    _write(tmp_path, "list/project.json", "{}")
+    assets = StaticAssets(str(tmp_path), watch=False)
+    assert assets.load() == 4
+    v = assets.fingerprint
+    assert assets.get("/index.html").identity == \
+        f'<link href="style.css?v={v}"><script type="module" src="script.js?v={v}"></script>'.encode()
+    assert assets.get("/script.js").identity.startswith(f"import {{ a }} from './scheduler/a.js?v={v}';".encode())
+    assert assets.get("/scheduler/a.js").identity == f"export const a = import('../lazy.js?v={v}');\n".encode()
+    assert assets.get("/style.css").identity == f'@import url("styles/base.css?v={v}");\n'.encode()
+    assert assets.get("/list/project.json") is None
+
+    # Compressed at load time, and only kept where it actually saves bytes
+    script = assets.get("/script.js")
+    assert gzip.decompress(script.gzip) == script.identity
+    assert assets.get("/scheduler/a.js").gzip is None
+    assert not assets.get("/index.html").immutable and script.immutable
+
+
+def _fingerprint(server):
+    return server.request("GET", "/api/health")[2]["build"]
+
+
+def test_fingerprinted_urls_are_immutable(server):
+    v = _fingerprint(server)
+    status, headers, body = server.request("GET", "/")
+    assert status == 200 and headers["Cache-Control"] == REVALIDATE_CACHE
+    assert f'src="script.js?v={v}"'.encode() in body
+
+    for path in ("/script.js", "/style.css", "/scheduler/core.js"):
+        status, headers, _ = server.request("GET", f"{path}?v={v}")
+        assert status == 200 and headers["Cache-Control"] == IMMUTABLE_CACHE, path
+        # Without the current fingerprint the same file has to be revalidated
+        for query in ("", "?v=stale"):
+            assert server.request("GET", path + query)[1]["Cache-Control"] == REVALIDATE_CACHE
+
+
+def test_encodings_and_revalidation(server):
+    v = _fingerprint(server)
+    status, headers, body = server.request("GET", f"/script.js?v={v}", headers={"Accept-Encoding": "gzip"})
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert headers["ETag"].endswith('-gzip"') and headers["Vary"] == "Accept-Encoding"
+    identity = server.request("GET", f"/script.js?v={v}")
+    assert gzip.decompress(body) == identity[2]
+
+    status, headers, _ = server.request("GET", "/index.html", headers={"If-None-Match": identity[1]["ETag"]})
+    assert status == 200
+    status, headers, _ = server.request("GET", f"/script.js?v={v}", headers={"If-None-Match": identity[1]["ETag"]})
+    assert status == 304 and headers["Cache-Control"] == IMMUTABLE_CACHE
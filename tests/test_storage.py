@@ -0,0 +1,171 @@
+import json
+
+import pytest
+
+from server.project_index import ProjectIndex
+from server.sqlite_store import SQLiteProjectStore
+from server.storage import ProjectExistsError, ProjectStore
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteProjectStore(str(tmp_path / "projects.sqlite"))
+    else:
+        list_dir = tmp_path / "list"
+        list_dir.mkdir()
+        backend = ProjectStore(str(list_dir), ProjectIndex(str(tmp_path / "project_index.json")), 1024 * 1024)
+    backend.rebuild_index()
+    yield backend
+    backend.close()
+
+
+def test_rename_refuses_a_taken_name(store):
+    store.save("a", {"name": "a", "data": []})
+    store.save("b", {"name": "b", "data": []})
+    with pytest.raises(ProjectExistsError):
+        store.rename("a", "b")
+    assert store.read("a") is not None
+    assert b'"name":"b"' in store.read("b")[0]
+
+
+def test_rename(store):
+    store.save("a", {"name": "a", "data": []})
+    assert store.rename("a", "c")
+    assert store.read("a") is None
+    assert store.read("c") is not None
+    assert not store.rename("missing", "d")
+
+
+def test_rename_conflict_answers_409(server):
+    for name in ("a", "b"):
+        server.request("POST", f"/api/project/{name}", {"data": []})
+    status, _, result = server.request("PUT", "/api/project/a", {"newName": "b"})
+    assert status == 409
+    assert not result["success"]
+
+
+def test_every_answered_version_can_be_loaded(start_server):
+    # The default write delay batches these saves into one write-behind flush
+    server = start_server(QS_STORAGE_FORMAT="journal")
+    answered = {}
+    for i in range(5):
+        status, _, result = server.request("POST", "/api/project/p", {"name": "p", "data": [{"name": f"task {i}"}]})
+        assert status == 200
+        answered[result["version"]] = (i, result["revision"])
+    assert sorted(answered) == [1, 2, 3, 4, 5]
+
+    status, _, history = server.request("GET", "/api/project/p/history")
+    assert status == 200
+    assert [(entry["version"], entry["revision"]) for entry in history["versions"]] == \
+        [(version, answered[version][1]) for version in sorted(answered, reverse=True)]
+    for version, (i, revision) in answered.items():
+        status, headers, doc = server.request("GET", f"/api/project/p?version={version}")
+        assert status == 200
+        assert doc["data"] == [{"name": f"task {i}"}]
+        assert headers["ETag"] == f'"{revision}"'
+
+
+def test_store_and_journal_agree_on_versions(tmp_path):
+    list_dir = tmp_path / "list"
+    list_dir.mkdir()
+    store = ProjectStore(str(list_dir), ProjectIndex(str(tmp_path / "project_index.json")), 1024 * 1024,
+                         write_delay=60, storage_format="journal")
+    store.rebuild_index()
+    versions = [store.save("p", {"data": [{"name": str(i)}]})[1] for i in range(3)]
+    store.flush()
+    assert [entry["version"] for entry in store.history("p")] == versions[::-1]
+    for version, i in zip(versions, range(3)):
+        assert store.read_version("p", version)[0] == b'{"data":[{"name":"%d"}]}' % i
+
+    # An index that lost count (rebuilt without its sidecar) picks up from the journal
+    restarted = ProjectStore(str(list_dir), ProjectIndex(), 1024 * 1024, write_delay=0, storage_format="journal")
+    restarted.rebuild_index()
+    assert restarted.save("p", {"data": []})[1] == versions[-1] + 1
+    assert restarted.history("p")[0]["version"] == versions[-1] + 1
+    store.close()
+    restarted.close()
+
+
+@pytest.mark.parametrize("storage_format", ["pretty", "compact", "gzip", "journal"])
+def test_formats_round_trip_across_a_restart(tmp_path, storage_format):
+    list_dir = tmp_path / "list"
+    list_dir.mkdir()
+    doc = {"name": "일정", "data": [{"name": "작업", "segments": [{"startOffset": 0, "duration": 3}]}]}
+
+    def open_store():
+        store = ProjectStore(str(list_dir), ProjectIndex(str(tmp_path / "project_index.json")), 1024 * 1024,
+                             storage_format=storage_format)
+        store.rebuild_index()
+        return store
+
+    store = open_store()
+    revision, version, changed = store.save("p", doc)
+    assert changed and version == 1
+    store.close()
+
+    reopened = open_store()
+    raw, stored_revision = reopened.read("p")
+    assert json.loads(raw) == doc
+    entry = reopened.list()[0][0]
+    assert (entry["name"], entry["version"], entry["taskCount"]) == ("p", 1, 1)
+    reopened.close()
+
+
+def test_save_with_offsets_past_the_calendar(store):
+    doc = {"startDate": "2025-01-01", "data": [{"name": "a", "segments": [{"startOffset": 1e9, "duration": 1}]}]}
+    assert store.save("p", doc)[2]
+    assert json.loads(store.read("p")[0]) == doc
+    entry = store.list()[0][0]
+    assert (entry["firstDate"], entry["lastDate"]) == (None, None)
+
+
+def test_failed_save_leaves_nothing_cached(tmp_path, monkeypatch):
+    list_dir = tmp_path / "list"
+    list_dir.mkdir()
+    store = ProjectStore(str(list_dir), ProjectIndex(), 1024 * 1024, write_delay=60)
+    store.rebuild_index()
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(store.index, "update", broken)
+    with pytest.raises(RuntimeError):
+        store.save("p", {"data": []})
+    assert store.read("p") is None
+    store.close()
+
+
+@pytest.mark.parametrize("before, after", [
+    ({"a": True, "b": 1}, {"a": 1, "b": True}),
+    ({"a": 0, "b": 1.5}, {"a": False, "b": 1.5}),
+    ({"a": [1, 2.0]}, {"a": [1.0, 2]}),
+])
+def test_same_length_edits_that_only_change_types_are_saved(store, before, after):
+    store.save("p", before)
+    revision, version, changed = store.save("p", after)
+    assert changed and version == 2
+    assert json.loads(store.read("p")[0]) == after
+    assert [type(v) for v in json.loads(store.read("p")[0]).values()] == [type(v) for v in after.values()]
+
+
+def test_saves_that_only_move_the_save_date_are_skipped(store):
+    store.save("p", {"data": [], "saveDate": "2025-01-01T00:00:00.000Z"})
+    assert store.save("p", {"data": [], "saveDate": "2025-01-02T00:00:00.000Z"})[1:] == (1, False)
+
+
+@pytest.mark.parametrize("storage_format", ["pretty", "compact", "gzip", "journal"])
+def test_delete_keeps_only_journals_in_the_trash(tmp_path, storage_format):
+    list_dir = tmp_path / "list"
+    list_dir.mkdir()
+    store = ProjectStore(str(list_dir), ProjectIndex(), 1024 * 1024, write_delay=0, storage_format=storage_format)
+    store.rebuild_index()
+    store.save("p", {"data": []})
+    assert store.delete("p")
+    trash = list_dir / ".deleted"
+    if storage_format == "journal":
+        assert [path.name.split(".")[0] for path in trash.iterdir()] == ["p"]
+    else:
+        assert not trash.exists()
+    assert list(list_dir.iterdir()) == ([trash] if storage_format == "journal" else [])
+    store.close()
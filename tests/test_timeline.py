@@ -0,0 +1,98 @@
+import random
+from datetime import date, timedelta
+
+from server.timeline import TimelineIndex
+
+START = date(2025, 1, 6)
+
+
+def _doc(segments):
+    return {"startDate": START.isoformat(), "data": [
+        {"id": i, "name": f"task {i}", "segments": [{"startOffset": offset, "duration": duration}]}
+        for i, (offset, duration) in enumerate(segments)
+    ]}
+
+
+def _expected(projects, first_day, last_day):
+    found = []
+    for project, segments in projects.items():
+        for offset, duration in segments:
+            start = START + timedelta(days=offset)
+            end = start + timedelta(days=max(1, duration) - 1)
+            if start <= last_day and end >= first_day:
+                found.append((start.isoformat(), project, offset, duration))
+    return sorted(found)
+
+
+def _found(index, first_day, last_day):
+    return sorted((item["startDate"], item["project"], (date.fromisoformat(item["startDate"]) - START).days,
+                   item["duration"] if not item["isEvent"] else 0)
+                  for item in index.query(first_day, last_day))
+
+
+def test_matches_a_linear_scan_through_updates():
+    rng = random.Random(7)
+    index = TimelineIndex()
+    projects = {}
+    for step in range(300):
+        name = f"p{rng.randrange(20)}"
+        if step % 10 == 9:
+            index.remove(name)
+            projects.pop(name, None)
+        else:
+            projects[name] = [(rng.randrange(200), rng.randrange(1, 30)) for _ in range(rng.randrange(8))]
+            index.update(name, _doc(projects[name]))
+        first_day = START + timedelta(days=rng.randrange(-10, 220))
+        last_day = first_day + timedelta(days=rng.randrange(0, 40))
+        assert _found(index, first_day, last_day) == _expected(projects, first_day, last_day)
+    assert index.count() == sum(len(segments) for segments in projects.values())
+
+
+def test_results_come_in_start_order():
+    index = TimelineIndex()
+    index.update("a", _doc([(5, 3), (0, 10), (2, 1)]))
+    index.update("b", _doc([(1, 2)]))
+    starts = [item["startDate"] for item in index.query(START, START + timedelta(days=30))]
+    assert starts == sorted(starts)
+
+
+def test_rename_and_project_filter():
+    index = TimelineIndex()
+    index.update("a", _doc([(0, 3)]))
+    index.update("b", _doc([(1, 3)]))
+    index.rename("a", "b")
+    assert [item["project"] for item in index.query(START, START + timedelta(days=5))] == ["b"]
+    assert index.query(START, START + timedelta(days=5), project="a") == []
+    index.clear()
+    assert index.count() == 0
+
+
+def test_bulk_build_then_incremental_updates():
+    index = TimelineIndex()
+    index.update("a", _doc([(0, 3), (10, 2)]))
+    index.update("b", _doc([(1, 3)]))
+    index.build()
+    index.update("a", _doc([(20, 1)]))
+    days = START + timedelta(days=30)
+    assert [(item["project"], item["startDate"]) for item in index.query(START, days)] == \
+        [("b", (START + timedelta(days=1)).isoformat()), ("a", (START + timedelta(days=20)).isoformat())]
+
+
+def test_unhashable_node_ids_are_replaced_not_reused():
+    index = TimelineIndex()
+    doc = _doc([(0, 2), (3, 2)])
+    for node in doc["data"]:
+        node["id"] = [node["id"]]
+    index.update("a", doc)
+    index.build()
+    doc["data"][0]["segments"][0]["startOffset"] = 1
+    index.update("a", doc)
+    assert [item["startDate"] for item in index.query(START, START + timedelta(days=10))] == \
+        [(START + timedelta(days=1)).isoformat(), (START + timedelta(days=3)).isoformat()]
+    assert index.count() == 2
+
+
+def test_segments_past_the_calendar_are_left_out():
+    index = TimelineIndex()
+    index.update("p", _doc([(10 ** 9, 1), (0, 10 ** 12), (float("inf"), 1), (2, 1)]))
+    assert _found(index, START, START + timedelta(days=30)) == [((START + timedelta(days=2)).isoformat(), "p", 2, 1)]
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+from server.project_index import ProjectIndex
+from server.storage import ProjectStore
+from server.watcher import start_watcher
+
+MODES = ["poll"] + (["inotify"] if sys.platform.startswith("linux") else [])
+
+
+@pytest.fixture(params=MODES)
+def watched_store(request, tmp_path):
+    list_dir = tmp_path / "list"
+    list_dir.mkdir()
+    store = ProjectStore(str(list_dir), ProjectIndex(), 1024 * 1024, write_delay=0)
+    store.rebuild_index()
+    events = []
+    changed = threading.Event()
+
+    def listener(event, name, info):
+        events.append((event, name, info.get("external", False)))
+        changed.set()
+
+    store.add_listener(listener)
+    watcher = start_watcher(str(list_dir), store.refresh, request.param, debounce=0.02, poll_interval=0.05)
+    store.watched = True
+    yield store, events, changed
+    watcher.stop()
+    watcher.join(2)
+    store.close()
+
+
+def _wait(changed):
+    assert changed.wait(5)
+    changed.clear()
+
+
+def test_external_changes_are_picked_up(watched_store):
+    store, events, changed = watched_store
+    path = os.path.join(store.list_dir, "outside.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"data": [{"name": "a"}]}, f)
+    _wait(changed)
+    assert events[-1] == ("save", "outside", True)
+    assert store.index.get("outside")["taskCount"] == 1
+
+    # Write-then-rename, the way editors and sync clients replace a file
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"data": [{"name": "a"}, {"name": "b"}]}, f)
+    os.replace(path + ".tmp", path)
+    _wait(changed)
+    assert store.index.get("outside")["taskCount"] == 2
+    assert store.index.get("outside")["version"] == 2
+
+    os.remove(path)
+    _wait(changed)
+    assert events[-1] == ("delete", "outside", True)
+    assert store.read("outside") is None
+
+
+def test_own_saves_are_not_reported_again(watched_store):
+    store, events, changed = watched_store
+    store.save("mine", {"data": []})
+    _wait(changed)
+    assert not changed.wait(0.5)
+    assert events == [("save", "mine", False)]
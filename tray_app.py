@@ -6,13 +6,18 @@ Quantum Scheduler - System Tray Application
 
 import sys
 import os
+import time
+import functools
+import queue
+import secrets
 import webbrowser
 import subprocess
-from threading import Thread
+from threading import Lock, RLock, Thread
 import pystray
 from PIL import Image, ImageDraw
 from pystray import MenuItem as item
 import ctypes
+import backup
 
 # 단일 실행을 위한 상수
 ERROR_ALREADY_EXISTS = 183
@@ -26,7 +31,34 @@ def create_mutex(mutex_name):
 
 # 서버 프로세스 관리
 server_process = None
-server_running = False
+server_running = False      # 사용자가 켜 둔 상태 (감시 대상)
+server_ready_at = None      # 지금 프로세스가 준비된 시각 (time.monotonic), 시작 중이면 None
+restart_count = 0
+server_lock = RLock()
+
+# 트레이가 띄운 서버만 /api/shutdown을 받아들이도록 실행마다 새로 만드는 토큰
+CONTROL_TOKEN = secrets.token_hex(16)
+
+# 서버가 준비될 때까지 기다리는 최대 시간 (초)
+READY_TIMEOUT = 20
+
+# 감시 루프: poll() 주기, 실행 중 /api/health 확인 주기, 멈춘 것으로 보는 연속 실패 횟수
+SUPERVISE_INTERVAL = 1.0
+HEALTH_INTERVAL = 5.0
+HEALTH_FAILURES = 3
+
+# 재시작 대기는 1, 2, 4, ... 초로 늘어나 BACKOFF_MAX에서 멈추고, STABLE_SECONDS 동안 정상이면 처음부터
+BACKOFF_MAX = 60
+STABLE_SECONDS = 120
+
+# 연달아 이만큼 재시작에 실패하면 따로 알린다
+REPEATED_FAILURES = 3
+
+# 정상 종료 요청 후 대기 중인 저장을 기록할 시간 (초), 지나면 terminate()
+STOP_TIMEOUT = 10
+
+# 트레이에서 만든 백업은 데이터 폴더의 backups/에 이만큼만 남긴다
+BACKUP_KEEP = 30
 
 def create_tray_icon():
     """트레이 아이콘 이미지 생성"""
@@ -38,8 +70,9 @@ def create_tray_icon():
     dc.ellipse([8, 8, 56, 56], fill='#5e6ad2', outline='#4a5ab8')
     return image
 
+@functools.lru_cache(maxsize=None)
 def get_local_ip():
-    """로컬 네트워크 IP 주소 가져오기"""
+    """로컬 네트워크 IP 주소 가져오기 (한 번만 조회)"""
     import socket
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -51,60 +84,254 @@ def get_local_ip():
         return "127.0.0.1"
 
 def get_data_dir():
+    # 서버와 같은 규칙: QS_DATA_DIR이 있으면 그쪽에 포트 파일이 생긴다
+    if os.environ.get('QS_DATA_DIR'):
+        return os.environ['QS_DATA_DIR']
     if getattr(sys, 'frozen', False):
         base_dir = os.path.dirname(sys.executable)
         return os.path.join(base_dir, 'server')
     else:
         return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server')
 
+def get_port_file():
+    return os.path.join(get_data_dir(), "server_port.txt")
+
+def read_port_file():
+    """server_port.txt의 포트, 없으면 None (서버는 바인드와 준비가 끝난 뒤에만 이 파일을 쓴다)"""
+    try:
+        with open(get_port_file(), "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
 def get_active_port():
     """Read the active port from server_port.txt"""
+    return read_port_file() or 8088
+
+def check_health(port, timeout=2):
+    """/api/health가 200으로 응답하면 True. 503은 요청이 밀려 바쁜 것이지 멈춘 것이 아니므로 역시 True"""
+    import urllib.error
+    import urllib.request
     try:
-        port_file = os.path.join(get_data_dir(), "server_port.txt")
-        if os.path.exists(port_file):
-            with open(port_file, "r") as f:
-                return int(f.read().strip())
-    except:
+        with urllib.request.urlopen(f'http://localhost:{port}/api/health', timeout=timeout) as response:
+            return response.status == 200
+    except urllib.error.HTTPError as e:
+        return e.code == 503
+    except Exception:
+        return False
+
+def wait_for_server(timeout=READY_TIMEOUT):
+    """포트 파일이 생기고 /api/health가 응답할 때까지 대기. 준비되면 포트, 실패하면 None"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server_process is None or server_process.poll() is not None:
+            return None  # 시작 도중 서버가 종료됨
+        port = read_port_file()
+        if port and check_health(port):
+            return port
+        time.sleep(0.05)
+    return None
+
+def spawn_server():
+    """서버 프로세스 실행 (준비 여부는 wait_for_server / 감시 루프가 확인)"""
+    global server_process, server_ready_at
+    # 이전 실행이 남긴 포트 파일을 준비 신호로 착각하지 않도록 먼저 지운다
+    try:
+        os.remove(get_port_file())
+    except OSError:
         pass
-    return 8088
 
-def start_server(icon, item):
-    """서버 시작"""
-    global server_process, server_running
-    if not server_running:
-        # 실행 모드 확인 (스크립트 vs Frozen)
-        if getattr(sys, 'frozen', False):
-            # Frozen 상태: 자기 자신을 --server 옵션으로 실행
-            server_process = subprocess.Popen(
-                [sys.executable, "--server"],
-                creationflags=subprocess.CREATE_NO_WINDOW # 콘솔 창 숨기기
+    env = dict(os.environ, QS_CONTROL_TOKEN=CONTROL_TOKEN)
+    # 실행 모드 확인 (스크립트 vs Frozen)
+    if getattr(sys, 'frozen', False):
+        # Frozen 상태: 자기 자신을 --server 옵션으로 실행
+        server_process = subprocess.Popen(
+            [sys.executable, "--server"],
+            env=env,
+            creationflags=subprocess.CREATE_NO_WINDOW # 콘솔 창 숨기기
+        )
+    else:
+        # 스크립트 상태: server.py 실행
+        server_script = os.path.join(os.path.dirname(__file__), 'server', 'server.py')
+        server_process = subprocess.Popen([sys.executable, server_script], env=env)
+    server_ready_at = None
+
+def kill_server(process):
+    """terminate(), 그래도 남아 있으면 kill()"""
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def shutdown_server(process):
+    """정상 종료: /api/shutdown으로 대기 중인 저장을 기록하게 한 뒤 끝나기를 기다리고, 안 되면 terminate()"""
+    import urllib.request
+    if process.poll() is not None:
+        return
+    port = read_port_file()
+    if port:
+        try:
+            request = urllib.request.Request(
+                f'http://localhost:{port}/api/shutdown', method='POST',
+                headers={'X-Control-Token': CONTROL_TOKEN},
             )
-        else:
-            # 스크립트 상태: server.py 실행
-            server_script = os.path.join(os.path.dirname(__file__), 'server', 'server.py')
-            server_process = subprocess.Popen([sys.executable, server_script])
-            
+            urllib.request.urlopen(request, timeout=2).close()
+            process.wait(timeout=STOP_TIMEOUT)
+            return
+        except Exception:
+            pass  # 응답이 없거나 제때 끝나지 않음
+    kill_server(process)
+
+def start_server(icon, item):
+    """서버 시작 (준비되면 포트를 돌려준다)"""
+    global server_running, server_ready_at
+    with server_lock:
+        if server_running:
+            return None
+        spawn_server()
         server_running = True
-        
-        # Give server a moment to write the port file
-        import time
-        time.sleep(0.5) 
-        
-        local_ip = get_local_ip()
-        port = get_active_port()
-        icon.notify(
-            f'서버가 시작되었습니다\n로컬: http://localhost:{port}\n네트워크: http://{local_ip}:{port}',
-            'Quantum Scheduler'
-        )
+        process = server_process
+
+    # 준비를 기다리는 동안은 잠금을 놓는다 (감시 루프와 메뉴의 중지/종료가 막히지 않도록)
+    port = wait_for_server()
+    with server_lock:
+        if server_process is not process:
+            return None  # 기다리는 사이 사용자가 중지했거나 감시 루프가 다시 시작함
+        if port is not None:
+            server_ready_at = time.monotonic()
+    if port is None:
+        if process.poll() is None:
+            # 아직 살아 있으면 (첫 실행 마이그레이션 등) 그대로 둔다
+            icon.notify('서버 시작이 지연되고 있습니다. 잠시 후 웹페이지 열기를 눌러 주세요.', 'Quantum Scheduler')
+        else:
+            # 감시 루프가 백오프를 두고 다시 시도한다
+            icon.notify('서버를 시작하지 못했습니다. 자동으로 다시 시도합니다.\n(server_debug.log 확인)', '오류')
+        return None
+
+    local_ip = get_local_ip()
+    icon.notify(
+        f'서버가 시작되었습니다\n로컬: http://localhost:{port}\n네트워크: http://{local_ip}:{port}',
+        'Quantum Scheduler'
+    )
+    refresh_menu(icon)
+    return port
 
 def stop_server(icon, item):
-    """서버 중지"""
-    global server_process, server_running
-    if server_running and server_process:
-        server_process.terminate()
-        server_process = None
+    """서버 중지 (대기 중인 저장을 기록한 뒤 종료)"""
+    global server_process, server_running, server_ready_at
+    with server_lock:
+        if not server_running:
+            return
+        process, server_process = server_process, None
         server_running = False
-        icon.notify('서버가 중지되었습니다', 'Quantum Scheduler')
+        server_ready_at = None
+    if process:
+        shutdown_server(process)
+    icon.notify('서버가 중지되었습니다', 'Quantum Scheduler')
+    refresh_menu(icon)
+
+def supervise(icon):
+    """서버 감시: 프로세스가 끝났거나 응답이 없으면 지수 백오프로 재시작"""
+    global server_process, server_ready_at, restart_count
+    failures = 0            # 연달아 실패한 재시작 횟수
+    health_failures = 0
+    last_health = 0.0
+    while True:
+        time.sleep(SUPERVISE_INTERVAL)
+        refresh_menu(icon)
+        # 확인은 잠금 밖에서 (느린 /api/health가 메뉴의 시작/중지를 막지 않도록)
+        with server_lock:
+            process, ready_at = server_process, server_ready_at
+            active = server_running and process is not None
+        if not active:
+            failures = health_failures = 0
+            continue
+
+        now = time.monotonic()
+        code = process.poll()
+        if code is None:
+            # 실행 중에는 HEALTH_INTERVAL마다, 시작 중에는 매번 (포트 파일이 생겼는지) 확인
+            if ready_at is not None and now - last_health < HEALTH_INTERVAL:
+                continue
+            last_health = now
+            port = read_port_file()
+            if port and check_health(port):
+                health_failures = 0
+                if ready_at is None:
+                    with server_lock:
+                        if server_process is process:
+                            server_ready_at = now
+                    if restart_count:
+                        icon.notify(f'서버가 다시 시작되었습니다 (재시작 {restart_count}회)', 'Quantum Scheduler')
+                elif now - ready_at >= STABLE_SECONDS:
+                    failures = 0
+                continue
+            if ready_at is None:
+                continue  # 아직 시작 중
+            health_failures += 1
+            if health_failures < HEALTH_FAILURES:
+                continue
+            reason = '응답 없음'
+        else:
+            reason = f'종료 코드 {code}'
+
+        with server_lock:
+            if server_process is not process:
+                continue  # 그 사이 사용자가 중지했거나 다시 시작함
+            server_process = None
+            server_ready_at = None
+        if code is None:
+            # 멈춘 프로세스는 종료 요청에 답하지 못하니 바로 끝낸다
+            process.kill()
+            process.wait()
+        health_failures = 0
+        delay = min(BACKOFF_MAX, 2 ** failures)
+        failures += 1
+
+        if failures >= REPEATED_FAILURES:
+            icon.notify(
+                f'서버가 {failures}번 연달아 멈췄습니다 ({reason}). {delay}초 후 다시 시도합니다.\n(server_debug.log 확인)',
+                '오류'
+            )
+        else:
+            icon.notify(f'서버가 멈췄습니다 ({reason}). {delay}초 후 다시 시작합니다.', 'Quantum Scheduler')
+        time.sleep(delay)
+
+        with server_lock:
+            # 기다리는 사이 사용자가 중지했거나 직접 다시 시작했으면 그대로 둔다
+            if not server_running or server_process is not None:
+                continue
+            spawn_server()
+            restart_count += 1
+
+def format_uptime(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f'{minutes}분'
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f'{hours}시간 {minutes}분'
+    days, hours = divmod(hours, 24)
+    return f'{days}일 {hours}시간'
+
+def server_status_text(item):
+    """메뉴 맨 위의 상태 줄: 가동 시간과 재시작 횟수"""
+    if not server_running:
+        return '서버: 중지됨'
+    if server_ready_at is None:
+        return f'서버: 시작 중 · 재시작 {restart_count}회'
+    return f'서버: 실행 중 {format_uptime(time.monotonic() - server_ready_at)} · 재시작 {restart_count}회'
+
+_menu_status = None
+
+def refresh_menu(icon):
+    """상태 줄이 바뀌었을 때만 메뉴를 다시 그린다"""
+    global _menu_status
+    text = server_status_text(None)
+    if text != _menu_status:
+        _menu_status = text
+        icon.update_menu()
 
 def open_browser(icon, item):
     """브라우저에서 열기"""
@@ -132,11 +359,134 @@ def show_network_info(icon, item):
         'Quantum Scheduler - 네트워크 정보'
     )
 
+def show_server_stats(icon, item):
+    """서버 통계 요약 표시 (/api/metrics)"""
+    import json
+    import urllib.request
+    port = get_active_port()
+    try:
+        with urllib.request.urlopen(f'http://localhost:{port}/api/metrics?format=json', timeout=3) as response:
+            stats = json.load(response)
+    except Exception as e:
+        icon.notify(f'통계를 가져오지 못했습니다: {e}', '오류')
+        return
+
+    routes = [r for r in stats['routes'] if r['route'] != 'static']
+    busiest = max(routes, key=lambda r: r['requests'], default=None)
+    slowest = max(routes, key=lambda r: r['latencyMs']['p95'] or 0, default=None)
+    lines = [
+        f"가동 {int(stats['uptimeSeconds'] // 60)}분 · 요청 {stats['requests']}건 · 오류 {stats['errors']}건 · 처리 중 {stats['inFlight']}",
+    ]
+    if busiest:
+        lines.append(f"최다: {busiest['method']} {busiest['route']} ({busiest['requests']}건)")
+    if slowest:
+        lines.append(f"최저속 p95: {slowest['method']} {slowest['route']} ({slowest['latencyMs']['p95']:.0f} ms)")
+    icon.notify('\n'.join(lines), 'Quantum Scheduler - 서버 통계')
+
+def get_backup_dir():
+    return os.path.join(get_data_dir(), 'backups')
+
+def run_in_background(task):
+    """메뉴 콜백에서 오래 걸리는 작업은 트레이를 막지 않도록 스레드로"""
+    @functools.wraps(task)
+    def wrapper(icon, item):
+        Thread(target=task, args=(icon, item), daemon=True).start()
+    return wrapper
+
+@run_in_background
+def create_backup(icon, item):
+    """모든 프로젝트를 zip 하나로 backups/에 저장 (GET /api/archive)"""
+    port = get_active_port()
+    path = backup.backup_path(get_backup_dir() + os.sep)
+    started = time.monotonic()
+    try:
+        size, projects = backup.export_backup(f'http://localhost:{port}', path)
+        backup.prune_backups(get_backup_dir(), BACKUP_KEEP)
+    except Exception as e:
+        icon.notify(f'백업 실패: {e}', '오류')
+        return
+    icon.notify(
+        f'프로젝트 {projects}개 ({size / 1024 / 1024:.1f} MB, {time.monotonic() - started:.1f}초)\n{path}',
+        'Quantum Scheduler - 백업 완료'
+    )
+
+# tkinter는 Tk 루트를 만든 스레드에서만 써야 하므로, 파일 선택 창은 전용 스레드 하나가 모두 띄운다
+dialog_requests = queue.Queue()
+dialog_thread = None
+dialog_lock = Lock()
+
+def dialog_loop():
+    """파일 선택 창 전용 스레드: Tk 루트 하나를 숨겨 두고 요청을 차례로 처리"""
+    try:
+        import tkinter
+        from tkinter import filedialog
+        root = tkinter.Tk()
+        root.withdraw()
+        error = None
+    except Exception as e:
+        root, error = None, e  # 디스플레이가 없는 등: 이후 요청마다 이 오류를 돌려준다
+    while True:
+        options, reply = dialog_requests.get()
+        if root is None:
+            reply.put((None, error))
+            continue
+        try:
+            root.attributes('-topmost', True)
+            reply.put((filedialog.askopenfilename(parent=root, **options), None))
+        except Exception as e:
+            reply.put((None, e))
+
+def ask_open_filename(**options):
+    """전용 스레드에 파일 선택 창을 띄우고 닫힐 때까지 기다린다 (취소하면 '')"""
+    global dialog_thread
+    with dialog_lock:
+        if dialog_thread is None:
+            dialog_thread = Thread(target=dialog_loop, daemon=True)
+            dialog_thread.start()
+    reply = queue.Queue(maxsize=1)
+    dialog_requests.put((options, reply))
+    path, error = reply.get()
+    if error is not None:
+        raise error
+    return path
+
+@run_in_background
+def restore_backup(icon, item):
+    """백업 zip을 골라 가져오기 (POST /api/archive). 이름이 겹치는 프로젝트는 새 이름으로 추가"""
+    try:
+        path = ask_open_filename(
+            title='가져올 백업 선택', initialdir=get_backup_dir(), filetypes=[('Zip archive', '*.zip')])
+    except Exception as e:
+        icon.notify(f'파일 선택 창을 열 수 없습니다: {e}\n명령줄에서: python backup.py import <파일>', '오류')
+        return
+    if not path:
+        return
+    port = get_active_port()
+    icon.notify(f'가져오는 중...\n{os.path.basename(path)}', 'Quantum Scheduler')
+    try:
+        result = backup.import_backup(f'http://localhost:{port}', path, policy='rename')
+    except Exception as e:
+        icon.notify(f'가져오기 실패: {e}', '오류')
+        return
+    counts = result['counts']
+    icon.notify(
+        f"추가 {counts['created']}개 · 새 이름으로 추가 {counts['renamed']}개",
+        'Quantum Scheduler - 가져오기 완료'
+    )
+
+def open_backup_folder(icon, item):
+    """백업 폴더 열기"""
+    os.makedirs(get_backup_dir(), exist_ok=True)
+    os.startfile(get_backup_dir())
+
 def quit_app(icon, item):
-    """애플리케이션 종료"""
+    """애플리케이션 종료 (서버는 저장을 마친 뒤 종료)"""
     global server_process, server_running
-    if server_running and server_process:
-        server_process.terminate()
+    with server_lock:
+        process, server_process = server_process, None
+        server_running = False
+    if process:
+        shutdown_server(process)
     icon.stop()
 
 def setup_tray():
@@ -144,9 +494,16 @@ def setup_tray():
     icon_image = create_tray_icon()
     
     menu = pystray.Menu(
+        item(server_status_text, lambda icon, item: None, enabled=False),
+        pystray.Menu.SEPARATOR,
         item('웹페이지 열기', open_browser),
         item('네트워크 주소 복사', copy_network_address),
         item('네트워크 정보', show_network_info),
+        item('서버 통계', show_server_stats),
+        pystray.Menu.SEPARATOR,
+        item('백업 만들기', create_backup),
+        item('백업 가져오기...', restore_backup),
+        item('백업 폴더 열기', open_backup_folder),
         pystray.Menu.SEPARATOR,
         item('서버 시작', start_server),
         item('서버 중지', stop_server),
@@ -156,15 +513,13 @@ def setup_tray():
     
     icon = pystray.Icon('quantum_scheduler', icon_image, 'Quantum Scheduler', menu)
     
-    # 자동으로 서버 시작 및 브라우저 열기
+    # 자동으로 서버 시작 및 브라우저 열기 (서버가 준비되는 즉시)
     def auto_start():
-        start_server(icon, None)
-        # 서버가 뜰 때까지 약간 대기 후 브라우저 열기
-        import time
-        time.sleep(1.0)
-        open_browser(icon, None)
+        if start_server(icon, None):
+            open_browser(icon, None)
 
     Thread(target=auto_start, daemon=True).start()
+    Thread(target=supervise, args=(icon,), daemon=True).start()
     
     icon.run()
 